@@ -0,0 +1,68 @@
+"""
+Dump and load a list of todo items with each codec, against the YAML written before the
+codecs: python/object tags, loaded with the full loader.
+
+Run with ``python -m benchmarks.bench_codecs``.
+"""
+
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import yaml
+
+from todo.data.codecs import BinaryCodec, JsonLinesCodec, PickleCodec, YamlCodec
+from todo.data.data import TodoItem
+
+try:
+    from yaml import CDumper as Dumper
+    from yaml import CLoader as Loader
+except ImportError:
+    from yaml import Dumper, Loader  # type: ignore
+
+COUNT = 20_000
+
+
+def _items() -> list[TodoItem]:
+    start = datetime(2024, 1, 1)
+    return [TodoItem(f"task {i}", "details" if i % 5 == 0 else "", completed=i % 3 == 0,
+                     photo=Path(f"photos/{i}.png") if i % 10 == 0 else None,
+                     due_date=start + timedelta(hours=i) if i % 4 else None, created_date=start)
+            for i in range(COUNT)]
+
+
+class _Legacy:
+    def dumps(self, data):
+        return yaml.dump(data, Dumper=Dumper).encode("utf-8")
+
+    def loads(self, data):
+        return yaml.load(data, Loader=Loader)
+
+    def __repr__(self):
+        return "legacy YAML"
+
+
+def _time(fn) -> float:
+    return min(_once(fn) for _ in range(3))
+
+
+def _once(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    items = _items()
+    print(f"{COUNT} todo items, yaml.__with_libyaml__={yaml.__with_libyaml__}")
+    print(f"{'codec':<18}{'dump ms':>10}{'load ms':>10}{'bytes':>12}")
+    for codec in (_Legacy(), YamlCodec(), JsonLinesCodec(), BinaryCodec(), PickleCodec()):
+        data = codec.dumps(items)
+        assert codec.loads(data) == items
+        dump = _time(lambda: codec.dumps(items))
+        load = _time(lambda: codec.loads(data))
+        print(f"{codec!r:<18}{dump * 1e3:>10.1f}{load * 1e3:>10.1f}{len(data):>12}")
+
+
+if __name__ == "__main__":
+    main()
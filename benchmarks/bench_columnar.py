@@ -0,0 +1,67 @@
+"""
+Compare a ColumnarList of todo items against an ObservedList holding the dataclass instances:
+the memory of the items, measured with tracemalloc, and scans over a field.
+
+Run with ``python -m benchmarks.bench_columnar``.
+"""
+
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from todo.data.columnar import ColumnarList
+from todo.data.data import TodoItem
+from todo.data.observed import ObservedList
+
+COUNT = 100_000
+
+
+def _items() -> list[TodoItem]:
+    start = datetime(2024, 1, 1)
+    return [TodoItem(f"task {i % 500}", completed=i % 3 == 0,
+                     due_date=start + timedelta(hours=i) if i % 4 else None, created_date=start)
+            for i in range(COUNT)]
+
+
+def _measure(build):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    built = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return built, sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+
+def _time(fn) -> float:
+    return min(_once(fn) for _ in range(5))
+
+
+def _once(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    plain, plain_size = _measure(lambda: ObservedList(_items()))
+    columnar, columnar_size = _measure(lambda: ColumnarList(TodoItem, _items()))
+    cutoff = datetime(2024, 6, 1)
+
+    print(f"{'':<24}{'list':>14}{'columnar':>14}")
+    print(f"{'bytes per item':<24}{plain_size / COUNT:>14.0f}{columnar_size / COUNT:>14.0f}")
+    rows = [
+        ("count completed", lambda: sum(item.completed for item in plain),
+         lambda: int(columnar.column("completed").sum())),
+        ("due before", lambda: [i for i, item in enumerate(plain) if item.due_date and item.due_date < cutoff],
+         lambda: np.flatnonzero(columnar.column("due_date") < np.datetime64(cutoff))),
+        ("title equals", lambda: [i for i, item in enumerate(plain) if item.title == "task 7"],
+         lambda: np.flatnonzero(columnar.equals("title", "task 7"))),
+    ]
+    for name, scan, vectorized in rows:
+        print(f"{name:<24}{_time(scan) * 1e3:>11.2f} ms{_time(vectorized) * 1e3:>11.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Compare attribute reads through ObservedDot against a plain namespace, as done on the config.
+
+Run with ``python -m benchmarks.bench_dot``.
+"""
+
+import timeit
+from types import SimpleNamespace
+
+from todo.data.observed import Action, ObservedDot
+
+NUMBER = 100_000
+
+
+def _report(name: str, plain: str, dotted: str, namespace: dict) -> None:
+    base = min(timeit.repeat(plain, globals=namespace, number=NUMBER, repeat=5))
+    cost = min(timeit.repeat(dotted, globals=namespace, number=NUMBER, repeat=5))
+    print(f"{name:<24}{base / NUMBER * 1e9:>10.0f} ns{cost / NUMBER * 1e9:>10.0f} ns{cost / base:>8.1f}x")
+
+
+def main():
+    data = {"integration": {"enabled": True, "interval": 60}, "logging": {"level": "INFO"}}
+    namespace = {
+        "ns": SimpleNamespace(integration=SimpleNamespace(**data["integration"]), logging=data["logging"]),
+        "dot": ObservedDot(data),
+    }
+    cases = [
+        ("value", "ns.integration.interval", "dot.integration.interval"),
+        ("collection", "ns.integration", "dot.integration"),
+        ("item", "ns.logging", "dot['logging']"),
+        ("method", "ns.__eq__", "dot.to_data"),
+    ]
+
+    print(f"{'':<24}{'plain':>13}{'dot':>13}{'ratio':>9}")
+    print("-- no READ subscriber")
+    for case in cases:
+        _report(*case, namespace)
+
+    print("-- READ subscriber on the root")
+    namespace["dot"].attach(lambda notify: None, actions=Action.READ)
+    for case in cases:
+        _report(*case, namespace)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Measure the memory of observed tree nodes and notifications with tracemalloc.
+
+Run with ``python -m benchmarks.bench_memory [revision]``. The "baseline" rows use the
+ObservedList and Notify classes of todo/data/observed.py at a git revision, by default the
+one before the collections were slotted, loaded from git as a separate module.
+"""
+
+import importlib.util
+import subprocess
+import sys
+import tracemalloc
+from pathlib import Path
+from types import ModuleType
+
+from todo.data.observed import Action, Notify, ObservedList
+
+COUNT = 20_000
+BASELINE = "795236c^"
+
+
+def _baseline(revision: str) -> ModuleType:
+    """todo/data/observed.py as it was at a git revision"""
+    root = Path(__file__).resolve().parent.parent
+    source = subprocess.run(["git", "show", f"{revision}:todo/data/observed.py"], cwd=root,
+                            capture_output=True, text=True, check=True).stdout
+    spec = importlib.util.spec_from_loader("todo.data._baseline_observed", loader=None)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module  # the dataclasses of the module look it up
+    exec(compile(source, f"{revision}:todo/data/observed.py", "exec"), module.__dict__)
+    return module
+
+
+def _measure(build) -> float:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    keep = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del keep
+    return size / COUNT
+
+
+def main():
+    base = _baseline(sys.argv[1] if len(sys.argv) > 1 else BASELINE)
+    raw = [{"title": str(i), "tags": []} for i in range(COUNT)]
+    root = ObservedList(raw)
+    base_root = base.ObservedList(raw)
+
+    rows = [
+        ("node, baseline", lambda: [base.ObservedList(item) for item in raw]),
+        ("node", lambda: [ObservedList(item) for item in raw]),
+        ("cached child", lambda: [root[i] for i in range(COUNT)]),
+        ("Notify, baseline", lambda: [base.Notify(base.Action.CREATE, [i], [i], base_root) for i in range(COUNT)]),
+        ("Notify", lambda: [Notify(Action.CREATE, [i], [i], root) for i in range(COUNT)]),
+        ("Notify with old", lambda: [Notify(Action.UPDATE, [i], [i], root, [i]) for i in range(COUNT)]),
+    ]
+    for name, build in rows:
+        print(f"{name:<28}{_measure(build):>8.0f} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Measure attaching, notifying and detaching thousands of observers.
+
+Run with ``python -m benchmarks.bench_observers``. The "list" rows rebuild the registry used
+before observers were keyed by identity, which scanned the list on attach and detach.
+Observers are detached from the most recent one, the worst case of a scan.
+"""
+
+import time
+import warnings
+
+from todo.data.observed import Action, Notify, Observable, ObservedList
+
+COUNTS = (100, 1_000, 10_000)
+
+
+class _ListObservable:
+    """Registry before observers were keyed: equality scans on attach and detach"""
+
+    def __init__(self):
+        self._observers = []
+
+    def attach(self, obs):
+        for observer in self._observers:
+            if observer == obs:
+                warnings.warn("Observer already attached")
+                return
+        self._observers.append(obs)
+
+    def detach(self, obs):
+        for observer in self._observers:
+            if observer == obs:
+                self._observers.remove(obs)
+                return
+        raise ValueError("Observer not attached")
+
+    def notify(self, value):
+        for observer in self._observers:
+            observer(value)
+
+
+class _Listener:
+    def __init__(self):
+        self.seen = 0
+
+    def on_change(self, notify):
+        self.seen += 1
+
+
+def _time(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _run(name: str, observable, count: int, weak: bool = False) -> None:
+    listeners = [_Listener() for _ in range(count)]
+    notify = Notify(Action.UPDATE, [0], [0], ObservedList([0]))
+    kwargs = {"weak": True} if weak else {}
+    attach = _time(lambda: [observable.attach(listener.on_change, **kwargs) for listener in listeners])
+    send = _time(lambda: [observable.notify(notify) for _ in range(10)]) / 10
+    detach = _time(lambda: [observable.detach(listener.on_change) for listener in reversed(listeners)])
+    print(f"{name:<16}{count:>8}{attach / count * 1e9:>12.0f} ns{send / count * 1e9:>12.0f} ns"
+          f"{detach / count * 1e9:>12.0f} ns")
+
+
+def main():
+    print(f"{'':<16}{'count':>8}{'attach':>15}{'notify':>15}{'detach':>15}")
+    for count in COUNTS:
+        _run("list", _ListObservable(), count)
+        _run("keyed", Observable(), count)
+        _run("keyed, weak", Observable(), count, weak=True)
+        _run("collection", ObservedList(), count)
+
+
+if __name__ == "__main__":
+    main()
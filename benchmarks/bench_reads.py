@@ -0,0 +1,47 @@
+"""
+Compare the cost of reading an observed collection against a plain list/dict.
+
+Run with ``python -m benchmarks.bench_reads``.
+"""
+
+import timeit
+
+from todo.data.observed import Action, ObservedDict, ObservedList
+
+NUMBER = 200_000
+
+
+def _report(name: str, plain: str, observed: str, namespace: dict) -> None:
+    base = min(timeit.repeat(plain, globals=namespace, number=NUMBER, repeat=5))
+    cost = min(timeit.repeat(observed, globals=namespace, number=NUMBER, repeat=5))
+    print(f"{name:<24}{base / NUMBER * 1e9:>10.0f} ns{cost / NUMBER * 1e9:>10.0f} ns{cost / base:>8.1f}x")
+
+
+def main():
+    lst, dct = list(range(100)), {str(i): i for i in range(100)}
+    namespace = {"lst": lst, "dct": dct, "olst": ObservedList(lst), "odct": ObservedDict(dct)}
+    cases = [
+        ("list[i]", "lst[50]", "olst[50]"),
+        ("len(list)", "len(lst)", "len(olst)"),
+        ("x in list", "50 in lst", "50 in olst"),
+        ("bool(list)", "bool(lst)", "bool(olst)"),
+        ("dict[k]", "dct['50']", "odct['50']"),
+        ("dict.get(k)", "dct.get('50')", "odct.get('50')"),
+        ("dict.keys()", "dct.keys()", "odct.keys()"),
+        ("dict.items()", "dct.items()", "odct.items()"),
+    ]
+
+    print(f"{'':<24}{'plain':>13}{'observed':>13}{'ratio':>9}")
+    print("-- no READ subscriber")
+    for case in cases:
+        _report(*case, namespace)
+
+    print("-- READ subscriber on the root")
+    namespace["olst"].attach(lambda notify: None, actions=Action.READ)
+    namespace["odct"].attach(lambda notify: None, actions=Action.READ)
+    for case in cases:
+        _report(*case, namespace)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Measure the cost of changing an item of a list while a YamlFileObserver is attached.
+
+Run with ``python -m benchmarks.bench_snapshot``. The "snapshot per change" row attaches an
+observer taking a snapshot on every notification, as the write-behind mode did before the
+snapshot moved to the write: the next change then copies the list.
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+from todo.data.observed import ObservedList
+from todo.data.observers import YamlFileObserver
+
+SIZES = (1_000, 10_000, 100_000)
+CHANGES = 2_000
+
+
+def _per_change(lst: ObservedList) -> float:
+    start = time.perf_counter()
+    for i in range(CHANGES):
+        lst[i % len(lst)] = i
+    return (time.perf_counter() - start) / CHANGES
+
+
+def main():
+    directory = Path(tempfile.mkdtemp())
+    print(f"{'items':>8}{'no observer':>16}{'write-behind':>16}{'snapshot per change':>22}")
+    for size in SIZES:
+        bare = ObservedList(list(range(size)))
+
+        # a delay longer than the run: the changes are measured, not the write
+        observer = YamlFileObserver(list(range(size)), directory / f"data-{size}.yaml", delay=3600)
+        behind = observer.to_observable()
+
+        copying = ObservedList(list(range(size)))
+        copying.attach(lambda notify: copying.snapshot())
+
+        times = [_per_change(lst) * 1e6 for lst in (bare, behind, copying)]
+        print(f"{size:>8}" + "".join(f"{t:>{w}.2f} us" for t, w in zip(times, (13, 13, 19))))
+        observer.flush()
+
+
+if __name__ == "__main__":
+    main()
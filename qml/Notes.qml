@@ -10,6 +10,16 @@ Item {
     property var controller
     property var model
 
+    Shortcut {
+        sequence: StandardKey.Undo
+        onActivated: controller.undo()
+    }
+
+    Shortcut {
+        sequence: StandardKey.Redo
+        onActivated: controller.redo()
+    }
+
     ColumnLayout {
         anchors.margins: 16
         anchors.fill: parent
@@ -7,6 +7,17 @@ import "components"
 Item {
     id: root
     property alias model: listView.model
+    property var controller
+
+    Shortcut {
+        sequence: StandardKey.Undo
+        onActivated: controller.undo()
+    }
+
+    Shortcut {
+        sequence: StandardKey.Redo
+        onActivated: controller.redo()
+    }
 
     ColumnLayout {
         anchors {
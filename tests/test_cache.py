@@ -0,0 +1,55 @@
+import os
+from pathlib import Path
+
+from todo.data.cache import SnapshotCache
+from todo.data.codecs import YamlCodec
+from todo.data.observers import YamlFileObserver
+
+
+class _CountingCodec(YamlCodec):
+    def __init__(self):
+        self.parsed = 0
+
+    def loads(self, data):
+        self.parsed += 1
+        return super().loads(data)
+
+
+def _load(path, cache):
+    codec = _CountingCodec()
+    YamlFileObserver._instance_cache.pop(path, None)
+    data = YamlFileObserver({}, path, codec=codec, cache=cache).load()
+    return data, codec.parsed
+
+
+def test_warm_start(tmp_path):
+    path, cache = tmp_path / "config.yaml", SnapshotCache(tmp_path / "cache")
+    observer = YamlFileObserver({}, path, cache=cache)
+    root = observer.to_observable()
+    root["paths"] = {"db": Path("todo.db")}
+    root["tags"] = {"a", "b"}
+    assert _load(path, cache) == (root.to_data(), 1)  # the writes leave the cache alone
+
+    root["tags"].add("c")
+    observer.close()
+    assert _load(path, cache) == (root.to_data(), 0)
+
+    # edited by hand, keeping the size and the mtime
+    stat = path.stat()
+    path.write_bytes(path.read_bytes().replace(b"todo.db", b"todo.xx"))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    data, parsed = _load(path, cache)
+    assert data["paths"]["db"] == Path("todo.xx") and parsed == 1
+    assert _load(path, cache) == (data, 0)
+
+
+def test_fallback(tmp_path):
+    path, cache = tmp_path / "config.yaml", SnapshotCache(tmp_path / "cache")
+    path.write_text("a: 1\n", encoding="utf-8")
+    assert _load(path, cache) == ({"a": 1}, 1)
+    for snapshot in cache.directory.iterdir():
+        snapshot.write_bytes(snapshot.read_bytes()[:-1])
+    assert _load(path, cache) == ({"a": 1}, 1)
+    cache.invalidate(path)
+    assert _load(path, cache) == ({"a": 1}, 1)
+    assert _load(path, cache) == ({"a": 1}, 0)
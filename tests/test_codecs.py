@@ -0,0 +1,71 @@
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from todo.data.codecs import BinaryCodec, JsonLinesCodec, PickleCodec, YamlCodec, codec_for
+from todo.data.data import NoteItem, TodoItem
+from todo.data.observed import ObservedDict, ObservedList
+from todo.data.observers import YamlFileObserver
+from todo.error import CodecError
+
+CODECS = [YamlCodec(), JsonLinesCodec(), BinaryCodec(), PickleCodec()]
+
+ITEMS = [
+    TodoItem("a", created_date=datetime(2024, 1, 2, 3, 4, 5, 6)),
+    TodoItem("b", "c", True, Path("/x/y.png"), datetime(2024, 2, 3), datetime(1969, 12, 31, 23, 59)),
+    NoteItem("$ note", Path("rel")),
+]
+DATA = {
+    "items": ITEMS,
+    "nested": {"$": 1, 2: [(1, "a"), {"x"}, None, -(1 << 70), 0.5, b"\0"]},
+    "aware": datetime(2024, 1, 1, tzinfo=timezone.utc),
+}
+
+
+@pytest.mark.parametrize("codec", CODECS, ids=repr)
+def test_round_trip(codec):
+    assert codec.loads(codec.dumps(DATA)) == DATA
+    assert codec.loads(codec.dumps(ITEMS)) == ITEMS
+    assert codec.loads(codec.dumps(ObservedList([ObservedDict({"a": 1})]))) == [{"a": 1}]
+    assert codec.loads(b"") is None
+
+
+def test_yaml_tags():
+    text = YamlCodec().dumps(ITEMS[1:]).decode()
+    assert "!TodoItem" in text and "!path /x/y.png" in text and "python" not in text
+    assert "description" not in YamlCodec().dumps([TodoItem("a")]).decode()
+
+
+def test_legacy_yaml():
+    legacy = b"""
+- !!python/object:todo.data.data.TodoItem
+  title: a
+  completed: true
+  created_date: 2024-01-02 03:04:05
+  photo: !!python/object/apply:pathlib.PosixPath [/, x, y.png]
+- !!python/tuple [1, 2]
+"""
+    assert YamlCodec().loads(legacy) == [
+        TodoItem("a", completed=True, photo=Path("/x/y.png"), created_date=datetime(2024, 1, 2, 3, 4, 5)), (1, 2)]
+    with pytest.raises(CodecError):
+        YamlCodec().loads(b"!!python/object/apply:os.system [echo]")
+    with pytest.raises(CodecError):
+        YamlCodec().dumps([object()])
+
+
+def test_unsafe_pickle():
+    import pickle
+    with pytest.raises(CodecError):
+        PickleCodec().loads(pickle.dumps(ObservedList))
+
+
+def test_observer_format(tmp_path):
+    path = tmp_path / "notes.jsonl"
+    assert isinstance(codec_for(path), JsonLinesCodec) and isinstance(codec_for("a.yaml"), YamlCodec)
+    notes = YamlFileObserver([], path).to_observable()
+    notes.append(NoteItem("a"))
+    notes.append(NoteItem("b"))
+    assert path.read_text(encoding="utf-8").splitlines() == ['{"$":"NoteItem","text":"a"}',
+                                                             '{"$":"NoteItem","text":"b"}']
+    assert YamlFileObserver([], path).load() == [NoteItem("a"), NoteItem("b")]
@@ -0,0 +1,59 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from todo.data.columnar import ColumnarList
+from todo.data.observed import ObservedList
+from todo.data.undo import UndoManager
+
+
+@dataclass(frozen=True)
+class Item:
+    title: str
+    done: bool = False
+    due: Optional[datetime] = None
+    tags: tuple = ()
+
+
+def test_same_notifications():
+    items = [Item(str(i % 3), i % 2 == 0, datetime(2024, 1, 1 + i) if i % 4 else None, ("x",)) for i in range(12)]
+    columnar, plain = ColumnarList(Item, items), ObservedList(list(items))
+    changes = [], []
+    for lst, seen in zip((columnar, plain), changes):
+        lst.attach(lambda notify, seen=seen: seen.append(
+            (notify.action, notify.index, notify.value, notify.old, notify.fields)))
+    history = UndoManager(columnar)
+
+    for lst in columnar, plain:
+        lst.append(items[0])
+        lst.pop(3)
+        lst.sort(key=lambda item: item.title)
+        lst.move(0, 4, 2)
+        lst.set_fields(1, title="new", done=True)
+        lst[2:5] = [items[5]]
+        with lst.batch():
+            lst.insert(0, items[7])
+            lst.reverse()
+    assert list(columnar) == plain.to_data()
+    assert changes[0] == changes[1]
+
+    while history.undo():
+        pass
+    assert list(columnar) == items
+    assert columnar.digest == ColumnarList(Item, items).digest
+
+
+def test_scans():
+    items = [Item("a" if i % 3 else "b", i % 2 == 0, datetime(2024, 1, 1 + i) if i % 4 else None) for i in range(12)]
+    lst = ColumnarList(Item, items)
+    assert int(lst.column("done").sum()) == 6
+    assert np.flatnonzero(lst.column("due") < np.datetime64(datetime(2024, 1, 4))).tolist() == [1, 2]
+    assert lst.equals("title", "b").sum() == 4 and not lst.equals("title", "c").any()
+    assert lst.column("title").tolist() == [item.title for item in items]
+    assert not lst.column("done").flags.writeable
+
+    snapshot = lst.snapshot()
+    lst.set_fields(0, done=False)
+    assert snapshot.data[0].done and not lst[0].done
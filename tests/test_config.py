@@ -0,0 +1,35 @@
+import dataclasses
+from pathlib import Path
+
+import pytest
+
+from todo.data.config import ConfigSnapshot
+from todo.data.observed import ObservedDict
+
+
+def test_snapshot():
+    defaults = {"logging": {"level": "DEBUG", "path": Path("todo.log")}, "integrations": {}}
+    config = ObservedDict({"logging": {"level": "INFO"}, "extra": 1})
+    snapshots = ConfigSnapshot(config, defaults)
+    swapped = []
+    snapshots.attach(swapped.append)
+
+    first = snapshots.current
+    assert first.logging.level == "INFO" and first.logging.path == Path("todo.log")
+    assert first.integrations == {} and not hasattr(first, "extra")
+    assert [f.type for f in dataclasses.fields(first.logging)] == [str, Path]
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        first.logging.level = "DEBUG"
+
+    config["extra"] = 2
+    assert snapshots.current is first and swapped == []
+    config["logging"]["level"] = "WARNING"
+    config.setdefault("integrations", {})["X"] = {"a": [1]}
+    assert len(swapped) == 2 and swapped[-1] is snapshots.current
+    assert snapshots.current.logging.level == "WARNING"
+    assert snapshots.current.integrations["X"]["a"] == (1,)
+    assert first.logging.level == "INFO"
+
+    snapshots.close()
+    config["logging"]["level"] = "ERROR"
+    assert snapshots.current.logging.level == "WARNING"
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+import pytest
+
+from todo.data.dispatch import AsyncioDispatcher, ThreadDispatcher
+from todo.data.observed import ObservedDict, ObservedList
+from todo.error import DispatchError
+
+
+def test_thread_dispatcher():
+    dispatcher = ThreadDispatcher(workers=2)
+    changes, threads = [], set()
+
+    def callback(notify):
+        threads.add(threading.current_thread())
+        changes.append((notify.path, notify.index))
+
+    dct = ObservedDict({"a": [], "b": []})
+    dct.attach(callback, dispatcher=dispatcher)
+    for i in range(100):
+        dct["a"].append(i)
+    dct["b"].append(0)
+    assert dispatcher.flush(timeout=5)
+    assert changes == [(("a",), [i]) for i in range(100)] + [(("b",), [0])]
+    assert threading.current_thread() not in threads
+
+    dct.detach(callback)
+    dct["b"].append(1)
+    assert dispatcher.flush(timeout=5)
+    assert len(changes) == 101
+    dispatcher.close()
+    with pytest.raises(DispatchError):
+        dispatcher.submit(callback, None)
+
+
+def test_backpressure():
+    dispatcher = ThreadDispatcher(maxsize=1, timeout=0.1)
+    release = threading.Event()
+    ol = ObservedList([])
+    ol.attach(lambda notify: release.wait(), dispatcher=dispatcher)
+
+    with pytest.raises(DispatchError):
+        # one notification blocks the worker, one fills the queue, the next one times out
+        for i in range(10):
+            ol.append(i)
+    release.set()
+    assert dispatcher.flush(timeout=5)
+    dispatcher.close()
+
+
+def test_asyncio_dispatcher():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    dispatcher = AsyncioDispatcher(loop)
+    changes = []
+    ol = ObservedList([])
+    ol.attach(lambda notify: changes.append(notify.index), dispatcher=dispatcher)
+    for i in range(10):
+        ol.append(i)
+    assert dispatcher.flush(timeout=5)
+    assert changes == [[i] for i in range(10)]
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+
+import pytest
+
+from todo.data.observed import ObservedList
+
+
+@dataclass(frozen=True)
+class Item:
+    title: str
+    due: int = 0
+
+
+def test_hash_index():
+    lst = ObservedList([Item("a"), Item("b"), Item("a", 1)])
+    by_title = lst.create_index("title")
+    assert by_title.lookup("a") == [Item("a"), Item("a", 1)]
+
+    lst.remove(by_title.first("b"))
+    lst[0] = Item("c")
+    lst.append(Item("b", 2))
+    lst.sort(key=lambda item: item.due, reverse=True)
+    assert by_title.lookup("a") == [Item("a", 1)]
+    assert by_title.lookup("b") == [Item("b", 2)]
+    assert "c" in by_title and sorted(by_title.keys()) == ["a", "b", "c"]
+
+    lst.clear()
+    assert by_title.keys() == [] and by_title.first("a") is None
+
+
+def test_sorted_index():
+    lst = ObservedList([{"due": 5}, {"due": 1}, {"due": 3}])
+    by_due = lst.create_index(lambda item: item["due"], kind="sorted")
+    assert by_due.range(2, 5) == [{"due": 3}]
+    assert by_due.range(2, 5, inclusive=True) == [{"due": 3}, {"due": 5}]
+
+    lst[1]["due"] = 4
+    lst.extend([{"due": 0}, {"due": 4}])
+    assert by_due.lookup(4) == [{"due": 4}, {"due": 4}]
+    assert by_due.range(hi=4) == [{"due": 0}, {"due": 3}]
+    assert by_due.range(lo=5) == [{"due": 5}]
+
+    with pytest.raises(ValueError):
+        lst.create_index("due", kind="btree")
+
+
+def test_positions():
+    lst = ObservedList([Item("a"), Item("b", 1), Item("a", 2), Item("c", 3)])
+    by_title = lst.create_index("title")
+    by_due = lst.create_index("due", kind="sorted")
+
+    def check():
+        for title in "abcd":
+            assert sorted(by_title.lookup(title), key=lambda item: item.due) == \
+                sorted((item for item in lst if item.title == title), key=lambda item: item.due)
+        assert sorted(by_title.keys()) == sorted({item.title for item in lst})
+        assert by_due.range() == sorted(lst, key=lambda item: item.due)
+
+    changes = [
+        lambda: lst.pop(-1),
+        lambda: lst.__setitem__(-1, Item("d", 4)),
+        lambda: lst.__setitem__(slice(1, 3), [Item("b", 5)]),
+        lambda: lst.__setitem__(slice(-1, None), [Item("a", 6), Item("c", 7), Item("a", 8)]),
+        lambda: lst.insert(-2, Item("d", 9)),
+        lambda: lst.insert(20, Item("b", 10)),
+        lambda: lst.__delitem__(slice(-3, None)),
+        lambda: lst.__delitem__(-1),
+    ]
+    for change in changes:
+        change()
+        check()
@@ -0,0 +1,116 @@
+from todo.data.journal import JournalFileObserver
+from todo.data.observed import ObservedDict
+
+
+def _reopen(path, **kwargs):
+    return JournalFileObserver({}, path, **kwargs).to_observable()
+
+
+def test_replay(tmp_path):
+    path = tmp_path / "data.yaml"
+    journal = JournalFileObserver({"todos": []}, path)
+    root = journal.to_observable()
+    root["todos"].append({"title": "a", "tags": {"x"}})
+    root["todos"].extend([{"title": "b"}, {"title": "c"}])
+    root["todos"][0]["title"] = "A"
+    root["todos"][0]["tags"].add("y")
+    root["todos"][1:3] = [{"title": "d"}]
+    root["todos"].sort(key=lambda todo: todo["title"], reverse=True)
+    with root.batch():
+        root["todos"].append({"title": "e"})
+        root["todos"][0]["title"] = "D"
+        root["todos"].reverse()
+    del root["todos"][::2]
+    root["done"] = 1
+    del root["done"]
+    journal.close()
+
+    assert _reopen(path) == root.to_data()
+    text = path.read_text(encoding="utf-8")
+    assert text.startswith("# journal generation 0\n") and "A" not in text
+
+
+def test_replay_nested_batch(tmp_path):
+    path = tmp_path / "data.yaml"
+    journal = JournalFileObserver({"todos": [[1], 2]}, path)
+    root = journal.to_observable()
+    todos = root["todos"]
+    with root.batch():
+        todos.append(3)
+        todos[0].append(5)
+        todos.pop(1)
+    journal.close()
+
+    assert root.to_data() == {"todos": [[1, 5], 3]}
+    assert _reopen(path) == {"todos": [[1, 5], 3]}
+
+
+def test_compaction(tmp_path):
+    path = tmp_path / "data.yaml"
+    journal = JournalFileObserver({"n": 0, "items": []}, path, compact_at=200)
+    root = journal.to_observable()
+    for i in range(50):
+        root["n"] = i
+        root["items"].append(i)
+    journal.compact()
+    assert path.read_text(encoding="utf-8").startswith(f"# journal generation {journal._generation}\n")
+    assert [number for number, _ in journal._logs()] == [journal._generation]
+    root["items"].pop(0)
+    journal.close()
+    assert _reopen(path) == {"n": 49, "items": list(range(1, 50))}
+
+
+def test_crash(tmp_path):
+    path = tmp_path / "data.yaml"
+    journal = JournalFileObserver({"items": []}, path)
+    root = journal.to_observable()
+    root["items"].append(1)
+    with journal._lock:
+        journal._rotate()
+        journal._compaction = None  # as if the process died before compacting
+    root["items"].append(2)
+    journal.close()
+    with open(journal._log_path(1), "ab") as file:
+        file.write(b"\x10\x00\x00\x00torn")
+
+    reopened = JournalFileObserver({}, path)
+    assert reopened.to_observable() == {"items": [1, 2]}
+    reopened.compact()
+    reopened.close()
+    assert [number for number, _ in reopened._logs()] == [2]
+    assert _reopen(path) == {"items": [1, 2]}
+    assert isinstance(_reopen(path), ObservedDict)
+
+
+def test_replay_negative_positions(tmp_path):
+    path = tmp_path / "data.yaml"
+    journal = JournalFileObserver({"items": [1, 2, 5]}, path)
+    root = journal.to_observable()
+    items = root["items"]
+    items.insert(-1, 9)
+    items.insert(50, 7)
+    items.pop(-2)
+    items[-2:] = [3, 4, 6]
+    journal.close()
+    assert items == [1, 2, 3, 4, 6]
+    assert _reopen(path) == {"items": [1, 2, 3, 4, 6]}
+
+
+def test_failed_compaction(tmp_path, monkeypatch):
+    path = tmp_path / "data.yaml"
+    journal = JournalFileObserver({"items": []}, path, compact_at=100)
+
+    def fail(generation, data):
+        raise TypeError("cannot encode")
+
+    root = journal.to_observable()
+    monkeypatch.setattr(journal, "_write_snapshot", fail)
+    for i in range(30):
+        root["items"].append(i)
+    with journal._lock:
+        journal._cond.wait_for(lambda: not journal._compacting and journal._compaction is None, timeout=5)
+    assert journal._thread.is_alive()
+    root["items"].append(30)
+    journal.close()
+    assert not journal._thread.is_alive()
+    assert _reopen(path) == {"items": list(range(31))}
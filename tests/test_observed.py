@@ -1,7 +1,11 @@
+import dataclasses
+import gc
+import threading
+
 import pytest
 
 from todo.data.observed import ObservedDict, ObservedDot, ObservedList, \
-    observable, Notify, ALL
+    observable, Notify, Action, ALL
 
 
 def test_observe_wrap():
@@ -17,7 +21,7 @@ def test_observable_list():
         changes.append(idx.index)
 
     ol = ObservedList([])
-    ol.attach(callback)
+    ol.attach(callback, actions=list(Action))
 
     # because persistent storage is active, we need to clear the file
 
@@ -81,7 +85,8 @@ def test_attr_dct():
         changes.append(notify.index)
 
     dct.attach(callback)
-    dct.a = 3
+    with pytest.raises(AttributeError):
+        dct.a = 3  # nodes are slotted, attribute access needs ObservedDot
 
     dct = ObservedDot(dct)
     with pytest.warns(UserWarning):
@@ -109,3 +114,441 @@ def test_nested():
     assert dct == {"a": 1, "b": (1, [1, 2])}
     dct.b[1].append(3)
     assert dct == {"a": 1, "b": (1, [1, 2, 3])}
+
+
+def test_dot_cache():
+    dct = ObservedDot({"a": {"b": 1}, "c": [1]})
+    child = dct.a
+    assert dct.a is child and dct["a"] is child
+    dct.a.b = 2
+    assert dct.a is child and dct.to_data() == {"a": {"b": 2}, "c": [1]}
+
+    dct.a = {"b": 3}
+    assert dct.a is not child and dct.a.b == 3
+    reads = []
+    child = dct.a
+    dct.attach(reads.append, actions=Action.READ)
+    assert dct.a.b == 3 and reads
+    reads.clear()
+    assert child["b"] == 3 and reads  # cached before the subscriber was attached
+
+    dct.detach(reads.append)
+    reads.clear()
+    assert dct.a.b == 3 and child["b"] == 3 and not reads
+
+    changes = []
+    dct.attach(changes.append)
+    dct["c"] = [2]
+    lst = dct["c"]
+    assert dct.c is lst and lst.to_data() == [2]
+    lst.append(3)  # resolved without the read wrapper, still notifying its parent
+    assert dct.to_data()["c"] == [2, 3] and changes[-1].action == Action.CREATE
+    with pytest.raises(KeyError):
+        dct["d"]
+    with pytest.raises(AttributeError):
+        dct.d
+
+
+def test_batch():
+    changes = []
+    ol = ObservedList([])
+    ol.attach(changes.append)
+
+    with ol.batch():
+        for i in range(5):
+            ol.append(i)
+        ol[0] = 10
+        assert changes == []
+    assert [(n.action, n.index) for n in changes] == [
+        (Action.CREATE, [slice(0, 5)]),
+        (Action.UPDATE, [0]),
+    ]
+    assert changes[0].value == [0, 1, 2, 3, 4]
+
+
+def test_batch_nested():
+    changes = []
+    dct = ObservedDict({"a": {"b": 1}, "c": []})
+    dct.attach(changes.append)
+
+    with dct.batch():
+        with dct.get("a").batch():
+            dct.get("a")["b"] = 2
+            dct.get("a")["d"] = 3
+        dct.get("c").extend([1, 2])
+        dct.get("c").append(3)
+    assert [(n.action, n.index) for n in changes] == [
+        (Action.UPDATE, ["b", "d"]),
+        (Action.CREATE, [slice(0, 3)]),
+    ]
+    assert dct == {"a": {"b": 2, "d": 3}, "c": [1, 2, 3]}
+
+
+def test_batch_shifted_positions():
+    changes = []
+    ol = ObservedList([1, 2])
+    ol.attach(changes.append)
+
+    with ol.batch():
+        ol.insert(0, "a")
+        ol.insert(0, "b")
+    assert [(n.action, n.index, n.value) for n in changes] == [(Action.CREATE, [slice(0, 2)], ["b", "a"])]
+
+    changes.clear()
+    with ol.batch():
+        ol.pop(0)
+        ol.append(9)
+        ol.pop(0)
+    assert ol == [1, 2, 9]
+    assert [(n.action, n.index, n.value) for n in changes] == [
+        (Action.DELETE, [slice(0, 2)], ["b", "a"]),
+        (Action.CREATE, [2], [9]),
+    ]
+    assert all(n.merged and n.old == [["b", "a", 1, 2]] for n in changes)
+
+
+def test_batch_rollback():
+    changes = []
+    dct = ObservedDict({"a": [1, 2], "b": 1})
+    dct.attach(changes.append)
+
+    with pytest.raises(RuntimeError):
+        with dct.batch():
+            dct["b"] = 2
+            dct.get("a").clear()
+            dct.pop("b")
+            raise RuntimeError
+    assert changes == []
+    assert dct == {"a": [1, 2], "b": 1}
+
+
+def test_read_subscription():
+    writes, reads = [], []
+    dct = ObservedDict({"a": [1, 2]})
+    dct.attach(writes.append)
+
+    assert len(dct) == 1 and "a" in dct and dct.get("a") == [1, 2]
+    assert writes == []
+    dct.attach(reads.append, actions=Action.READ)
+    assert dct.get("a")[0] == 1
+    assert [n.index for n in reads] == [["a"], [0]]
+    dct.get("a").append(3)
+    assert [n.action for n in writes] == [Action.CREATE]
+
+
+def test_read_subscription_changes():
+    reads = []
+    dct = ObservedDict({"a": {"b": [1]}})
+    b = dct["a"]["b"]
+    dct.attach(reads.append, actions=Action.READ)
+    assert b[0] == 1 and [n.index for n in reads] == [[0]]
+
+    dct.detach(reads.append)
+    b[0]
+    dct["a"].attach(reads.append, actions="read")
+    b[0]
+    moved = dct["a"].pop("b")
+    moved[0]
+    assert [n.index for n in reads] == [[0], [0]]
+
+
+def test_cached_children():
+    changes = []
+    dct = ObservedDict({"a": {"b": []}, "c": [[1], [2]]})
+    child = dct["a"]["b"]
+    assert child is dct["a"]["b"] is dct.get("a").get("b")
+    child.attach(changes.append)
+    dct["a"]["b"].append(1)
+    assert [n.index for n in changes] == [[0]]
+
+    first = dct["c"][0]
+    dct["c"].reverse()
+    assert dct["c"][1] is first
+
+    old = dct["a"]
+    dct["a"] = {"b": []}
+    assert dct["a"] is not old
+    assert old.parent is None
+    dct["c"].clear()
+    assert first.parent is None
+
+
+def test_cached_children_without_reference():
+    changes = []
+    dct = ObservedDict({"n": {}, "l": [[1]]})
+    dct["n"].attach(changes.append)
+    dct["l"][0].attach(changes.append)
+    gc.collect()
+    dct["n"]["x"] = 1
+    dct["l"][0].append(2)
+    assert [n.index for n in changes] == [["x"], [1]]
+
+    # dropped with the data they wrap
+    dct["n"] = {}
+    dct["l"].pop(0)
+    assert list(dct._children.values()) == [dct["l"]] and not dct["l"]._children
+    with pytest.raises(RuntimeError):
+        with dct.batch():
+            dct["l"].append([3])
+            dct["l"][0].attach(changes.append)
+            raise RuntimeError
+    assert dct == {"n": {}, "l": []} and not dct["l"]._children
+
+
+def test_path():
+    changes = []
+    root = ObservedDict({"integrations": {"X": {"username": "a", "password": "b"}}, "todo_list": [1, 2, 3, 4]})
+    root.attach(changes.append)
+    root["integrations"]["X"]["password"] = "c"
+    root["todo_list"][3] = 5
+    assert [(n.path, n.index) for n in changes] == [(("integrations", "X"), ["password"]), (("todo_list",), [3])]
+
+
+def test_path_prefix():
+    password, item = [], []
+    root = ObservedDict({"integrations": {"X": {"username": "a", "password": "b"}}, "todo_list": [1, 2, 3, 4]})
+    root.attach(password.append, path_prefix="integrations.X.password")
+    root.attach(item.append, path_prefix=("todo_list", 3))
+
+    root["integrations"]["X"]["username"] = "c"
+    root["todo_list"][2] = 0
+    assert password == item == []
+    root["integrations"]["X"]["password"] = "d"
+    root["integrations"] = {}
+    root["todo_list"][3] = 0
+    root["todo_list"].clear()
+    assert [n.index for n in password] == [["password"], ["integrations"]]
+    assert [n.index for n in item] == [[3], [ALL]]
+
+    root.detach(password.append)
+    root["integrations"] = {}
+    assert len(password) == 2
+
+
+def test_weak_observers():
+    class Listener:
+        def __init__(self):
+            self.changes = []
+
+        def on_change(self, notify):
+            self.changes.append(notify.index)
+
+    lst = ObservedList([1])
+    kept, dropped = Listener(), Listener()
+    lst.attach(kept.on_change, weak=True)
+    lst.attach(dropped.on_change, weak=True, path_prefix=(0,))
+    lst[0] = 2
+    assert kept.changes == dropped.changes == [[0]]
+
+    del dropped
+    gc.collect()
+    assert len(lst.observers) == 1
+    assert lst._trie.mask == 0
+    lst.append(3)
+    assert kept.changes == [[0], [1]]
+
+    # bound methods are recreated on access, they are still found by identity
+    lst.detach(kept.on_change)
+    with pytest.raises(ValueError):
+        lst.detach(kept.on_change)
+    lst.append(4)
+    assert kept.changes == [[0], [1]]
+
+
+def test_assign():
+    changes = []
+    lst = ObservedList([("a", 1), ("b", 1), ("c", 1), ("d", 1)])
+    lst.attach(changes.append)
+
+    lst.assign([("b", 1), ("c", 2), ("e", 1), ("f", 1), ("d", 1), ("a", 1)], key=lambda item: item[0])
+    assert lst == [("b", 1), ("c", 2), ("e", 1), ("f", 1), ("d", 1), ("a", 1)]
+    assert [(n.action, n.index, n.value) for n in changes] == [
+        (Action.MOVE, [0], [3]),
+        (Action.CREATE, [slice(2, 4)], [("e", 1), ("f", 1)]),
+        (Action.UPDATE, [1], [("c", 2)]),
+    ]
+
+    changes.clear()
+    lst.assign([("c", 2), ("a", 1)], key=lambda item: item[0])
+    assert lst == [("c", 2), ("a", 1)]
+    assert [(n.action, n.index) for n in changes] == [(Action.DELETE, [slice(2, 5)]), (Action.DELETE, [0])]
+
+    changes.clear()
+    lst.assign(lst.to_data())
+    assert changes == []
+
+
+def test_move():
+    changes = []
+    lst = ObservedList([3, 1, 2, 0])
+    lst.attach(changes.append)
+
+    lst.sort()
+    lst.sort()
+    assert lst == [0, 1, 2, 3]
+    assert [(n.action, n.index, n.value) for n in changes] == [(Action.MOVE, [ALL], [3, 1, 2, 0])]
+
+    changes.clear()
+    lst.move(0, 2, 2)
+    lst.move(3, 0)
+    lst.reverse()
+    assert lst == [0, 3, 2, 1]
+    assert [(n.index, n.value) for n in changes] == [([slice(0, 2)], [2]), ([3], [0]), ([ALL], [3, 2, 1, 0])]
+    with pytest.raises(IndexError):
+        lst.move(3, 0, 2)
+
+    changes.clear()
+    with lst.batch():
+        lst.move(0, 1)
+        lst.move(2, 3)
+    assert [(n.action, n.index, n.value) for n in changes] == [(Action.MOVE, [ALL], None)]
+
+
+def test_version():
+    changes = []
+    dct = ObservedDict({"a": {"b": 1}, "c": [1, 2]})
+    dct.attach(changes.append)
+    a, c = dct["a"], dct["c"]
+    start = dct.version
+    assert dct.changed_since(start) == []
+
+    a["b"] = 2
+    assert dct.changed_since(start) == ["a"] and a.changed_since(start) == ["b"]
+    assert changes[-1].version == dct.version == a.version > start
+
+    before = dct.version
+    c[0] = 3
+    assert dct.changed_since(before) == ["c"] and c.changed_since(before) == [0]
+    assert a.version == before < c.version
+    c.append(4)
+    assert c.changed_since(before) == [ALL]
+
+    before = dct.version
+    with dct.batch():
+        dct["d"] = 1
+        a["e"] = 2
+    assert sorted(dct.changed_since(before)) == ["a", "d"]
+    assert max(n.version for n in changes[-2:]) == dct.version
+
+
+def test_digest():
+    dct = ObservedDict({"a": [1, {"b": (2, 3)}], "c": {4, 5}})
+    same = ObservedDict({"c": {5, 4}, "a": [1, {"b": (2, 3)}]})
+    assert dct.digest == same.digest
+    assert dct["a"].digest == ObservedList([1, {"b": (2, 3)}]).digest
+    assert ObservedList([1, 2]).digest != ObservedList([2, 1]).digest != ObservedList(["1", 2]).digest
+
+    dct["a"][1]["b"] = (2, 4)
+    assert dct.digest != same.digest
+    dct["a"][1]["b"] = (2, 3)
+    assert dct.digest == same.digest
+
+
+def test_digest_of_records():
+    @dataclasses.dataclass
+    class Record:
+        title: str
+        tags: list = dataclasses.field(repr=False)
+
+    class Opaque:
+        def __init__(self, value):
+            self.value = value
+
+        def __repr__(self):
+            return "Opaque()"
+
+    assert ObservedList([Record("a", ["x"])]).digest == ObservedList([Record("a", ["x"])]).digest
+    assert ObservedList([Record("a", ["x"])]).digest != ObservedList([Record("a", ["y"])]).digest
+    assert ObservedList([Opaque(1)]).digest is None
+    assert ObservedDict({"a": [Opaque(1)]}).digest is None
+
+
+def test_snapshot():
+    dct = ObservedDict({"a": {"b": [1, 2]}, "c": [3]})
+    b = dct["a"]["b"]
+    before = dct.snapshot()
+    assert before.data is dct._data and before.version == dct.version
+
+    b.append(3)
+    dct["c"].append(4)
+    assert before.data == {"a": {"b": [1, 2]}, "c": [3]}
+    assert dct == {"a": {"b": [1, 2, 3]}, "c": [3, 4]}
+
+    after = dct.snapshot()
+    dct["d"] = 1
+    b.append(5)
+    assert after.data == {"a": {"b": [1, 2, 3]}, "c": [3, 4]}
+    assert after.data["c"] is dct._data["c"]
+    assert dct["a"]["b"] is b and b == [1, 2, 3, 5]
+
+    with pytest.raises(RuntimeError):
+        with dct.batch():
+            dct["c"].clear()
+            raise RuntimeError
+    assert dct["c"] == [3, 4] and after.data["c"] == [3, 4]
+
+
+def test_synchronized_stress():
+    writers, readers, rounds = 8, 8, 300
+    root = ObservedDict({"todo": [], "count": 0}).synchronize()
+    created, errors = [], []
+    root.attach(lambda notify: created.append(notify) if notify.action is Action.CREATE else None)
+    done = threading.Event()
+
+    def write(n):
+        for i in range(rounds):
+            with root.batch():
+                root["count"] = root["count"] + 1
+                root["todo"].append((n, i))
+            if i % 10 == 0:
+                with root.batch():
+                    root["todo"].remove((n, i))
+                    root["count"] = root["count"] - 1
+
+    def read():
+        while not done.is_set():
+            with root.lock.read():
+                if root["count"] != len(root["todo"]):
+                    errors.append((root["count"], len(root["todo"])))
+
+    threads = [threading.Thread(target=read) for _ in range(readers)]
+    threads += [threading.Thread(target=write, args=(n,)) for n in range(writers)]
+    [t.start() for t in threads]
+    [t.join() for t in threads[readers:]]
+    done.set()
+    [t.join() for t in threads[:readers]]
+
+    assert errors == []
+    assert root["count"] == len(root["todo"]) == writers * rounds * 9 // 10
+    assert len(created) == writers * rounds
+
+
+def test_set_fields():
+    @dataclasses.dataclass(frozen=True)
+    class Item:
+        title: str
+        done: bool = False
+        tags: tuple = ()
+
+    lst = ObservedList([Item("a", tags=("x",)), Item("b")])
+    changes = []
+    lst.attach(changes.append)
+    first = lst[0]
+    lst.set_fields(0, done=True)
+    assert lst[0] == Item("a", True, ("x",)) and first.done is False
+    assert lst[0].tags is first.tags
+    assert [(n.action, n.index, n.fields, n.old) for n in changes] == [(Action.UPDATE, [0], ("done",), [first])]
+
+    lst.set_fields(0, done=True)
+    assert len(changes) == 1
+    with pytest.raises(TypeError):
+        lst.set_fields(1, missing=1)
+
+    with lst.batch():
+        lst.set_fields(1, title="B")
+        lst.set_fields(1, done=True)
+    assert changes[-1].fields == ("title", "done")
+    with lst.batch():
+        lst.set_fields(1, title="C")
+        lst[1] = Item("D")
+    assert changes[-1].fields is None
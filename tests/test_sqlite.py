@@ -0,0 +1,131 @@
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from todo.data.codecs import register_record
+from todo.data.journal import JournalFileObserver
+from todo.data.sqlite import SqliteDatabase
+
+
+@register_record(name="SqliteItem")
+@dataclass(frozen=True)
+class Item:
+    title: str
+    done: bool = False
+    photo: Optional[Path] = None
+    due: Optional[datetime] = None
+
+
+def _reopen(path):
+    database = SqliteDatabase(path)
+    return database, database.list(Item, "items")
+
+
+def test_changes(tmp_path):
+    path = tmp_path / "todo.db"
+    database, items = _reopen(path)
+    items.extend([Item("a"), Item("b", due=datetime(2024, 1, 2, 3, 4)), Item("c", photo=Path("c.png"))])
+    items.insert(1, Item("d", done=True))
+    items[0] = Item("A")
+    items.set_fields(2, done=True)
+    del items[1]
+    items[0:1] = [Item("e"), Item("f")]
+    items.move(0, 3)
+    items.sort(key=lambda item: item.title)
+    items.reverse()
+    with items.batch():
+        items.append(Item("g"))
+        items.pop(0)
+    del items[::2]
+    expected = list(items)
+    database.close()
+
+    database, items = _reopen(path)
+    assert list(items) == expected
+    count, = database.execute("SELECT count(*) FROM items WHERE done").fetchone()
+    assert count == sum(item.done for item in expected)
+    database.close()
+
+
+def test_migration(tmp_path):
+    source = tmp_path / "items.yaml"
+    journal = JournalFileObserver([], source)
+    old = journal.to_observable()
+    old.extend([Item("a"), Item("b", done=True)])
+    journal.close()
+
+    database = SqliteDatabase(tmp_path / "todo.db")
+    items = database.list(Item, "items", indexes=("done",), migrate_from=source)
+    assert list(items) == [Item("a"), Item("b", done=True)]
+    items.clear()
+    database.close()
+
+    database = SqliteDatabase(tmp_path / "todo.db")
+    assert list(database.list(Item, "items", migrate_from=source)) == []
+    database.close()
+
+
+def test_positions(tmp_path):
+    path = tmp_path / "todo.db"
+    database, items = _reopen(path)
+    items.extend([Item("1"), Item("2"), Item("5")])
+    items.insert(-1, Item("9"))
+    items.insert(len(items) + 5, Item("7"))
+    items.pop(-2)
+    items[-2:] = [Item("3"), Item("4")]
+    expected = list(items)
+    database.close()
+
+    database, items = _reopen(path)
+    assert list(items) == expected
+    database.close()
+
+
+def test_insertions_touch_one_row(tmp_path):
+    database, items = _reopen(tmp_path / "todo.db")
+    items.extend(Item(str(i)) for i in range(100))
+    connection = database._connection
+    before = connection.total_changes
+    items.insert(0, Item("first"))
+    del items[0]
+    items.insert(50, Item("middle"))
+    items.move(10, 80)
+    assert connection.total_changes - before == 4
+
+    # the same gap split until the ranks are spread again
+    for i in range(40):
+        items.insert(51, Item(f"m{i}"))
+    expected = list(items)
+    database.close()
+    database, items = _reopen(tmp_path / "todo.db")
+    assert list(items) == expected
+    database.close()
+
+
+def test_migration_leaves_the_source(tmp_path):
+    source = tmp_path / "items.yaml"
+    source.write_text("", encoding="utf-8")
+    database = SqliteDatabase(tmp_path / "todo.db")
+    assert list(database.list(Item, "items", migrate_from=source)) == []
+    assert source.read_text(encoding="utf-8") == ""
+    database.close()
+
+
+def test_upgrade_position_table(tmp_path):
+    import sqlite3
+    path = tmp_path / "todo.db"
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE items (position INTEGER PRIMARY KEY, title TEXT, done INTEGER, '
+                       'photo TEXT, due TEXT)')
+    connection.executemany("INSERT INTO items (position, title, done) VALUES (?, ?, 0)", [(1, "b"), (0, "a")])
+    connection.commit()
+    connection.close()
+
+    database, items = _reopen(path)
+    assert list(items) == [Item("a"), Item("b")]
+    items.insert(1, Item("c"))
+    database.close()
+    database, items = _reopen(path)
+    assert list(items) == [Item("a"), Item("c"), Item("b")]
+    database.close()
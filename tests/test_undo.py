@@ -0,0 +1,122 @@
+from todo.data.observed import ObservedDict, ObservedList
+from todo.data.undo import UndoManager
+
+
+def test_undo_redo():
+    root = ObservedDict({"todos": [{"title": "a"}, {"title": "b"}], "tags": {"x"}, "done": 0})
+    history = UndoManager(root)
+    todos = root["todos"]
+    states = [root.to_data()]
+
+    def change(fn):
+        fn()
+        states.append(root.to_data())
+
+    change(lambda: todos.append({"title": "c"}))
+    change(lambda: todos[0].__setitem__("title", "A"))
+    change(lambda: todos.sort(key=lambda todo: todo["title"], reverse=True))
+    change(lambda: todos.move(0, 2))
+    change(lambda: todos.pop(1))
+    change(lambda: root["tags"].add("y"))
+    change(lambda: root["tags"].clear())
+    change(lambda: root.update({"done": 1, "archived": True}))
+    change(lambda: todos.assign([{"title": "b"}, {"title": "d"}], key=lambda todo: todo["title"]))
+
+    for state in reversed(states[:-1]):
+        assert history.undo()
+        assert root.to_data() == state
+    assert not history.undo()
+    for state in states[1:]:
+        assert history.redo()
+        assert root.to_data() == state
+    assert not history.can_redo
+
+
+def test_batch_is_one_step():
+    root = ObservedDict({"todos": [{"title": "a"}, {"title": "b"}]})
+    history = UndoManager(root)
+    todos = root["todos"]
+    with root.batch():
+        todos.append({"title": "c"})
+        todos[0]["title"] = "A"
+        todos.reverse()
+        todos.pop(0)
+    after = root.to_data()
+
+    assert history.undo() and not history.can_undo
+    assert root.to_data() == {"todos": [{"title": "a"}, {"title": "b"}]}
+    assert history.redo()
+    assert root.to_data() == after
+
+
+def test_batch_with_nested_changes():
+    root = ObservedList([[1], 2])
+    history = UndoManager(root)
+    with root.batch():
+        root.append(3)
+        root[0].append(5)
+        root.pop(1)
+    assert root.to_data() == [[1, 5], 3]
+
+    assert history.undo()
+    assert root.to_data() == [[1], 2]
+    assert history.redo()
+    assert root.to_data() == [[1, 5], 3]
+
+    # a nested list changed then removed by the same batch
+    with root.batch():
+        root[0].append(6)
+        root.pop(0)
+    assert history.undo()
+    assert root.to_data() == [[1, 5], 3]
+
+
+def test_negative_and_clamped_positions():
+    lst = ObservedList([1, 2, 5])
+    history = UndoManager(lst)
+    states = [lst.to_data()]
+
+    def change(fn):
+        fn()
+        states.append(lst.to_data())
+
+    change(lambda: lst.insert(-1, 9))
+    change(lambda: lst.insert(len(lst) + 5, 7))
+    change(lambda: lst.insert(-50, 0))
+    change(lambda: lst.pop(-1))
+    change(lambda: lst.__setitem__(slice(-2, None), [8]))
+    change(lambda: lst.__delitem__(-1))
+    change(lambda: lst.__setitem__(-1, 3))
+    assert lst == [0, 1, 3]
+
+    for state in reversed(states[:-1]):
+        assert history.undo()
+        assert lst.to_data() == state
+    for state in states[1:]:
+        assert history.redo()
+        assert lst.to_data() == state
+
+
+def test_new_change_drops_redo():
+    lst = ObservedList([1, 2])
+    history = UndoManager(lst)
+    lst.append(3)
+    history.undo()
+    lst.append(4)
+    assert not history.can_redo
+    assert history.undo() and lst == [1, 2]
+
+
+def test_budget():
+    lst = ObservedList()
+    history = UndoManager(lst, budget=2048)
+    for i in range(100):
+        lst.append("x" * 100)
+    assert 0 < len(history._undo) < 100
+    while history.undo():
+        pass
+    assert len(lst) > 0
+
+    history.close()
+    lst.append(1)
+    assert not history.can_undo
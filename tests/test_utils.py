@@ -1,6 +1,8 @@
+import threading
+
 import pytest
 
-from todo.utils import ClassInstanceDispatch, index_range
+from todo.utils import ClassInstanceDispatch, RWLock, index_range
 
 
 def test_dispatch():
@@ -91,3 +93,24 @@ def test_index():
     assert index_range(idx) == (0, 11)
     assert index_range(5) == (5, 5)
     assert index_range(slice(0, 5)) == (0, 4)
+
+
+def test_rwlock():
+    lock = RWLock()
+    barrier = threading.Barrier(2, timeout=5)
+
+    def read():
+        with lock.read():
+            barrier.wait()  # both readers hold the lock at once
+
+    threads = [threading.Thread(target=read) for _ in range(2)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+
+    with lock.write():
+        with lock.read():
+            with lock.write():
+                pass
+    with lock.read():
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
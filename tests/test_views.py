@@ -0,0 +1,111 @@
+from dataclasses import dataclass
+
+from todo.data.observed import ObservedList, Action, ALL
+
+
+def test_filtered():
+    calls, changes = [], []
+    lst = ObservedList([1, 2, 3, 4])
+    even = lst.filtered(lambda x: calls.append(x) or x % 2 == 0)
+    even.attach(changes.append)
+    assert even == [2, 4]
+
+    calls.clear()
+    lst.append(6)
+    lst[0] = 8
+    lst.pop(1)
+    lst.move(2, 0)
+    assert even == [4, 8, 6]
+    assert calls == [6, 8]
+    assert [(n.action, n.index, n.value) for n in changes] == [
+        (Action.CREATE, [2], [6]),
+        (Action.CREATE, [0], [8]),
+        (Action.DELETE, [1], [2]),
+        (Action.MOVE, [ALL], [1, 0, 2]),
+    ]
+
+    even[0] = 10
+    assert lst == [10, 8, 3, 6]
+
+
+def test_sorted():
+    changes = []
+    lst = ObservedList([{"due": 3}, {"due": 1}])
+    by_due = lst.sorted(lambda x: x["due"])
+    by_due.attach(changes.append)
+    assert by_due == [{"due": 1}, {"due": 3}]
+
+    lst.append({"due": 2})
+    lst[0]["due"] = 0
+    lst.reverse()
+    assert by_due == [{"due": 0}, {"due": 1}, {"due": 2}]
+    assert [(n.action, n.index) for n in changes] == [
+        (Action.CREATE, [1]),
+        (Action.MOVE, [2]),
+        (Action.UPDATE, [0]),
+    ]
+
+
+def test_chained_views():
+    lst = ObservedList([3, 1, 2])
+    view = lst.filtered(lambda x: x > 1).sorted(lambda x: -x).mapped(str)
+    assert view == ["3", "2"]
+
+    with lst.batch():
+        lst.append(5)
+        lst.remove(3)
+    lst.clear()
+    lst.extend([4, 0])
+    assert view == ["4"]
+
+    view.close()
+    lst.append(7)
+    assert view == ["4"]
+
+
+@dataclass
+class _Todo:
+    title: str
+    due: int
+
+
+def test_set_fields():
+    lst = ObservedList([_Todo("a", 3), _Todo("b", 1), _Todo("c", 2)])
+    view = lst.filtered(lambda todo: todo.due > 1).sorted(lambda todo: todo.due)
+    assert [todo.title for todo in view] == ["c", "a"]
+
+    view.set_fields(1, title="A")
+    view.set_fields(0, due=4)
+    assert lst == [_Todo("A", 3), _Todo("b", 1), _Todo("c", 4)]
+    assert [todo.title for todo in view] == ["A", "c"]
+
+
+def test_positions():
+    lst = ObservedList([3, 1, 2, 5])
+    even = lst.filtered(lambda x: x % 2 == 0)
+    odd = lst.filtered(lambda x: x % 2)
+    by_value = lst.sorted(lambda x: x)
+    doubled = lst.mapped(lambda x: 2 * x)
+    views = [(even, lambda: [x for x in lst if x % 2 == 0]), (odd, lambda: [x for x in lst if x % 2]),
+             (by_value, lambda: sorted(lst)), (doubled, lambda: [2 * x for x in lst])]
+    resets = []
+    for view, _ in views:
+        view.attach(lambda notify: notify.index[0] is ALL and notify.action is Action.DELETE and resets.append(notify))
+
+    changes = [
+        lambda: lst.pop(-1),
+        lambda: lst.__setitem__(-1, 0),
+        lambda: lst.__setitem__(slice(-2, None), [7]),
+        lambda: lst.insert(10, 4),
+        lambda: lst.insert(-1, 6),
+        lambda: lst.__setitem__(slice(1, 3), [5]),
+        lambda: lst.__setitem__(slice(0, 1), [8, 9, 10]),
+        lambda: lst.__delitem__(slice(-3, None)),
+        lambda: lst.extend([1, 2]),
+        lambda: lst.__delitem__(-2),
+    ]
+    for change in changes:
+        change()
+        for view, expected in views:
+            assert view == expected()
+    assert not resets
@@ -1,8 +1,12 @@
+import time
 from pathlib import Path
 
+import pytest
 from yaml import load, Loader
 
-from todo.model import ObservedDot, YamlFileObserver
+from todo.error import YamlFileError
+from todo.data.observed import ObservedDot
+from todo.data.observers import YamlFileObserver
 
 path = Path("tests/test.yaml")
 path.unlink(missing_ok=True)
@@ -52,3 +56,68 @@ def test_fn():
     t.data = 'b'
     assert yaml == {'test': {'data': 'b'}}
     assert t == {'data': 'b'}
+
+
+def test_skip_unchanged():
+    yaml.skip = {"a": [1, 2]}
+    assert file_observer.saved
+    mtime = path.stat().st_mtime_ns
+    path.write_text("{}", encoding="utf-8")
+
+    yaml.skip = {"a": [1, 2]}
+    yaml.skip.a[0] = 1
+    assert path.read_text(encoding="utf-8") == "{}"
+    yaml.skip.a[0] = 3
+    assert path.stat().st_mtime_ns >= mtime
+    assert file_observer.load()["skip"] == {"a": [3, 2]}
+
+
+def test_write_behind():
+    behind_path = Path("tests/test_behind.yaml")
+    behind_path.unlink(missing_ok=True)
+    observer = YamlFileObserver([], behind_path, delay=0.05)
+    lst = observer.to_observable()
+    text = behind_path.read_text(encoding="utf-8")
+    for i in range(20):
+        lst.append(i)
+    assert behind_path.read_text(encoding="utf-8") == text
+    assert observer.metrics.pending == 20 and not observer.saved
+
+    deadline = time.monotonic() + 5
+    while observer.metrics.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert load(behind_path.read_text(encoding="utf-8"), Loader=Loader) == list(range(20))
+    assert observer.metrics.writes == 1 and observer.metrics.coalesced == 19 and observer.saved
+
+    lst.append(20)
+    lst.pop(-1)
+    observer.flush()
+    assert observer.metrics.skipped == 1 and not observer.metrics.pending
+    behind_path.unlink()
+
+
+def test_write_behind_failure(tmp_path, monkeypatch):
+    observer = YamlFileObserver([], tmp_path / "failing.yaml", delay=0.01)
+    lst = observer.to_observable()
+    dumps = observer.codec.dumps
+
+    def failing(data):
+        raise TypeError("cannot encode")
+
+    monkeypatch.setattr(observer.codec, "dumps", failing)
+    lst.append(1)
+    deadline = time.monotonic() + 5
+    while observer._failure is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert observer.metrics.pending == 1 and not observer.saved
+    with pytest.raises(YamlFileError):
+        observer.flush()
+
+    # the writer thread is still alive, and the pending changes are written once possible
+    monkeypatch.setattr(observer.codec, "dumps", dumps)
+    lst.append(2)
+    deadline = time.monotonic() + 5
+    while observer.metrics.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert load(observer.path.read_text(encoding="utf-8"), Loader=Loader) == [1, 2]
+    observer.close()
@@ -1,4 +1,13 @@
-from .observed import Notify, Action, ObservedCollection, ObservedDict, ObservedList, ObservedSet, ObservedTuple
+from .observed import Notify, Action, ALL, MISSING, ObservedCollection, ObservedDict, ObservedList, ObservedSet, \
+    ObservedTuple, Snapshot
+from .dispatch import Dispatcher, ThreadDispatcher, AsyncioDispatcher
+from .views import ListView, FilteredView, SortedView, MappedView
+from .index import HashIndex, SortedIndex
+from .undo import UndoManager
+from .codecs import Codec, YamlCodec, JsonLinesCodec, BinaryCodec, PickleCodec, codec_for, register_record
+from .cache import SnapshotCache
 from .observers import YamlFileObserver
-from .config import config
+from .journal import JournalFileObserver
+from .sqlite import SqliteDatabase
+from .config import config, config_snapshot, ConfigSnapshot
 from .data import *
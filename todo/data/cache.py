@@ -0,0 +1,77 @@
+import hashlib
+import os
+import struct
+from pathlib import Path
+from typing import Any, Optional
+
+from todo.error import CodecError
+from todo.log import get_logger
+from todo.data.codecs import BinaryCodec
+
+logger = get_logger(__name__, use_config=False)
+
+# magic, then the mtime in ns, the size and the digest of the source the snapshot was taken from
+_HEADER = struct.Struct("<4sqq16s")
+_MAGIC = b"TSC1"
+_CODEC = BinaryCodec()
+
+
+def _digest(content: bytes) -> bytes:
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+class SnapshotCache:
+    def __init__(self, directory: Path | str):
+        """
+        Binary snapshots of the data of files, so that loading a file that did not change since
+        skips parsing it. A snapshot is used when the mtime, the size and a hash of the file all
+        match the ones it was taken from, so editing the file by hand invalidates it even when
+        the mtime does not change. Any problem with a snapshot makes the file be parsed again.
+
+        :param directory: where the snapshots are, e.g. under cache_path
+        """
+
+        self.directory = Path(directory)
+
+    def _path(self, source: Path) -> Path:
+        key = hashlib.blake2b(str(source.resolve()).encode(), digest_size=8).hexdigest()
+        return self.directory / f"{source.name}.{key}.snapshot"
+
+    def load(self, source: Path, content: bytes) -> Optional[Any]:
+        """The data of the snapshot of source, if it was taken from content, or None"""
+        path = self._path(source)
+        try:
+            stat = source.stat()
+            with open(path, "rb") as file:
+                magic, mtime, size, digest = _HEADER.unpack(file.read(_HEADER.size))
+                if (magic, mtime, size) != (_MAGIC, stat.st_mtime_ns, stat.st_size) or size != len(content) \
+                        or digest != _digest(content):
+                    logger.debug(f"Snapshot of {source} is stale")
+                    return None
+                return _CODEC.loads(file.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, struct.error, CodecError) as e:
+            logger.warning(f"Ignoring the snapshot of {source}: {e!r}")
+            return None
+
+    def store(self, source: Path, content: bytes, data: Any) -> None:
+        """Take a snapshot of data, which source holds as content"""
+        path = self._path(source)
+        temporary = path.with_name(path.name + ".tmp")
+        try:
+            payload = _CODEC.dumps(data)
+            stat = source.stat()
+            if stat.st_size != len(content):
+                return  # the file changed since
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(temporary, "wb") as file:
+                file.write(_HEADER.pack(_MAGIC, stat.st_mtime_ns, stat.st_size, _digest(content)))
+                file.write(payload)
+            os.replace(temporary, path)
+        except (OSError, CodecError) as e:
+            logger.warning(f"Cannot snapshot {source}: {e!r}")
+
+    def invalidate(self, source: Path) -> None:
+        """Drop the snapshot of source"""
+        self._path(source).unlink(missing_ok=True)
@@ -0,0 +1,577 @@
+import base64
+import dataclasses
+import io
+import json
+import pathlib
+import pickle
+import struct
+from abc import ABC, abstractmethod
+from collections.abc import Callable, MutableSequence
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path, PurePath
+from typing import Any, Optional
+
+import yaml
+
+from todo.error import CodecError
+from todo.data.observed import ObservedCollection, ObservedDot, _unwrap
+
+try:
+    from yaml import CSafeDumper as SafeDumper
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeDumper, SafeLoader  # type: ignore
+
+_records: dict[str, type] = {}  # registered dataclasses by name
+_names: dict[type, str] = {}
+
+
+def register_record(cls: Optional[type] = None, *, name: Optional[str] = None):
+    """
+    Let the codecs store the instances of a dataclass, by the name of the class unless another
+    is given. A record stores the fields that differ from their default value, by name, so
+    fields can be added with a default and files written before still load. Use it as a
+    decorator::
+
+        @register_record
+        @dataclass(frozen=True)
+        class TodoItem: ...
+    """
+
+    def register(cls: type) -> type:
+        if not dataclasses.is_dataclass(cls):
+            raise TypeError(f"{cls!r} is not a dataclass")
+        key = name or cls.__name__
+        if _records.get(key, cls) is not cls:
+            raise ValueError(f"Another record is registered as {key!r}")
+        _records[key] = cls
+        _names[cls] = key
+        _YamlDumper.add_representer(cls, _represent_record)
+        return cls
+
+    return register if cls is None else register(cls)
+
+
+def _fields(record: Any) -> list[tuple[str, Any]]:
+    """The fields of a record that do not hold their default value"""
+    values = []
+    for field in dataclasses.fields(record):
+        value = getattr(record, field.name)
+        if field.default is dataclasses.MISSING or value != field.default:
+            values.append((field.name, value))
+    return values
+
+
+def _record(name: str, values: dict) -> Any:
+    try:
+        return _records[name](**values)
+    except KeyError:
+        raise CodecError(f"No record is registered as {name!r}") from None
+    except TypeError as e:
+        raise CodecError(f"Cannot build a {name}: {e}") from e
+
+
+def _observed(value: Any) -> Any:
+    """The data behind the collections a snapshot may hold, as they were assigned"""
+    if isinstance(value, ObservedCollection | ObservedDot):
+        return _unwrap(value)._data
+    return value
+
+
+class Codec(ABC):
+    """How a file stores a tree: the text or bytes of its data, and back"""
+
+    suffixes: tuple[str, ...] = ()
+
+    @abstractmethod
+    def dumps(self, data: Any) -> bytes:
+        """The content of a file storing data"""
+
+    @abstractmethod
+    def loads(self, data: bytes) -> Any:
+        """The data stored, None for an empty file"""
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}()"
+
+
+# YAML
+
+
+class _YamlDumper(SafeDumper):
+    """Only tags the safe loader below reads back"""
+
+
+def _represent_record(dumper: yaml.BaseDumper, record: Any) -> yaml.Node:
+    return dumper.represent_mapping("!" + _names[type(record)], _fields(record))
+
+
+_YamlDumper.add_multi_representer(
+    ObservedCollection, lambda dumper, data: dumper.represent_data(_unwrap(data)._data))
+_YamlDumper.add_representer(ObservedDot, lambda dumper, data: dumper.represent_data(_unwrap(data)._data))
+# list-like data that is not a list, such as the columns of a ColumnarList
+_YamlDumper.add_multi_representer(MutableSequence, lambda dumper, data: dumper.represent_list(list(data)))
+_YamlDumper.add_multi_representer(PurePath, lambda dumper, data: dumper.represent_scalar("!path", str(data)))
+_YamlDumper.add_representer(
+    tuple, lambda dumper, data: dumper.represent_sequence("tag:yaml.org,2002:python/tuple", data))
+
+
+class _YamlLoader(SafeLoader):
+    """
+    The safe loader, with the tags of the records and paths. It also reads the python/object
+    tags of files written before, for registered records and paths only
+    """
+
+
+def _construct_tagged(loader: yaml.BaseLoader, suffix: str, node: yaml.Node) -> Any:
+    if suffix == "path":
+        return Path(loader.construct_scalar(node))
+    if not isinstance(node, yaml.MappingNode):
+        raise yaml.constructor.ConstructorError(None, None, f"!{suffix} is not a mapping", node.start_mark)
+    try:
+        return _record(suffix, loader.construct_mapping(node, deep=True))
+    except CodecError as e:
+        raise yaml.constructor.ConstructorError(None, None, str(e), node.start_mark) from e
+
+
+def _construct_python_object(loader: yaml.BaseLoader, suffix: str, node: yaml.Node) -> Any:
+    for name, cls in _records.items():
+        if f"{cls.__module__}.{cls.__qualname__}" == suffix:
+            return _construct_tagged(loader, name, node)
+    raise yaml.constructor.ConstructorError(None, None, f"Unknown object {suffix!r}", node.start_mark)
+
+
+def _construct_python_apply(loader: yaml.BaseLoader, suffix: str, node: yaml.Node) -> Any:
+    module, _, name = suffix.rpartition(".")
+    if module != "pathlib" or not name.endswith("Path"):
+        raise yaml.constructor.ConstructorError(None, None, f"Unknown object {suffix!r}", node.start_mark)
+    return Path(*loader.construct_sequence(node))
+
+
+_YamlLoader.add_multi_constructor("!", _construct_tagged)
+_YamlLoader.add_multi_constructor("tag:yaml.org,2002:python/object:", _construct_python_object)
+_YamlLoader.add_multi_constructor("tag:yaml.org,2002:python/object/apply:", _construct_python_apply)
+_YamlLoader.add_constructor(
+    "tag:yaml.org,2002:python/tuple", lambda loader, node: tuple(loader.construct_sequence(node)))
+
+
+class YamlCodec(Codec):
+    """
+    YAML without python tags: records as ``!TodoItem`` mappings, paths as ``!path`` scalars,
+    datetimes as timestamps. It loads with the safe loader
+    """
+
+    suffixes = (".yaml", ".yml")
+
+    def dumps(self, data: Any) -> bytes:
+        return self.dump_text(data).encode("utf-8")
+
+    def dump_text(self, data: Any) -> str:
+        try:
+            return yaml.dump(data, Dumper=_YamlDumper, allow_unicode=True)
+        except yaml.YAMLError as e:
+            raise CodecError(f"Cannot represent the data: {e}") from e
+
+    def loads(self, data: bytes | str) -> Any:
+        try:
+            return yaml.load(data, Loader=_YamlLoader) if data else None
+        except yaml.YAMLError as e:
+            raise CodecError(f"File is corrupted {e!r}") from e
+
+
+# JSON lines
+
+
+def _to_json(value: Any) -> Any:
+    """
+    The JSON form of a value. Types JSON lacks are objects with a single key starting with $,
+    records have the key "$" for their name; dicts that could be mistaken for those are pairs
+    """
+
+    value = _observed(value)
+    match value:
+        case str() | int() | float() | None:
+            return value
+        case list() | MutableSequence():
+            return [_to_json(item) for item in value]
+        case dict():
+            if all(type(key) is str and not key.startswith("$") for key in value):
+                return {key: _to_json(item) for key, item in value.items()}
+            return {"$dict": [[_to_json(key), _to_json(item)] for key, item in value.items()]}
+        case tuple():
+            return {"$tuple": [_to_json(item) for item in value]}
+        case set() | frozenset():
+            return {"$set": [_to_json(item) for item in value]}
+        case datetime():
+            return {"$datetime": value.isoformat()}
+        case PurePath():
+            return {"$path": str(value)}
+        case bytes():
+            return {"$bytes": base64.b64encode(value).decode("ascii")}
+    if (name := _names.get(type(value))) is not None:
+        return {"$": name, **{key: _to_json(item) for key, item in _fields(value)}}
+    raise CodecError(f"Cannot store {value!r} as JSON")
+
+
+def _hashable(value: Any) -> Any:
+    return tuple(map(_hashable, value)) if isinstance(value, list) else value
+
+
+_FROM_JSON: dict[str, Callable[[Any], Any]] = {
+    "$dict": lambda pairs: {_hashable(key): value for key, value in pairs},
+    "$tuple": tuple,
+    "$set": lambda items: set(map(_hashable, items)),
+    "$datetime": datetime.fromisoformat,
+    "$path": Path,
+    "$bytes": base64.b64decode,
+}
+
+
+def _from_json(obj: dict) -> Any:
+    if "$" in obj:
+        name = obj.pop("$")
+        return _record(name, obj)
+    if len(obj) == 1:
+        (key, value), = obj.items()
+        if (decode := _FROM_JSON.get(key)) is not None:
+            return decode(value)
+    return obj
+
+
+class JsonLinesCodec(Codec):
+    """
+    A list as a JSON line per item, other data as a single ``{"$root": data}`` line. Each line
+    is parsed on its own, by the C parser of the json module
+    """
+
+    suffixes = (".jsonl",)
+
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), check_circular=False)
+
+    def dumps(self, data: Any) -> bytes:
+        data = _observed(data)
+        encode = self._encoder.encode
+        if isinstance(data, list | MutableSequence):
+            lines = [encode(_to_json(item)) for item in data]
+        else:
+            lines = [encode({"$root": _to_json(data)})]
+        return "".join(line + "\n" for line in lines).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        decoder = json.JSONDecoder(object_hook=_from_json)
+        try:
+            items = [decoder.decode(line) for line in data.decode("utf-8").splitlines() if line]
+        except (ValueError, CodecError) as e:
+            raise CodecError(f"File is corrupted {e!r}") from e
+        if not items:
+            return None
+        if len(items) == 1 and isinstance(items[0], dict) and items[0].keys() == {"$root"}:
+            return items[0]["$root"]
+        return items
+
+
+# binary
+
+_MAGIC = b"TODO\x01"
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_DOUBLE = struct.Struct("<d")
+
+# a byte before each value tells its type
+(_NONE, _TRUE, _FALSE, _INT, _FLOAT, _STR, _STR_REF, _BYTES, _LIST, _TUPLE, _SET, _DICT, _DATETIME,
+ _AWARE, _PATH, _RECORD, _RECORD_REF) = range(17)
+
+
+class _BinaryWriter:
+    """
+    Writes values after their type byte. Integers are zigzag varints, strings are written once
+    and referred to by their number afterwards, and a record type lists its field names once,
+    then its records hold their values in that order
+    """
+
+    def __init__(self):
+        self.out = bytearray(_MAGIC)
+        self.strings: dict[str, int] = {}
+        self.records: dict[type, tuple[int, tuple[str, ...]]] = {}
+
+    def varint(self, n: int) -> None:
+        out = self.out
+        while n > 0x7F:
+            out.append(n & 0x7F | 0x80)
+            n >>= 7
+        out.append(n)
+
+    def string(self, value: str) -> None:
+        if (ref := self.strings.get(value)) is not None:
+            self.out.append(_STR_REF)
+            self.varint(ref)
+            return
+        self.strings[value] = len(self.strings)
+        encoded = value.encode("utf-8")
+        self.out.append(_STR)
+        self.varint(len(encoded))
+        self.out += encoded
+
+    def items(self, tag: int, items) -> None:
+        self.out.append(tag)
+        self.varint(len(items))
+        for item in items:
+            self.value(item)
+
+    def value(self, value: Any) -> None:
+        value = _observed(value)
+        out = self.out
+        match value:
+            case None:
+                out.append(_NONE)
+            case True:
+                out.append(_TRUE)
+            case False:
+                out.append(_FALSE)
+            case int():
+                out.append(_INT)
+                self.varint(value << 1 if value >= 0 else (~value << 1) | 1)
+            case float():
+                out.append(_FLOAT)
+                out += _DOUBLE.pack(value)
+            case str():
+                self.string(value)
+            case bytes():
+                out.append(_BYTES)
+                self.varint(len(value))
+                out += value
+            case list() | MutableSequence():
+                self.items(_LIST, value)
+            case tuple():
+                self.items(_TUPLE, value)
+            case set() | frozenset():
+                self.items(_SET, list(value))
+            case dict():
+                out.append(_DICT)
+                self.varint(len(value))
+                for key, item in value.items():
+                    self.value(key)
+                    self.value(item)
+            case datetime() if value.tzinfo is None:
+                out.append(_DATETIME)
+                micros = (value - _EPOCH) // _MICROSECOND
+                self.varint(micros << 1 if micros >= 0 else (~micros << 1) | 1)
+            case datetime():
+                out.append(_AWARE)
+                self.string(value.isoformat())
+            case PurePath():
+                out.append(_PATH)
+                self.string(str(value))
+            case _:
+                self.record(value)
+
+    def record(self, value: Any) -> None:
+        cls = type(value)
+        if (known := self.records.get(cls)) is not None:
+            number, names = known
+            self.out.append(_RECORD_REF)
+            self.varint(number)
+        else:
+            if cls not in _names:
+                raise CodecError(f"Cannot store {value!r}, its type is not a registered record")
+            names = tuple(field.name for field in dataclasses.fields(cls))
+            self.records[cls] = (len(self.records), names)
+            self.out.append(_RECORD)
+            self.string(_names[cls])
+            self.varint(len(names))
+            for name in names:
+                self.string(name)
+        for name in names:
+            self.value(getattr(value, name))
+
+
+class _BinaryReader:
+    def __init__(self, data: bytes):
+        if not data.startswith(_MAGIC):
+            raise CodecError("Not a binary todo file")
+        self.data = data
+        self.at = len(_MAGIC)
+        self.strings: list[str] = []
+        self.records: list[tuple[str, tuple[str, ...]]] = []
+
+    def varint(self) -> int:
+        data, at = self.data, self.at
+        n = shift = 0
+        while True:
+            byte = data[at]
+            at += 1
+            n |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                self.at = at
+                return n
+            shift += 7
+
+    def signed(self) -> int:
+        n = self.varint()
+        return ~(n >> 1) if n & 1 else n >> 1
+
+    def raw(self) -> bytes:
+        size = self.varint()
+        chunk = self.data[self.at:self.at + size]
+        if len(chunk) < size:
+            raise CodecError("Truncated binary file")
+        self.at += size
+        return chunk
+
+    def string(self) -> str:
+        tag = self.data[self.at]
+        self.at += 1
+        if tag == _STR_REF:
+            return self.strings[self.varint()]
+        if tag != _STR:
+            raise CodecError(f"Expected a string at {self.at - 1}")
+        value = self.raw().decode("utf-8")
+        self.strings.append(value)
+        return value
+
+    def value(self) -> Any:
+        tag = self.data[self.at]
+        match tag:
+            case 0 | 1 | 2:  # None, True, False
+                self.at += 1
+                return (None, True, False)[tag]
+            case 5 | 6:  # strings
+                return self.string()
+        self.at += 1
+        match tag:
+            case 3:
+                return self.signed()
+            case 4:
+                (value,) = _DOUBLE.unpack_from(self.data, self.at)
+                self.at += _DOUBLE.size
+                return value
+            case 7:
+                return bytes(self.raw())
+            case 8:
+                return [self.value() for _ in range(self.varint())]
+            case 9:
+                return tuple(self.value() for _ in range(self.varint()))
+            case 10:
+                return {self.value() for _ in range(self.varint())}
+            case 11:
+                return {self.value(): self.value() for _ in range(self.varint())}
+            case 12:
+                return _EPOCH + self.signed() * _MICROSECOND
+            case 13:
+                return datetime.fromisoformat(self.string())
+            case 14:
+                return Path(self.string())
+            case 15:
+                name = self.string()
+                self.records.append((name, tuple(self.string() for _ in range(self.varint()))))
+                return self.record(len(self.records) - 1)
+            case 16:
+                return self.record(self.varint())
+        raise CodecError(f"Unknown type {tag} at {self.at - 1}")
+
+    def record(self, number: int) -> Any:
+        name, names = self.records[number]
+        return _record(name, {field: self.value() for field in names})
+
+
+class BinaryCodec(Codec):
+    """
+    A compact binary encoding written with the standard library only, see _BinaryWriter. Only
+    the types the other codecs store can be stored
+    """
+
+    suffixes = (".bin",)
+
+    def dumps(self, data: Any) -> bytes:
+        writer = _BinaryWriter()
+        writer.value(data)
+        return bytes(writer.out)
+
+    def loads(self, data: bytes) -> Any:
+        if not data:
+            return None
+        try:
+            reader = _BinaryReader(data)
+            value = reader.value()
+        except (IndexError, UnicodeDecodeError, ValueError, struct.error) as e:
+            raise CodecError(f"File is corrupted {e!r}") from e
+        if reader.at != len(data):
+            raise CodecError(f"Unexpected data at {reader.at}")
+        return value
+
+
+# pickle
+
+
+def _same(value: Any) -> Any:
+    return value
+
+
+class _Pickler(pickle.Pickler):
+    def reducer_override(self, obj: Any) -> Any:
+        if isinstance(obj, ObservedCollection | ObservedDot):
+            return _same, (_unwrap(obj)._data,)
+        if isinstance(obj, MutableSequence) and not isinstance(obj, list):
+            return _same, (list(obj),)
+        return NotImplemented
+
+
+# what a pickle may build besides the builtin containers
+_PICKLABLE = {
+    ("datetime", "datetime"): datetime,
+    ("datetime", "date"): date,
+    ("datetime", "timedelta"): timedelta,
+    ("datetime", "timezone"): timezone,
+    ("builtins", "set"): set,
+    ("builtins", "frozenset"): frozenset,
+    (__name__, "_same"): _same,
+}
+
+
+class _Unpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str) -> Any:
+        if (cls := _PICKLABLE.get((module, name))) is not None:
+            return cls
+        if module == "pathlib" and name.endswith("Path"):
+            return getattr(pathlib, name)
+        for cls in _names:
+            if cls.__module__ == module and cls.__qualname__ == name:
+                return cls
+        raise pickle.UnpicklingError(f"Cannot load {module}.{name}, it is not a registered record")
+
+
+class PickleCodec(Codec):
+    """
+    Pickle protocol 5, the fastest to load. The loader only builds the registered records and
+    the types the other codecs store, but a file is tied to the module of its records
+    """
+
+    suffixes = (".pickle", ".pkl")
+
+    def dumps(self, data: Any) -> bytes:
+        buffer = io.BytesIO()
+        try:
+            _Pickler(buffer, protocol=5).dump(data)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            raise CodecError(f"Cannot pickle the data: {e!r}") from e
+        return buffer.getvalue()
+
+    def loads(self, data: bytes) -> Any:
+        if not data:
+            return None
+        try:
+            return _Unpickler(io.BytesIO(data)).load()
+        except (pickle.UnpicklingError, EOFError, ValueError, TypeError, CodecError) as e:
+            raise CodecError(f"File is corrupted {e!r}") from e
+
+
+_CODECS: list[Codec] = [YamlCodec(), JsonLinesCodec(), BinaryCodec(), PickleCodec()]
+
+
+def codec_for(path: Path | str) -> Codec:
+    """The codec of a file, by its suffix; YAML when it is not known"""
+    suffix = Path(path).suffix.lower()
+    for codec in _CODECS:
+        if suffix in codec.suffixes:
+            return codec
+    return _CODECS[0]
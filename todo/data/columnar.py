@@ -0,0 +1,369 @@
+import copy
+import dataclasses
+import hashlib
+import types
+import typing
+from collections.abc import Iterable, MutableSequence, Sequence
+from datetime import datetime
+from typing import Any, Optional
+
+import numpy as np
+
+from todo.data.observed import ALL, Action, Notify, ObservedCollection, ObservedList, _access, _value_digest
+
+_CHUNK = 1024  # records materialized at once while iterating
+
+
+class _Column:
+    """How the values of a field are stored in an array, and read back"""
+
+    dtype: Any = object
+
+    def encode(self, values: list) -> np.ndarray:
+        array = np.empty(len(values), dtype=object)
+        for i, value in enumerate(values):
+            array[i] = value  # assigning the list at once would unpack sequences
+        return array
+
+    def decode(self, array: np.ndarray) -> list:
+        return array.tolist()
+
+    def item(self, array: np.ndarray, i: int) -> Any:
+        return array[i]
+
+    def view(self, array: np.ndarray) -> np.ndarray:
+        return array
+
+    def equals(self, array: np.ndarray, value: Any) -> np.ndarray:
+        return array == value
+
+
+class _BoolColumn(_Column):
+    dtype = np.bool_
+
+    def encode(self, values: list) -> np.ndarray:
+        return np.fromiter(values, dtype=np.bool_, count=len(values))
+
+    def item(self, array: np.ndarray, i: int) -> Any:
+        return bool(array[i])
+
+
+_NAT = np.datetime64("NaT")
+
+
+class _TimeColumn(_Column):
+    """Naive datetimes to the microsecond, None as NaT"""
+
+    dtype = np.dtype("datetime64[us]")
+
+    def encode(self, values: list) -> np.ndarray:
+        return np.array([_NAT if value is None else value for value in values], dtype=self.dtype)
+
+    def item(self, array: np.ndarray, i: int) -> Any:
+        return array[i].item()
+
+
+class _TextColumn(_Column):
+    """
+    Strings as codes into a table where each distinct string appears once. Code 0 is None. The
+    table only grows, so it is shared by the copies of the columns
+    """
+
+    dtype = np.int32
+
+    def __init__(self):
+        self.table: list[Optional[str]] = [None]
+        self.codes: dict[str, int] = {}
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        if (code := self.codes.get(value)) is None:
+            code = self.codes[value] = len(self.table)
+            self.table.append(value)
+        return code
+
+    def encode(self, values: list) -> np.ndarray:
+        code = self.code
+        return np.fromiter((code(value) for value in values), dtype=self.dtype, count=len(values))
+
+    def decode(self, array: np.ndarray) -> list:
+        table = self.table
+        return [table[code] for code in array.tolist()]
+
+    def item(self, array: np.ndarray, i: int) -> Any:
+        return self.table[array[i]]
+
+    def view(self, array: np.ndarray) -> np.ndarray:
+        return np.array(self.table, dtype=object)[array]
+
+    def equals(self, array: np.ndarray, value: Any) -> np.ndarray:
+        if value is not None and value not in self.codes:
+            return np.zeros(len(array), dtype=np.bool_)
+        return array == self.code(value)
+
+
+def _column(kind: Any) -> _Column:
+    """The column storing the values of a field annotated with kind"""
+    optional = False
+    if typing.get_origin(kind) in (typing.Union, types.UnionType):
+        args = [arg for arg in typing.get_args(kind) if arg is not type(None)]
+        optional = len(args) < len(typing.get_args(kind))
+        if len(args) == 1:
+            kind = args[0]
+    if kind is bool and not optional:
+        return _BoolColumn()
+    if kind is datetime:
+        return _TimeColumn()
+    if kind is str:
+        return _TextColumn()
+    return _Column()
+
+
+class Columns(MutableSequence):
+    """
+    The records of a ColumnarList, dataclass instances of one type stored as an array per field.
+    Records are built when read, so reading the same row twice gives equal but distinct
+    records. Values must have the types the fields are annotated with.
+    """
+
+    __slots__ = ("record", "names", "columns", "_arrays", "_size")
+
+    def __init__(self, record: type, items: Iterable = ()):
+        if not dataclasses.is_dataclass(record):
+            raise TypeError(f"{record!r} is not a dataclass")
+        hints = typing.get_type_hints(record)
+        self.record = record
+        self.names = tuple(field.name for field in dataclasses.fields(record))
+        self.columns = tuple(_column(hints[name]) for name in self.names)
+        self._arrays = [np.empty(0, dtype=column.dtype) for column in self.columns]
+        self._size = 0
+        self.extend(items)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._records(*self._span(key))
+        i = self._position(key)
+        return self._record([column.item(array, i) for column, array in zip(self.columns, self._arrays)])
+
+    def __setitem__(self, key, value) -> None:
+        if not isinstance(key, slice):
+            i = self._position(key)
+            for column, array, part in zip(self.columns, self._arrays, self._encode([value])):
+                array[i] = part[0]
+            return
+        if key.step not in (None, 1):
+            records = list(self)
+            records[key] = value
+            self._reset(records)
+            return
+        start, stop = self._span(key)
+        if isinstance(value, Columns) and value.record is self.record and start == 0 and stop == self._size:
+            self._copy_from(value)
+            return
+        values = list(value)
+        self._splice(start, stop, self._encode(values), len(values))
+
+    def __delitem__(self, key) -> None:
+        if isinstance(key, slice):
+            if key.step not in (None, 1):
+                records = list(self)
+                del records[key]
+                self._reset(records)
+                return
+            start, stop = self._span(key)
+        else:
+            start = self._position(key)
+            stop = start + 1
+        self._splice(start, stop, None, 0)
+
+    def insert(self, index: int, value) -> None:
+        start = min(max(index + self._size if index < 0 else index, 0), self._size)
+        self._splice(start, start, self._encode([value]), 1)
+
+    def extend(self, values: Iterable) -> None:
+        values = list(values)
+        if values:
+            self._splice(self._size, self._size, self._encode(values), len(values))
+
+    def append(self, value) -> None:
+        self.insert(self._size, value)
+
+    def clear(self) -> None:
+        self._size = 0
+
+    def __iter__(self):
+        for start in range(0, self._size, _CHUNK):
+            yield from self._records(start, min(start + _CHUNK, self._size))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Columns):
+            return self.record is other.record and len(self) == len(other) and list(self) == list(other)
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __add__(self, other) -> list:
+        return list(self) + list(other)
+
+    def __mul__(self, other) -> list:
+        return list(self) * other
+
+    def __copy__(self) -> "Columns":
+        new = Columns.__new__(Columns)
+        new._copy_from(self)
+        return new
+
+    def copy(self) -> "Columns":
+        return copy.copy(self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.record.__name__}, {list(self)!r})"
+
+    def take(self, order: Sequence[int]) -> None:
+        """Reorder the records, order[new position] being the old position"""
+        order = np.asarray(order, dtype=np.intp)
+        for array in self._arrays:
+            array[:self._size] = array[order]
+
+    def array(self, name: str) -> np.ndarray:
+        """The stored array of a field, trimmed to the records"""
+        return self._arrays[self.names.index(name)][:self._size]
+
+    def column(self, name: str) -> _Column:
+        return self.columns[self.names.index(name)]
+
+    def _record(self, values: list) -> Any:
+        # the fields are set directly, as set_fields does, so records are not validated again
+        record = object.__new__(self.record)
+        for name, value in zip(self.names, values):
+            object.__setattr__(record, name, value)
+        return record
+
+    def _records(self, start: int, stop: int) -> list:
+        decoded = [column.decode(array[start:stop]) for column, array in zip(self.columns, self._arrays)]
+        return [self._record(values) for values in zip(*decoded)]
+
+    def _encode(self, records: list) -> list[np.ndarray]:
+        for record in records:
+            if type(record) is not self.record:
+                raise TypeError(f"{record!r} is not a {self.record.__name__}")
+        return [column.encode([getattr(record, name) for record in records])
+                for name, column in zip(self.names, self.columns)]
+
+    def _position(self, index: int) -> int:
+        i = index + self._size if index < 0 else index
+        if not 0 <= i < self._size:
+            raise IndexError("list index out of range")
+        return i
+
+    def _span(self, key: slice) -> tuple[int, int]:
+        start, stop, _ = key.indices(self._size)
+        return start, max(start, stop)
+
+    def _splice(self, start: int, stop: int, parts: Optional[list[np.ndarray]], count: int) -> None:
+        """Replace the records start:stop with count encoded ones"""
+        size = self._size - (stop - start) + count
+        capacity = len(self._arrays[0]) if self._arrays else size
+        if size > capacity:
+            capacity = max(size, 2 * capacity, 16)
+            for n, array in enumerate(self._arrays):
+                grown = np.empty(capacity, dtype=array.dtype)
+                grown[:self._size] = array[:self._size]
+                self._arrays[n] = grown
+        for n, array in enumerate(self._arrays):
+            array[start + count:size] = array[stop:self._size].copy()
+            if parts is not None:
+                array[start:start + count] = parts[n]
+        self._size = size
+
+    def _reset(self, records: list) -> None:
+        self._size = 0
+        self.extend(records)
+
+    def _copy_from(self, other: "Columns") -> None:
+        self.record, self.names, self.columns = other.record, other.names, other.columns
+        self._arrays = [array[:other._size].copy() for array in other._arrays]
+        self._size = other._size
+
+
+class ColumnarList(ObservedList):
+    """
+    An observed list of dataclass instances of one type, stored a column per field: a NumPy
+    array for bool and datetime fields, interned string codes for text, an object array for
+    the others. It notifies like an ObservedList and can back a list_model, while holding no
+    Python object per record, and scans a field in one vectorized operation::
+
+        todos = ColumnarList(TodoItem, items)
+        done = int(todos.column("completed").sum())
+        late = np.flatnonzero(todos.column("due_date") < np.datetime64(now))
+
+    It is meant to be the root of its tree.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, record: type, data: Iterable = (), parent: Optional[ObservedCollection] = None):
+        super().__init__(Columns(record, data), parent)
+
+    @property
+    def record(self) -> type:
+        return self._data.record
+
+    @_access
+    def column(self, name: str) -> np.ndarray:
+        """
+        The values of a field as a read-only array: booleans, datetime64 with NaT for None, and
+        objects for the other fields, strings included
+        """
+
+        view = self._data.column(name).view(self._data.array(name))
+        if view.base is not None:
+            view = view.view()
+            view.flags.writeable = False
+        return view
+
+    @_access
+    def equals(self, name: str, value: Any) -> np.ndarray:
+        """A mask of the records whose field equals value, without decoding the strings"""
+        return self._data.column(name).equals(self._data.array(name), value)
+
+    @property
+    @_access
+    def digest(self) -> Optional[bytes]:
+        """
+        A hash of the records, computed from the columns instead of one record at a time. None
+        when a column of objects holds values ObservedCollection.digest cannot hash
+        """
+
+        cached = self._digest
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+        data = self._data
+        hasher = hashlib.blake2b(digest_size=16, person=b"ColumnarList")
+        hasher.update(data.record.__qualname__.encode())
+        digest: Optional[bytes] = None
+        for name, column in zip(data.names, data.columns):
+            array = data.array(name)
+            if isinstance(column, _TextColumn):
+                hasher.update("\0".join(map(repr, column.decode(array))).encode())
+            elif array.dtype == object:
+                if (objects := _value_digest(array.tolist())) is None:
+                    break
+                hasher.update(objects)
+            else:
+                hasher.update(array.tobytes())
+        else:
+            digest = hasher.digest()
+        self._digest = (self._version, digest, {})
+        return digest
+
+    def _permute(self, order: Sequence[int]) -> None:
+        order = list(order)
+        if order == list(range(len(order))):
+            return
+        self._data.take(order)
+        self.notify(Notify(Action.MOVE, ALL, order, self))
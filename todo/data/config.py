@@ -1,13 +1,19 @@
+import dataclasses
+from collections.abc import Mapping
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any
+
 from todo.globals import data_path, cache_path, log_path, config_path
 from todo.log import get_logger
+from todo.data.cache import SnapshotCache
 from todo.data.observers import YamlFileObserver
-from todo.data.observed import ObservedDot
+from todo.data.observed import Notify, Observable, ObservedCollection, ObservedDot, _unwrap
 
 logger = get_logger(__name__, use_config=False)
 
 
-def _default_config():
-    logger.info("Generate default config.")
+def _defaults():
     return {
         "first_time": True,
         "logging": {"level": "DEBUG", "path": log_path / "todo.log"},
@@ -24,4 +30,92 @@ def _default_config():
     }
 
 
-config = ObservedDot(YamlFileObserver(_default_config, config_path / "config.yaml").to_observable())
+def _default_config():
+    logger.info("Generate default config.")
+    return _defaults()
+
+
+def _schema(name: str, defaults: dict) -> type:
+    """
+    A frozen dataclass with a field per key of defaults, typed like its default value. Nested
+    dicts become nested dataclasses, except empty ones, whose keys are not known in advance
+    """
+
+    fields = []
+    for key, value in defaults.items():
+        if isinstance(value, dict):
+            kind = _schema(name + key.title(), value) if value else Mapping[str, Any]
+        else:
+            kind = Path if isinstance(value, Path) else type(value)
+        fields.append((key, kind))
+    cls = dataclasses.make_dataclass(name, fields, frozen=True, slots=True)
+    cls.__module__ = __name__
+    return cls
+
+
+def _frozen(value: Any) -> Any:
+    """An immutable copy of some config data"""
+    match value:
+        case ObservedCollection() | ObservedDot():
+            return _frozen(_unwrap(value)._data)
+        case dict():
+            return MappingProxyType({key: _frozen(v) for key, v in value.items()})
+        case list() | tuple():
+            return tuple(_frozen(v) for v in value)
+        case set():
+            return frozenset(_frozen(v) for v in value)
+        case _:
+            return value
+
+
+def _fill(cls: type, data: Any, defaults: dict) -> Any:
+    """An instance of a schema holding data, with defaults for what data does not have"""
+    if not isinstance(data, dict):
+        data = {}
+    values = {}
+    for field in dataclasses.fields(cls):
+        value = data.get(field.name, defaults[field.name])
+        if dataclasses.is_dataclass(field.type):
+            values[field.name] = _fill(field.type, _unwrap(value)._data if isinstance(
+                value, ObservedCollection | ObservedDot) else value, defaults[field.name])
+        else:
+            values[field.name] = _frozen(value)
+    return cls(**values)
+
+
+class ConfigSnapshot(Observable):
+    """
+    The config as frozen dataclasses generated from its default values, read like plain objects:
+    ``config_snapshot.current.integration.interval``. A new snapshot is built when the config
+    changes, and the observers are notified with it once it replaced the current one. Keys
+    missing from the config take their default value; keys the defaults do not have are left
+    out, read them from the config itself.
+    """
+
+    __slots__ = ("schema", "current", "_config", "_defaults")
+
+    def __init__(self, config: ObservedCollection, defaults: dict, name: str = "Config"):
+        super().__init__()
+        self._config = _unwrap(config)
+        self._defaults = defaults
+        self.schema = _schema(name, defaults)
+        self.current = self._build()
+        self._config.root.attach(self._on_change)
+
+    def close(self) -> None:
+        """Stop following the config"""
+        self._config.root.detach(self._on_change)
+
+    def _build(self) -> Any:
+        return _fill(self.schema, self._config._data, self._defaults)
+
+    def _on_change(self, notify: Notify) -> None:
+        snapshot = self._build()
+        if snapshot != self.current:
+            self.current = snapshot
+            self.notify(snapshot)
+
+
+config = ObservedDot(YamlFileObserver(
+    _default_config, config_path / "config.yaml", cache=SnapshotCache(cache_path / "snapshots")).to_observable())
+config_snapshot = ConfigSnapshot(config, _defaults())
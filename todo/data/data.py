@@ -1,12 +1,18 @@
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, cast
+from typing import Optional
 
 from todo.globals import data_path
-from todo.data import YamlFileObserver, ObservedList
+from todo.data import ObservedList, SqliteDatabase, config_snapshot, register_record
 
+# seconds of edits committed to the database at once, e.g. the keystrokes of a note
+WRITE_DELAY = 0.5
 
+database = SqliteDatabase(config_snapshot.current.paths.db, commit_delay=WRITE_DELAY)
+
+
+@register_record
 @dataclass(frozen=True)
 class TodoItem:
     """
@@ -21,9 +27,11 @@ class TodoItem:
     created_date: datetime = field(default_factory=datetime.now)
 
 
-todo_list: ObservedList = cast(ObservedList, YamlFileObserver([], data_path / "todo_list.yaml").to_observable())
+todo_list: ObservedList = database.list(TodoItem, "todos", indexes=("due_date", "completed"),
+                                        migrate_from=data_path / "todo_list.yaml")
 
 
+@register_record
 @dataclass(frozen=True)
 class NoteItem:
     """
@@ -34,4 +42,4 @@ class NoteItem:
     photo: Optional[Path] = None
 
 
-note_list: ObservedList = cast(ObservedList, YamlFileObserver([], data_path / "note_list.yaml").to_observable())
+note_list: ObservedList = database.list(NoteItem, "notes", migrate_from=data_path / "note_list.yaml")
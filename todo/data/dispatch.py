@@ -0,0 +1,212 @@
+import asyncio
+import atexit
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Optional
+
+from todo.error import DispatchError
+from todo.log import get_logger
+
+logger = get_logger(__name__, use_config=False)
+
+
+class Dispatcher(ABC):
+    """
+    Deliver notifications to observers outside of the mutating thread. Attach an observer
+    with ``collection.attach(observer, dispatcher=...)`` to use one.
+    """
+
+    @abstractmethod
+    def submit(self, observer, notify) -> None:
+        """Queue a notification for an observer"""
+
+    @abstractmethod
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued notification is delivered.
+
+        :param timeout: seconds to wait, None waits forever
+        :return: whether the queue was drained in time
+        """
+
+    @abstractmethod
+    def close(self) -> None:
+        """Deliver what is queued, then stop accepting notifications"""
+
+    @staticmethod
+    def _deliver(observer, notify) -> None:
+        try:
+            observer(notify)
+        except Exception as e:
+            logger.error(f"Observer {observer!r} failed on {notify!r}: {e!r}")
+
+
+class _Channel:
+    """A bounded FIFO that its own consumer can always put into"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.items: deque = deque()
+        self.unfinished = 0
+        self.cond = threading.Condition()
+
+    def put(self, item, force: bool, timeout: Optional[float]) -> bool:
+        with self.cond:
+            if not force and not self.cond.wait_for(lambda: len(self.items) < self.maxsize, timeout):
+                return False
+            self.items.append(item)
+            self.unfinished += 1
+            self.cond.notify_all()
+            return True
+
+    def get(self) -> Any:
+        with self.cond:
+            self.cond.wait_for(lambda: self.items)
+            item = self.items.popleft()
+            self.cond.notify_all()
+            return item
+
+    def done(self) -> None:
+        with self.cond:
+            self.unfinished -= 1
+            self.cond.notify_all()
+
+    def join(self, timeout: Optional[float]) -> bool:
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.unfinished, timeout)
+
+
+_STOP = object()
+
+
+class ThreadDispatcher(Dispatcher):
+    def __init__(self, workers: int = 1, maxsize: int = 1024, timeout: Optional[float] = None,
+                 name: str = "todo-dispatch"):
+        """
+        Deliver notifications from background threads.
+
+        Notifications of the same tree always go to the same worker, so observers see the
+        changes of a collection in the order they happened.
+
+        :param workers: the number of threads
+        :param maxsize: the number of queued notifications per worker before submit blocks
+        :param timeout: seconds submit blocks on a full queue before DispatchError is raised,
+            None blocks until there is room
+        :param name: prefix of the thread names
+        """
+
+        self.timeout = timeout
+        self._channels = [_Channel(maxsize) for _ in range(workers)]
+        self._threads = [
+            threading.Thread(target=self._run, args=(channel,), name=f"{name}-{i}", daemon=True)
+            for i, channel in enumerate(self._channels)
+        ]
+        self._closed = False
+        for thread in self._threads:
+            thread.start()
+        atexit.register(self.close)
+
+    def submit(self, observer, notify) -> None:
+        if self._closed:
+            raise DispatchError("Dispatcher is closed")
+        channel = self._channels[id(notify.observed.root) % len(self._channels)]
+        # a worker must never wait on itself: observers that mutate go over the limit instead
+        force = threading.current_thread() in self._threads
+        if not channel.put((observer, notify), force, self.timeout):
+            raise DispatchError(f"Dispatch queue is full ({channel.maxsize} notifications)")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        return all(channel.join(timeout) for channel in self._channels)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        for channel in self._channels:
+            channel.put(_STOP, True, None)
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        atexit.unregister(self.close)
+
+    @property
+    def pending(self) -> int:
+        """The number of notifications not delivered yet"""
+        return sum(channel.unfinished for channel in self._channels)
+
+    def _run(self, channel: _Channel) -> None:
+        while True:
+            item = channel.get()
+            try:
+                if item is _STOP:
+                    return
+                self._deliver(*item)
+            finally:
+                channel.done()
+
+
+class AsyncioDispatcher(Dispatcher):
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = 1024, timeout: Optional[float] = None):
+        """
+        Deliver notifications from a task running on an event loop. The loop schedules
+        callbacks in the order they were submitted, which keeps the changes of a collection
+        in order.
+
+        :param loop: the event loop, which must be running in another thread than the mutations
+        :param maxsize: the number of queued notifications before submit blocks
+        :param timeout: seconds submit blocks on a full queue before DispatchError is raised
+        """
+
+        self.loop = loop
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(maxsize)
+        self._maxsize = maxsize
+        self._idle = threading.Condition()
+        self._pending = 0
+        self._closed = False
+
+    def submit(self, observer, notify) -> None:
+        if self._closed:
+            raise DispatchError("Dispatcher is closed")
+        on_loop = self._on_loop()
+        if not on_loop and not self._slots.acquire(timeout=self.timeout):
+            raise DispatchError(f"Dispatch queue is full ({self._maxsize} notifications)")
+        with self._idle:
+            self._pending += 1
+        if on_loop:
+            self.loop.call_soon(self._run, observer, notify, False)
+        else:
+            self.loop.call_soon_threadsafe(self._run, observer, notify, True)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        if self._on_loop():
+            raise DispatchError("Cannot flush from the event loop the dispatcher runs on")
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def close(self) -> None:
+        if not self._closed and not self._on_loop():
+            self.flush()
+        self._closed = True
+
+    @property
+    def pending(self) -> int:
+        """The number of notifications not delivered yet"""
+        return self._pending
+
+    def _on_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def _run(self, observer, notify, release: bool) -> None:
+        try:
+            self._deliver(observer, notify)
+        finally:
+            if release:
+                self._slots.release()
+            with self._idle:
+                self._pending -= 1
+                self._idle.notify_all()
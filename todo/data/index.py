@@ -0,0 +1,117 @@
+import bisect
+import itertools
+import operator
+from collections.abc import Callable, Hashable
+from typing import Any, Optional
+
+from todo.data.views import Source, SortedView, _Follower
+
+_KEY = operator.itemgetter(0)
+
+
+class HashIndex(_Follower):
+    """
+    The items of a list grouped by a hashable key, kept up to date as the list changes.
+    Lookups run in constant time. Hold ``lock.read()`` of a synchronized tree around queries
+    when other threads mutate it.
+    """
+
+    __slots__ = ("source", "key", "_rows", "_buckets", "_counter", "__weakref__")
+
+    def __init__(self, source: Source, key: Callable[[Any], Hashable]):
+        self.key = key
+        self._rows: list[tuple[Hashable, int, Any]] = []  # (key, tag, item) of every source row
+        # the items of every key by the tag of their row, so that a row leaves its bucket in constant time
+        self._buckets: dict[Hashable, dict[int, Any]] = {}
+        self._counter = itertools.count()
+        self._follow(source)
+
+    def lookup(self, value: Hashable) -> list:
+        """The items whose key equals value"""
+        return list(self._buckets.get(value, {}).values())
+
+    def first(self, value: Hashable, default: Any = None) -> Any:
+        """An item whose key equals value, or default"""
+        bucket = self._buckets.get(value)
+        return next(iter(bucket.values())) if bucket else default
+
+    def keys(self) -> list[Hashable]:
+        return list(self._buckets)
+
+    def __contains__(self, value: Hashable) -> bool:
+        return value in self._buckets
+
+    def _row(self, item: Any) -> tuple[Hashable, int, Any]:
+        return self.key(item), next(self._counter), item
+
+    def _add(self, row: tuple[Hashable, int, Any]) -> None:
+        key, tag, item = row
+        self._buckets.setdefault(key, {})[tag] = item
+
+    def _discard(self, row: tuple[Hashable, int, Any]) -> None:
+        key, tag, _ = row
+        bucket = self._buckets[key]
+        del bucket[tag]
+        if not bucket:
+            del self._buckets[key]
+
+    def _rebuild(self) -> None:
+        self._rows = [self._row(item) for item in self.source._data]
+        self._buckets = {}
+        for row in self._rows:
+            self._add(row)
+
+    def _length(self) -> int:
+        return len(self._rows)
+
+    def _insert(self, start: int, stop: int) -> None:
+        rows = [self._row(item) for item in self.source._data[start:stop]]
+        self._rows[start:start] = rows
+        for row in rows:
+            self._add(row)
+
+    def _delete(self, start: int, stop: int) -> None:
+        for row in self._rows[start:stop]:
+            self._discard(row)
+        del self._rows[start:stop]
+
+    def _update(self, start: int, stop: int) -> None:
+        items = self.source._data
+        for i in range(start, stop):
+            self._discard(self._rows[i])
+            self._rows[i] = row = self._row(items[i])
+            self._add(row)
+
+    def _permute(self, order: list[int]) -> None:
+        self._rows = [self._rows[old] for old in order]
+
+
+class SortedIndex(SortedView):
+    """
+    A sorted view of a list that also answers lookups and range queries on its key in
+    logarithmic time. Keys must be comparable with each other.
+    """
+
+    __slots__ = ()
+
+    def lookup(self, value: Any) -> list:
+        """The items whose key equals value"""
+        return self.range(value, value, inclusive=True)
+
+    def range(self, lo: Optional[Any] = None, hi: Optional[Any] = None, inclusive: bool = False) -> list:
+        """
+        The items whose key is between lo and hi, ordered by key
+
+        :param lo: the smallest key, None for no lower bound
+        :param hi: the key the items stay below, None for no upper bound
+        :param inclusive: whether items whose key equals hi are included
+        """
+
+        start = 0 if lo is None else bisect.bisect_left(self._entries, lo, key=_KEY)
+        if hi is None:
+            stop = len(self._entries)
+        elif inclusive:
+            stop = bisect.bisect_right(self._entries, hi, key=_KEY)
+        else:
+            stop = bisect.bisect_left(self._entries, hi, key=_KEY)
+        return self._data[start:stop]
@@ -0,0 +1,342 @@
+import io
+import os
+import pickle
+import re
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO, Optional
+
+from todo.error import CodecError, YamlFileError
+from todo.log import get_logger
+from todo.data.observed import MISSING, Notify, Observer, ObservedCollection, observable, _unwrap
+from todo.data.codecs import YamlCodec
+from todo.data.operations import Operation, apply, operations_of, ordered, plain
+
+logger = get_logger(__name__, use_config=False)
+
+_FRAME = struct.Struct("<II")  # length and crc32 of a record
+_HEADER = re.compile(rb"# journal generation (\d+)\n")
+_YAML = YamlCodec()
+
+
+class _Pickler(pickle.Pickler):
+    def persistent_id(self, obj: Any) -> Optional[str]:
+        return "MISSING" if obj is MISSING else None
+
+
+class _Unpickler(pickle.Unpickler):
+    def persistent_load(self, pid: Any) -> Any:
+        if pid == "MISSING":
+            return MISSING
+        raise pickle.UnpicklingError(f"Unknown persistent id {pid!r}")
+
+
+def _encode(record: Any) -> bytes:
+    buffer = io.BytesIO()
+    _Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(record)
+    payload = buffer.getvalue()
+    return _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _records(file: BinaryIO) -> tuple[list[Any], int]:
+    """The records of a log, and the offset where the last complete one ends"""
+    records, end = [], 0
+    while len(head := file.read(_FRAME.size)) == _FRAME.size:
+        size, crc = _FRAME.unpack(head)
+        payload = file.read(size)
+        if len(payload) < size or zlib.crc32(payload) != crc:
+            break
+        records.append(_Unpickler(io.BytesIO(payload)).load())
+        end = file.tell()
+    return records, end
+
+
+def _fsync_directory(path: Path) -> None:
+    """Make a rename in the directory durable, where the system allows it"""
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class JournalFileObserver(Observer):
+    def __init__(self, default_data, path: Path | str, sync_delay: float = 0.05, compact_at: int = 1 << 20):
+        """
+        Store a tree as a YAML snapshot and a log of its changes. Each change appends a record
+        of the operations that redo it, the ones UndoManager records, so writing costs as much
+        as the change instead of the whole tree. Loading replays the log over the snapshot.
+
+        The log is flushed on every change and synced to disk at most every sync_delay seconds.
+        Once it passes compact_at bytes, new changes go to the log of the next generation, and
+        a background thread replays the full log over the snapshot, writes the result to a
+        temporary file and renames it over the snapshot, then deletes the old log. The live
+        tree is not involved, so compaction never waits for it. The snapshot starts with a
+        YAML comment naming its generation, so a crash at any point replays exactly the logs
+        it lacks; a record torn by a crash is dropped.
+
+        :param default_data: the data, or a function giving it, when there is no snapshot yet
+        :param path: the snapshot, the logs are next to it
+        :param sync_delay: seconds between the syncs of the log
+        :param compact_at: the size of the log in bytes that starts a compaction
+        """
+
+        self.path = Path(path)
+        self.sync_delay = sync_delay
+        self.compact_at = compact_at
+        self._default_data = default_data
+        self._observed: Optional[ObservedCollection] = None
+        self._lock = threading.Lock()  # guards the log and the state below
+        self._cond = threading.Condition(self._lock)
+        self._generation = 0
+        self._log: Optional[BinaryIO] = None
+        self._size = 0
+        self._dirty = False  # written to the log but not synced
+        self._last_batch = 0  # the batch of the last record, a batch is never split across logs
+        self._compaction: Optional[int] = None  # the generation the snapshot must be brought to
+        self._compacting = False
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def _log_path(self, generation: int) -> Path:
+        return self.path.with_name(f"{self.path.name}.{generation}.journal")
+
+    def _logs(self) -> list[tuple[int, Path]]:
+        pattern = re.compile(re.escape(self.path.name) + r"\.(\d+)\.journal")
+        logs = [(int(m.group(1)), p) for p in self.path.parent.glob(f"{self.path.name}.*.journal")
+                if (m := pattern.fullmatch(p.name))]
+        return sorted(logs)
+
+    def to_observable(self) -> ObservedCollection:
+        """Load the snapshot, replay the logs, and start logging the changes of the tree"""
+        if self._observed is not None:
+            return self._observed
+        obs = observable(self.load())
+        self._log = open(self._log_path(self._generation), "ab")
+        self._size = self._log.tell()
+        obs.attach(self)
+        self._observed = obs
+        self._thread = threading.Thread(target=self._run, name=f"todo-journal-{self.path.name}", daemon=True)
+        self._thread.start()
+        return obs
+
+    def load(self) -> Any:
+        """The data of the snapshot with the logs replayed"""
+        generation, data = self._load_snapshot()
+        obs = observable(data)
+        logs = self._logs()
+        for number, log in logs:
+            if number < generation:
+                log.unlink(missing_ok=True)  # compacted into the snapshot, the crash came before its removal
+                continue
+            with open(log, "rb") as file:
+                records, end = _records(file)
+            self._replay(obs, records)
+            if end < log.stat().st_size:
+                logger.warning(f"Dropping a torn record at the end of {log}")
+                with open(log, "r+b") as file:
+                    file.truncate(end)
+        self._generation = max([generation] + [number for number, _ in logs])
+        if self._generation > generation:
+            self._compaction = self._generation  # a compaction was cut short
+        return _unwrap(obs)._data
+
+    def read(self) -> Any:
+        """
+        The data of the snapshot with the logs replayed, None when there is no snapshot. Unlike
+        load, the files are left as they are: no default data is written, no log is repaired
+        """
+
+        generation, data = self._read_snapshot()
+        if data is None:
+            return None
+        obs = observable(data)
+        for number, log in self._logs():
+            if number >= generation:
+                with open(log, "rb") as file:
+                    self._replay(obs, _records(file)[0])
+        return _unwrap(obs)._data
+
+    def _read_snapshot(self) -> tuple[int, Any]:
+        try:
+            text = self.path.read_bytes() if self.path.exists() else b""
+            data = _YAML.loads(text)
+        except CodecError as e:
+            raise YamlFileError(str(e), self.path) from e
+        except IOError as e:
+            raise YamlFileError(f"Unknown IOError {e!r} during loading", self.path) from e
+        match = _HEADER.match(text)
+        return (int(match.group(1)) if match else 0), data
+
+    def _load_snapshot(self) -> tuple[int, Any]:
+        generation, data = self._read_snapshot()
+        if data is None:
+            logger.info("Loading default data")
+            default = self._default_data
+            data = default() if callable(default) else default
+            if data is None:
+                raise ValueError("default_data cannot be None")
+            self._write_snapshot(0, data)
+            return 0, data
+        return generation, data
+
+    @staticmethod
+    def _replay(root: ObservedCollection, records: list[Any]) -> None:
+        """Apply records in order, the operations of a batch in the order given by ordered"""
+        i = 0
+        while i < len(records):
+            batch, operations = records[i]
+            i += 1
+            if batch:
+                while i < len(records) and records[i][0] == batch:
+                    operations = operations + records[i][1]
+                    i += 1
+                operations = ordered(operations)
+            for operation in operations:
+                apply(root, operation)
+
+    def __call__(self, notify: Notify) -> None:
+        try:
+            operations: list[Operation] = [forward for forward, _ in operations_of(notify)]
+        except (ValueError, TypeError):
+            # e.g. an extended slice: log the collection as a whole instead
+            node = _unwrap(notify.observed)
+            operations = [("restore", notify.path, plain(node._data))]
+        if not operations:
+            return
+        record = _encode((notify.batch, operations))
+        with self._lock:
+            if self._log is None:
+                return
+            if (self._size >= self.compact_at and self._compaction is None and not self._compacting
+                    and not (notify.batch and notify.batch == self._last_batch)):
+                self._rotate()
+            self._log.write(record)
+            self._log.flush()
+            self._size += len(record)
+            self._last_batch = notify.batch
+            if not self._dirty:
+                self._dirty = True
+                self._cond.notify_all()
+
+    def _rotate(self) -> None:
+        """Log in the next generation, and have the snapshot brought up to it"""
+        self._sync()
+        self._log.close()
+        self._generation += 1
+        self._log = open(self._log_path(self._generation), "ab")
+        self._size = 0
+        self._compaction = self._generation
+        self._cond.notify_all()
+
+    def _sync(self) -> None:
+        if self._dirty:
+            os.fsync(self._log.fileno())
+            self._dirty = False
+
+    def _write_snapshot(self, generation: int, data: Any) -> None:
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        try:
+            text = f"# journal generation {generation}\n" + _YAML.dump_text(data)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temporary, "w", encoding="utf-8") as file:
+                file.write(text)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, self.path)
+            _fsync_directory(self.path.parent)
+        except CodecError as e:
+            raise YamlFileError(str(e), self.path) from e
+        except IOError as e:
+            raise YamlFileError(f"Unknown IOError {e!r} during dumping", self.path) from e
+
+    def _compact(self, generation: int) -> None:
+        """Replay the logs older than generation over the snapshot, and write it as generation"""
+        try:
+            base, data = self._load_snapshot()
+            tree = observable(data)
+            for number, log in self._logs():
+                if base <= number < generation:
+                    with open(log, "rb") as file:
+                        self._replay(tree, _records(file)[0])
+            self._write_snapshot(generation, _unwrap(tree)._data)
+        except Exception as e:
+            # the logs are kept, the next compaction replays them again
+            logger.error(f"Compaction of {self.path} failed: {e!r}")
+            return
+        for number, log in self._logs():
+            if number < generation:
+                log.unlink(missing_ok=True)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                self._cond.wait_for(lambda: self._dirty or self._compaction is not None or self._closed)
+                if self._closed:
+                    return
+                generation = self._take_compaction()
+            if generation is not None:
+                self._compact(generation)
+                with self._lock:
+                    self._compacting = False
+                    self._cond.notify_all()
+                continue
+            time.sleep(self.sync_delay)  # let the changes of the window join this sync
+            with self._lock:
+                if self._log is not None:
+                    self._sync()
+
+    def compact(self) -> None:
+        """Bring the snapshot up to date now, on this thread, and start a new log"""
+        with self._lock:
+            self._cond.wait_for(lambda: not self._compacting)
+            if self._log is None:
+                return
+            self._rotate()
+            generation = self._take_compaction()
+        self._compact(generation)
+        with self._lock:
+            self._compacting = False
+            self._cond.notify_all()
+
+    def _take_compaction(self) -> Optional[int]:
+        generation, self._compaction = self._compaction, None
+        self._compacting = generation is not None
+        return generation
+
+    def flush(self) -> None:
+        """Sync what was logged to disk"""
+        with self._lock:
+            if self._log is not None:
+                self._sync()
+
+    def close(self) -> None:
+        """Sync the log, stop logging and wait for a running compaction"""
+        with self._lock:
+            if self._log is None:
+                return
+            self._sync()
+            self._log.close()
+            self._log = None
+            self._closed = True
+            self._cond.notify_all()
+        if self._observed is not None:
+            self._observed.detach(self)
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    @property
+    def log_size(self) -> int:
+        """The bytes logged since the last compaction"""
+        return self._size
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(path={self.path!r})"
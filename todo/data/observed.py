@@ -1,12 +1,25 @@
+import bisect
+import contextlib
+import copy
+import dataclasses
+import datetime
 import functools
+import hashlib
+import inspect
+import itertools
+import operator
+import threading
+import types
 import warnings
+import weakref
 from collections.abc import Iterable, Callable
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Generic, Protocol, TypeVar, cast, Optional, Hashable, Literal, Union
+from pathlib import PurePath
+from typing import Any, Generic, Protocol, TypeVar, cast, Optional, Hashable, Literal, Union, Sequence
 
 from todo.log import get_logger
-from todo.utils import delegate
+from todo.utils import RWLock
 
 logger = get_logger(__name__, use_config=False)
 
@@ -18,43 +31,114 @@ class Observer(Protocol):
         """Called when the observed object changes"""
 
 
+def _identity(observer: Callable) -> Hashable:
+    """
+    The key an observer is registered under. Bound methods are created anew on every attribute
+    access, so they are keyed by their instance and function
+    """
+    kind = type(observer)
+    if kind is types.MethodType:
+        return id(observer.__self__), id(observer.__func__)
+    if kind is _WeakObserver or kind is _Deferred:
+        return observer.key
+    if kind is types.BuiltinMethodType:  # e.g. some_list.append
+        return id(observer.__self__), observer.__name__
+    return id(observer)
+
+
+class _WeakObserver:
+    """An observer held through a weak reference, which does nothing once it is collected"""
+
+    __slots__ = ("ref", "key")
+
+    def __init__(self, observer: Callable, on_death: Callable[[weakref.ref], None]):
+        self.key = _identity(observer)
+        ref = weakref.WeakMethod if isinstance(observer, types.MethodType) else weakref.ref
+        self.ref = ref(observer, on_death)
+
+    def __call__(self, value: Any) -> None:
+        if (observer := self.ref()) is not None:
+            observer(value)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.ref()!r})"
+
+
 class Observable:
-    def __init__(self, value) -> None:
-        self._value = value
-        self._observers: list[Observer] = []
+    """
+    Calls its observers on every change. Observers are registered by identity, so attaching and
+    detaching take constant time whatever their number, and can be held weakly so that
+    attaching does not keep them alive.
+    """
+
+    __slots__ = ("_observers", "__weakref__")
+
+    def __init__(self) -> None:
+        # allocated on the first attach, most nodes of a tree are never observed directly
+        self._observers: Optional[dict[Hashable, Observer]] = None
+
+    def attach(self, obs: list[Observer] | Observer, weak: bool = False) -> None:
+        """
+        Attach an observer to the observable
+
+        :param obs: the observer, or a list of observers
+        :param weak: hold the observer through a weak reference, it is detached when it is
+            garbage collected. A bound method is then as alive as its instance
+        """
 
-    def attach(self, obs: list[Observer] | Observer) -> None:
-        """Attach an observer to the observable"""
         if isinstance(obs, Iterable):
-            [self.attach(o) for o in obs]
+            [self.attach(o, weak) for o in obs]
             return
         obs = cast(Observer, obs)
-        for observer in self._observers:
-            if observer == obs:
-                warnings.warn("Observer already attached")
-                return
-        self._observers.append(obs)
+        key = _identity(obs)
+        if self._observers is None:
+            self._observers = {}
+        elif key in self._observers:
+            warnings.warn("Observer already attached")
+            return
+        self._observers[key] = self._hold(obs, weak)
 
     def detach(self, obs: list[Observer] | Observer) -> None:
         """Detach an observer from the observable"""
         if isinstance(obs, Iterable):
             [self.detach(o) for o in obs]
             return
-        obs = cast(Observer, obs)
-        for observer in self._observers:
-            if observer == obs:
-                self._observers.remove(obs)
-                return
-        raise ValueError("Observer not attached")
+        if self._observers is None or self._observers.pop(_identity(obs), None) is None:
+            raise ValueError("Observer not attached")
 
     def notify(self, value: Any) -> None:
         """Notify all observers of a change"""
-        for observer in self._observers:
-            observer(value)
+        if self._observers:
+            # observers may attach or detach others while being notified
+            for observer in tuple(self._observers.values()):
+                observer(value)
 
     @property
     def observers(self) -> list[Observer]:
-        return self._observers
+        if self._observers is None:
+            return []
+        return [observer for observer in self._observers.values() if _alive(observer)]
+
+    def _hold(self, obs: Observer, weak: bool, path: Optional["KeyPath"] = None) -> Observer:
+        """The observer itself, or a weak reference to it that detaches it once collected"""
+        if not weak:
+            return obs
+        owner, key = weakref.ref(self), _identity(obs)
+
+        def on_death(_: weakref.ref) -> None:
+            if (observable := owner()) is not None:
+                observable._prune(key, path)
+
+        return _WeakObserver(obs, on_death)
+
+    def _prune(self, key: Hashable, path: Optional["KeyPath"]) -> None:
+        """Forget an observer that was garbage collected"""
+        if self._observers is not None:
+            self._observers.pop(key, None)
+
+
+def _alive(observer: Observer) -> bool:
+    return not isinstance(observer, _WeakObserver) or observer.ref() is not None
 
 
 class Action(Enum):
@@ -65,14 +149,69 @@ class Action(Enum):
     READ = "read"
     MOVE = "move"
 
+    @property
+    def flag(self) -> int:
+        """The bit of this action in a subscription mask"""
+        return _FLAGS[self]
+
+
+_FLAGS = {action: 1 << i for i, action in enumerate(Action)}
+READS = _FLAGS[Action.READ]
+WRITES = _FLAGS[Action.CREATE] | _FLAGS[Action.UPDATE] | _FLAGS[Action.DELETE] | _FLAGS[Action.MOVE]
+
+
+def _action_mask(actions: Optional[Iterable[Action | str] | Action | str]) -> int:
+    """Convert the actions an observer subscribes to into a bit mask. None means all writes"""
+    if actions is None:
+        return WRITES
+    if isinstance(actions, Action | str):
+        actions = [actions]
+    return functools.reduce(operator.or_, (Action(action).flag for action in actions), 0)
+
 
 ALL = object()
+MISSING = object()  # in Notify.old, for keys that did not exist
 Index = Union[list[Union[int, slice, Hashable]], Literal[ALL], list[Literal[ALL]]]  # type: ignore
+KeyPath = tuple[Hashable, ...]
+
+
+class _Extra:
+    """The fields of a Notify that most notifications leave unset, allocated on the first one set"""
+
+    __slots__ = ("old", "merged", "fields")
+
+    def __init__(self, old: Optional[list[Any]]):
+        self.old = old
+        self.merged = False
+        self.fields: Optional[tuple[str, ...]] = None
 
 
 @dataclass(init=False)
 class Notify(Generic[T]):
-    """A change to an observable collection"""
+    """
+    A change to an observable collection.
+
+    A MOVE of a range carries the range as index and ``[dst]``, its new start, as value. A MOVE
+    of the whole list carries ALL as index and the permutation as value, ``value[new] = old``,
+    or None when the new order is unknown.
+
+    ``old`` holds what the change replaced: for an UPDATE the previous values in the order of the
+    index, MISSING for keys that did not exist, and ``[content]``, the whole previous content,
+    when the index is ALL or the notification is merged. It is None when nothing was replaced.
+
+    ``version`` is the version the change gave to the collection and its ancestors, see
+    ``ObservedCollection.version``. ``batch`` identifies the batch that emitted the notification,
+    or the call whose several changes belong together such as ``assign``, 0 otherwise.
+
+    ``merged`` tells that the notification stands for several changes made in a batch. A merged
+    DELETE of a list has the positions the items had before the batch, a merged CREATE or
+    UPDATE the ones they have after it.
+
+    ``fields`` names the attributes an UPDATE changed on the records of a list, see
+    ``ObservedList.set_fields``, and is None when the items were replaced as a whole.
+    """
+
+    __slots__ = ("action", "index", "value", "observed", "version", "batch", "_path", "_extra")
 
     action: Action
     index: Optional[Index]
@@ -80,11 +219,54 @@ class Notify(Generic[T]):
     observed: "ObservedCollection"
 
     def __init__(self, type: Action | str, index: Optional[Index], value: Optional[list[Any]],
-                 collection: "ObservedCollection"):
+                 collection: "ObservedCollection", old: Optional[list[Any]] = None):
         self.action = Action(type)
         self.index = Notify._normalize_index(index)
         self.value = value
         self.observed = collection
+        self.version = 0
+        self.batch = 0
+        self._path: Optional[KeyPath] = None
+        self._extra: Optional[_Extra] = _Extra(old) if old is not None else None
+
+    def _more(self) -> "_Extra":
+        if self._extra is None:
+            self._extra = _Extra(None)
+        return self._extra
+
+    @property
+    def old(self) -> Optional[list[Any]]:
+        return self._extra.old if self._extra is not None else None
+
+    @old.setter
+    def old(self, old: Optional[list[Any]]) -> None:
+        if old is not None or self._extra is not None:
+            self._more().old = old
+
+    @property
+    def merged(self) -> bool:
+        return self._extra is not None and self._extra.merged
+
+    @merged.setter
+    def merged(self, merged: bool) -> None:
+        if merged or self._extra is not None:
+            self._more().merged = merged
+
+    @property
+    def fields(self) -> Optional[tuple[str, ...]]:
+        return self._extra.fields if self._extra is not None else None
+
+    @fields.setter
+    def fields(self, fields: Optional[tuple[str, ...]]) -> None:
+        if fields is not None or self._extra is not None:
+            self._more().fields = fields
+
+    @property
+    def path(self) -> KeyPath:
+        """Keys from the root of the tree to the changed collection. The index is not included"""
+        if self._path is None:
+            self._path = self.observed.path
+        return self._path
 
     @staticmethod
     def _normalize_index(index: Any) -> Index:
@@ -96,15 +278,536 @@ class Notify(Generic[T]):
             return list(index)
         raise TypeError(f"Invalid index type: {Action(index)}")
 
+    @staticmethod
+    def merge(notifications: list["Notify"]) -> "Notify":
+        """
+        Merge notifications of the same action on the same collection into one. Each key keeps
+        its last value and its first old value. The positions of a list must not have shifted
+        in between, see ``_Transaction.merged`` for the lists
+
+        :param notifications: the notifications, in the order they were emitted
+        :return: a notification whose index covers all the merged ones
+        """
+
+        if len(notifications) == 1:
+            return notifications[0]
+        last = notifications[-1]
+        if last.action is Action.MOVE:
+            # moves only make sense in sequence: tell that the collection was reordered
+            merged = Notify(Action.MOVE, ALL, None, last.observed)
+        elif isinstance(last.observed, ObservedList):
+            replayed = _replayed(notifications)
+            if replayed is not None and len(replayed) == 1:
+                merged = replayed[0]
+            else:
+                merged = Notify(last.action, ALL, None, last.observed)
+        elif any(i is ALL for notify in notifications for i in notify.index):
+            merged = Notify(last.action, ALL, last.value, last.observed, notifications[0].old)
+        else:
+            values: dict[Hashable, Any] = {}
+            olds: dict[Hashable, Any] = {}
+            for notify in notifications:
+                for n, key in enumerate(notify.index):
+                    values[key] = notify.value[n] if notify.value is not None else None
+                    if notify.old is not None and key not in olds:
+                        olds[key] = notify.old[n]
+            value = list(values.values()) if last.value is not None else None
+            old = [olds.get(key, MISSING) for key in values] if olds else None
+            merged = Notify(last.action, list(values), value, last.observed, old)
+            if all(notify.fields for notify in notifications):
+                merged.fields = tuple(dict.fromkeys(f for notify in notifications for f in notify.fields))
+        merged.version = last.version
+        return merged
+
+
+class _Row:
+    """An item of a list while replaying the changes of a batch"""
+
+    __slots__ = ("origin", "value", "updated", "old")
+
+    def __init__(self, origin: Optional[int], value: Any = None):
+        self.origin = origin  # the position before the batch, None for an item the batch created
+        self.value = value  # the value it was created with
+        self.updated = False
+        self.old = value  # the value before the first update
+
+
+def _replayed(notifications: list["Notify"]) -> Optional[list["Notify"]]:
+    """
+    Replay changes of a list to express them relative to its content before them: a DELETE of
+    the original items at their original positions, a CREATE of the new items at their final
+    positions and an UPDATE of the items replaced in place at their final positions, each when
+    not empty. None when the changes cannot be followed item by item, e.g. moves or extended
+    slices
+    """
+
+    collection = notifications[0].observed
+    net = 0
+    for notify in notifications:
+        if notify.action is Action.MOVE or len(notify.index) != 1 or notify.index[0] is ALL \
+                or isinstance(notify.index[0], slice) and notify.index[0].step not in (None, 1):
+            return None
+        if notify.action is Action.CREATE:
+            net += len(notify.value)
+        elif notify.action is Action.DELETE:
+            net -= len(notify.value)
+        elif notify.action is Action.UPDATE:
+            if notify.old is None:
+                return None
+            net += len(notify.value) - len(notify.old)
+    rows: list = list(range(len(collection._data) - net))
+    removed: dict[int, Any] = {}
+    for notify in notifications:
+        index, value = notify.index[0], notify.value
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(len(rows))
+            stop = max(start, stop)
+        else:
+            start = index + len(rows) if index < 0 else index
+            if notify.action is Action.CREATE:
+                start = min(max(start, 0), len(rows))
+            elif not 0 <= start < len(rows):
+                return None
+            stop = start if notify.action is Action.CREATE else start + 1
+        if notify.action is Action.CREATE:
+            rows[start:start] = [_Row(None, v) for v in value]
+        elif notify.action is Action.DELETE:
+            if stop - start != len(value):
+                return None
+            for row, v in zip(rows[start:stop], value):
+                if isinstance(row, int):
+                    removed[row] = v
+                elif row.origin is not None:
+                    removed[row.origin] = row.old
+            del rows[start:stop]
+        elif stop - start == len(value):
+            for i in range(start, stop):
+                row = rows[i]
+                if isinstance(row, int):
+                    rows[i] = row = _Row(row, notify.old[i - start])
+                row.updated = True
+        else:
+            # an UPDATE of a slice that changes the length removes the items and inserts new ones
+            if stop - start != len(notify.old):
+                return None
+            for row, old in zip(rows[start:stop], notify.old):
+                if isinstance(row, int):
+                    removed[row] = old
+                elif row.origin is not None:
+                    removed[row.origin] = row.old
+            rows[start:stop] = [_Row(None, v) for v in value]
+    data = collection._data
+    if len(rows) != len(data):
+        return None
+    last = notifications[-1]
+    merged = []
+    if removed:
+        positions = sorted(removed)
+        merged.append(Notify(Action.DELETE, _coalesce(positions), [removed[i] for i in positions], collection))
+    created = [i for i, row in enumerate(rows) if not isinstance(row, int) and row.origin is None]
+    if created:
+        merged.append(Notify(Action.CREATE, _coalesce(created), [rows[i].value for i in created], collection))
+    updated = [i for i, row in enumerate(rows) if not isinstance(row, int) and row.updated]
+    if updated:
+        update = Notify(Action.UPDATE, _coalesce(updated), [data[i] for i in updated], collection,
+                        [rows[i].old for i in updated])
+        updates = [notify for notify in notifications if notify.action is Action.UPDATE]
+        if all(notify.fields for notify in updates):
+            update.fields = tuple(dict.fromkeys(f for notify in updates for f in notify.fields))
+        merged.append(update)
+    for notify in merged:
+        notify.version = last.version
+    return merged
+
+
+def _coalesce(index: list) -> list:
+    """Coalesce list positions into sorted, non-overlapping slices"""
+
+    ranges, rest = [], []
+    for i in index:
+        if isinstance(i, int) and i >= 0:
+            ranges.append((i, i + 1))
+        elif isinstance(i, slice) and i.step in (None, 1) and i.start is not None and i.stop is not None \
+                and 0 <= i.start <= i.stop:
+            ranges.append((i.start, i.stop))
+        else:
+            rest.append(i)
+    merged: list[list[int]] = []
+    for start, stop in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], stop)
+        else:
+            merged.append([start, stop])
+    return [start if stop - start == 1 else slice(start, stop) for start, stop in merged] + rest
+
+
+def _unique_keys(keys: list) -> list:
+    """Tell repeated keys apart by their occurrence, so that every key maps to one item"""
+
+    if len(set(keys)) == len(keys):
+        return keys
+    seen: dict[Hashable, int] = {}
+    unique = []
+    for k in keys:
+        n = seen.get(k, 0)
+        seen[k] = n + 1
+        unique.append((k, n))
+    return unique
+
+
+def _longest_increasing(seq: list[int]) -> set[int]:
+    """Positions of a longest strictly increasing subsequence of seq"""
+
+    tails: list[int] = []  # smallest tail value of the increasing runs of each length
+    ends: list[int] = []  # position of that tail in seq
+    previous = [-1] * len(seq)
+    for i, v in enumerate(seq):
+        n = bisect.bisect_left(tails, v)
+        if n:
+            previous[i] = ends[n - 1]
+        if n == len(tails):
+            tails.append(v)
+            ends.append(i)
+        else:
+            tails[n] = v
+            ends[n] = i
+    result = set()
+    i = ends[-1] if ends else -1
+    while i != -1:
+        result.add(i)
+        i = previous[i]
+    return result
+
 
 CollectionObserver = Callable[[Notify], None]
 
 
+def _covers(index: Index, key: Hashable) -> bool:
+    """Whether a notification index touches the given key"""
+    for i in index:
+        if i is ALL or i == key:
+            return True
+        if isinstance(i, slice) and isinstance(key, int):
+            start, stop = i.start, i.stop
+            if (start is not None and start < 0) or (stop is not None and stop < 0):
+                return True
+            if (start is None or start <= key) and (stop is None or key < stop):
+                return True
+    return False
+
+
+def _split_path(path: Sequence[Hashable] | str) -> KeyPath:
+    """Accept both ("a", "b") and "a.b" as a path"""
+    return tuple(path.split(".")) if isinstance(path, str) else tuple(path)
+
+
+class _Deferred:
+    """An observer whose notifications are delivered by a dispatcher"""
+
+    __slots__ = ("observer", "dispatcher", "key")
+
+    def __init__(self, observer: CollectionObserver, dispatcher):
+        self.observer = observer
+        self.dispatcher = dispatcher
+        self.key = _identity(observer)
+
+    def __call__(self, notify: Notify) -> None:
+        # resolve the path now, the tree may have changed by the time it is delivered
+        notify.path
+        self.dispatcher.submit(self.observer, notify)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.observer!r}, {self.dispatcher!r})"
+
+
+class _PathTrie:
+    """Observers attached with a path prefix, keyed by the keys of the prefix"""
+
+    __slots__ = ("observers", "children", "mask")
+
+    def __init__(self):
+        self.observers: dict[Hashable, tuple[CollectionObserver, int]] = {}  # by _identity
+        self.children: dict[Hashable, _PathTrie] = {}
+        self.mask = 0
+
+    def insert(self, path: KeyPath, observer: CollectionObserver, mask: int) -> bool:
+        node = self
+        for key in path:
+            node = node.children.setdefault(key, _PathTrie())
+        if (key := _identity(observer)) in node.observers:
+            return False
+        node.observers[key] = observer, mask
+        node = self
+        node.mask |= mask
+        for key in path:
+            node = node.children[key]
+            node.mask |= mask
+        return True
+
+    def remove(self, key: Hashable, path: Optional[KeyPath] = None) -> bool:
+        """Remove the observer registered under key at path, or anywhere in the trie if path is None"""
+        if path:
+            found = (child := self.children.get(path[0])) is not None and child.remove(key, path[1:])
+        else:
+            found = self.observers.pop(key, None) is not None
+            if not found and path is None:
+                found = any(child.remove(key) for child in list(self.children.values()))
+        if found:
+            self.children = {k: child for k, child in self.children.items() if child.mask}
+            self.mask = functools.reduce(operator.or_, (mask for _, mask in self.observers.values()), 0) | \
+                functools.reduce(operator.or_, (child.mask for child in self.children.values()), 0)
+        return found
+
+    def dispatch(self, path: KeyPath, notify: Notify, flag: int) -> None:
+        """Call the observers whose prefix overlaps the changed path and index"""
+        node = self
+        for key in path:
+            if (node := node.children.get(key)) is None or not node.mask & flag:
+                return
+            node._call(notify, flag, recursive=False)
+        for key, child in node.children.items():
+            if child.mask & flag and _covers(notify.index, key):
+                child._call(notify, flag, recursive=True)
+
+    def _call(self, notify: Notify, flag: int, recursive: bool) -> None:
+        for observer, mask in tuple(self.observers.values()):
+            if mask & flag:
+                observer(notify)
+        if recursive:
+            for child in self.children.values():
+                if child.mask & flag:
+                    child._call(notify, flag, recursive)
+
+
+_BATCHES = itertools.count(1)
+
+
+class _Transaction:
+    """Notifications held back by ``ObservedCollection.batch``"""
+
+    def __init__(self):
+        self.serial = next(_BATCHES)
+        self.depth = 0
+        self.pending: list[Notify] = []
+        self.saved: dict[int, tuple["ObservedCollection", Any]] = {}
+        self.above: set[int] = set()  # the collections with a touched collection below them
+
+    def touch(self, collection: "ObservedCollection") -> None:
+        """Remember the content of a collection before it is first mutated, and its ancestors"""
+        if (key := id(collection._data)) not in self.saved:
+            self.saved[key] = (collection, copy.copy(collection._data))
+            # now, as the batch may detach the collection from them
+            node = collection
+            while (parent := node._parent) is not None:
+                node = _unwrap(parent)
+                self.above.add(id(node._data))
+
+    def rollback(self) -> None:
+        """Restore every touched collection in place, and forget the children the batch added"""
+        # a collection copied for a snapshot during the batch is saved twice: the oldest wins
+        for collection, saved in reversed(self.saved.values()):
+            data = collection._data
+            if isinstance(data, dict | set):
+                data.clear()
+                data.update(saved)
+            else:
+                data[:] = saved
+            if collection._children:
+                kept = {id(value) for value in (data.values() if isinstance(data, dict) else data)}
+                collection._forget([child._data for key, child in list(collection._children.items())
+                                    if key not in kept])
+
+    def merged(self) -> list[Notify]:
+        """
+        The notifications of the batch, in the order the collections first changed. A list that
+        changed several times gets a DELETE, a CREATE and an UPDATE whose positions are relative
+        to its content before the batch for the DELETE and after it for the others, or a single
+        UPDATE of ALL when its changes cannot be followed item by item. Any other collection gets
+        one notification per action. The notifications of a collection that changed several
+        times, or above a collection that changed, are merged: their old content is the one of
+        the whole collection before the batch
+        """
+
+        groups: dict[int, list[Notify]] = {}
+        for notify in self.pending:
+            groups.setdefault(id(notify.observed), []).append(notify)
+        saved: dict[int, Any] = {}
+        for collection, content in self.saved.values():
+            saved.setdefault(id(collection), content)
+        before = self._before()
+        merged = []
+        for group in groups.values():
+            collection = group[0].observed
+            if len(group) == 1:
+                notifications = group
+            elif isinstance(collection, ObservedList) and any(n.action is not Action.MOVE for n in group):
+                notifications = _replayed(group) or [Notify(Action.UPDATE, ALL, None, collection)]
+            else:
+                actions: dict[Action, list[Notify]] = {}
+                for notify in group:
+                    actions.setdefault(notify.action, []).append(notify)
+                notifications = [Notify.merge(notifications) for notifications in actions.values()]
+            for notify in notifications:
+                notify.batch = self.serial
+                # the changes below a collection are not enough to undo its own: they may have
+                # been detached from it, or happened at positions its changes then shifted
+                if len(group) > 1 or id(collection._data) in self.above:
+                    notify.merged = True
+                    notify.old = [before(saved.get(id(collection)), id(collection._data))]
+                    notify.version = group[-1].version
+            merged.extend(notifications)
+        return merged
+
+    def _before(self) -> Callable[[Any, int], Any]:
+        """
+        A function copying the saved content of a collection, with the collections nested in it
+        that the batch also touched as they were before the batch
+        """
+
+        contents: dict[int, Any] = {}
+        above = set(self.above)
+        for collection, content in self.saved.values():
+            contents.setdefault(id(collection._data), content)
+            node = collection
+            while (parent := node._parent) is not None:
+                node = _unwrap(parent)
+                above.add(id(node._data))
+
+        def item(value: Any) -> Any:
+            key = id(value)
+            return content(contents[key], key) if key in contents else content(value, key)
+
+        def content(value: Any, key: int) -> Any:
+            if key not in above:
+                return value
+            if isinstance(value, list):
+                return [item(v) for v in value]
+            if isinstance(value, dict):
+                return {k: item(v) for k, v in value.items()}
+            return value
+
+        return content
+
+
+def _numbered(collection: "ObservedCollection") -> Callable[[Notify], None]:
+    """Notify the changes of one call under one batch number, so that they are undone together"""
+    serial = next(_BATCHES)
+
+    def notify(change: Notify) -> None:
+        change.batch = serial
+        collection.notify(change)
+
+    return notify
+
+
+_UNLOCKED = contextlib.nullcontext()
+_CHILDREN_LOCK = threading.Lock()
+
+
+def _mutation(fn):
+    """
+    Mark a method as mutating the collection, so that it holds the write lock of a synchronized
+    tree, leaves the last snapshot of the tree untouched and a running batch can roll it back
+    """
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        with self._lock.write() if self._lock is not None else _UNLOCKED:
+            root = self.root
+            if self._epoch < root._frozen:
+                self._own(root._frozen)
+            if (tx := root._transaction) is not None:
+                tx.touch(self)
+            return fn(self, *args, **kwargs)
+
+    wrapper._mutates = True
+    return wrapper
+
+
+def _arity(fn: Callable) -> Optional[int]:
+    """The number of arguments of a function, None unless they are all positional without defaults"""
+    code = getattr(fn, "__code__", None)
+    if code is None or getattr(fn, "__defaults__", None) or code.co_kwonlyargcount \
+            or code.co_flags & (inspect.CO_VARARGS | inspect.CO_VARKEYWORDS):
+        return None
+    return code.co_argcount
+
+
+def _access(fn):
+    """Mark a method as reading the collection, so that it holds the read lock of a synchronized tree"""
+
+    # a wrapper with the signature of the method: passing *args and **kwargs costs more than the read
+    arity = _arity(fn)
+    if arity == 1:
+        def wrapper(self):
+            if self._lock is None:
+                return fn(self)
+            with self._lock.read():
+                return fn(self)
+    elif arity == 2:
+        def wrapper(self, arg):
+            if self._lock is None:
+                return fn(self, arg)
+            with self._lock.read():
+                return fn(self, arg)
+    else:
+        def wrapper(self, *args, **kwargs):
+            if self._lock is None:
+                return fn(self, *args, **kwargs)
+            with self._lock.read():
+                return fn(self, *args, **kwargs)
+
+    return functools.wraps(fn)(wrapper)
+
+
+_NO_KEY = object()
+_STALE = -1  # the mask of a collection some observer was detached from
+_VERSIONS = itertools.count(1)
+_EPOCHS = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """
+    The content of a tree when ``ObservedCollection.snapshot()`` was called. It shares the data
+    the tree did not change since, which must not be mutated: the tree copies a collection
+    before its first change after a snapshot instead.
+    """
+
+    data: Any
+    version: int
+
+
+def _unwrap(node) -> "ObservedCollection":
+    """Get the collection behind an ObservedDot"""
+    return node if isinstance(node, ObservedCollection) else node._target
+
+
 class ObservedCollection(Observable, Generic[T]):
+    __slots__ = ("_data", "_parent", "_key", "_lock", "_transaction", "_masks", "_mask", "_reading", "_trie",
+                 "_children", "_version", "_stamps", "_digest", "_epoch", "_frozen")
+
     def __init__(self, data: T | "ObservedCollection[T]", parent: Optional["ObservedCollection"] = None) -> None:
-        super().__init__(data)
+        super().__init__()
         self._data = data
         self._parent = parent
+        self._key: Hashable = _NO_KEY  # where the data sits in the parent, see _key_in
+        self._lock: Optional[RWLock] = None if parent is None else _unwrap(parent)._lock
+        self._transaction: Optional[_Transaction] = None
+        self._masks: Optional[dict[Hashable, int]] = None  # keyed like _observers
+        self._mask = 0
+        # whether an observer of this collection or of an ancestor listens to reads, see _rehear
+        self._reading = parent is not None and _unwrap(parent)._reading
+        self._trie: Optional[_PathTrie] = None
+        self._children: Optional[dict[int, ObservedCollection]] = None
+        self._version = 0
+        # the version at which each key last changed, ALL for the structure of a list
+        self._stamps: Optional[dict[Hashable, int]] = None
+        # (version, digest, digests of the items by id) as of the last digest computed
+        self._digest: Optional[tuple[int, bytes, dict[int, tuple[Any, Optional[bytes]]]]] = None
+        # when the data was last copied, and on the root when the last snapshot was taken
+        self._epoch = 0
+        self._frozen = 0
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__()
@@ -112,6 +815,9 @@ class ObservedCollection(Observable, Generic[T]):
             if not callable(meth) or name in {"__init__", "__new__", "__setitem__",
                                               "__getattr__", "to_data", "data"}:
                 continue
+            # values removed by a mutation must not be parented to the collection again
+            if getattr(meth, "_mutates", False):
+                continue
             wrapper: Callable[[Callable], Callable] = kwargs.get("wrapper", ObservedCollection._observe_wrapper)
             setattr(cls, name, wrapper(meth))
 
@@ -129,15 +835,373 @@ class ObservedCollection(Observable, Generic[T]):
 
     def notify(self, index: Notify) -> None:
         """Notify all observers of a change. Collection call observer with index"""
-        super().notify(index)
-        if self._parent:
+        if index.action is not Action.READ and not index.version and index.observed is self:
+            self._stamp(index)
+        if index.action is not Action.READ and (tx := self.root._transaction) is not None:
+            tx.pending.append(index)
+            return
+        if self._mask & (flag := index.action.flag) and self._remask() & flag:
+            if self._observers:
+                masks = self._masks
+                for key, observer in tuple(self._observers.items()):
+                    # an observer detached by another one meanwhile has no mask anymore
+                    if masks.get(key, 0) & flag:
+                        observer(index)
+            if self._trie is not None and self._trie.mask & flag:
+                self._trie.dispatch(self._relative_path(index.observed, self), index, flag)
+        if self._parent is not None:
             self._parent.notify(index)
 
-    def attach(self, obs: list[CollectionObserver] | CollectionObserver) -> None:
-        super().attach(obs)
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Group the mutations of the whole tree into a transaction. Notifications are held back
+        until the outermost batch exits, then emitted as one merged notification per collection
+        and action. If an exception escapes, every mutation is rolled back and nothing is emitted.
+        """
+
+        root = self.root
+        with root._lock.write() if root._lock is not None else _UNLOCKED:
+            if (tx := root._transaction) is None:
+                tx = root._transaction = _Transaction()
+            tx.depth += 1
+            try:
+                yield self
+            except BaseException:
+                tx.depth -= 1
+                if tx.depth == 0:
+                    root._transaction = None
+                    tx.rollback()
+                raise
+            tx.depth -= 1
+            if tx.depth == 0:
+                root._transaction = None
+                for notify in tx.merged():
+                    notify.observed.notify(notify)
+
+    @property
+    def version(self) -> int:
+        """
+        Increases whenever the collection or anything below it changes. Versions come from one
+        counter shared by every tree, so a version remembered earlier tells in O(1) whether
+        the collection changed since. Nested wrappers are cached weakly, and a recreated one
+        starts at the version of its parent
+        """
+        return self._version
+
+    @_access
+    def changed_since(self, version: int) -> list:
+        """
+        The keys whose value changed, directly or further down, after a version
+
+        :param version: a version of this collection seen earlier
+        :return: the keys, [ALL] when the positions of a list or every key changed
+        """
+
+        if self._version <= version:
+            return []
+        stamps = self._stamps
+        if stamps is None or stamps.get(ALL, 0) > version:
+            return [ALL]
+        return [key for key, stamp in stamps.items() if stamp > version]
+
+    @property
+    @_access
+    def digest(self) -> Optional[bytes]:
+        """
+        A hash of the content of the collection, equal for collections of the same type with
+        equal content, whatever the order of dict keys or set items. Digests are cached per
+        collection and only recomputed along the path of a change; unchanged items reuse
+        theirs. Scalars whose repr tells their whole value are hashed by it, records by their
+        fields. None when the content holds anything else, whose state a hash could miss.
+        """
+
+        cached = self._digest
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+        previous = cached[2] if cached is not None else {}
+        items: dict[int, tuple[Any, Optional[bytes]]] = {}
+        data = self._data
+        if isinstance(data, dict):
+            parts = [(self._digest_of(k, previous, items), self._digest_of(v, previous, items))
+                     for k, v in data.items()]
+            parts = None if any(None in part for part in parts) else sorted(k + v for k, v in parts)
+        elif isinstance(data, set | frozenset):
+            parts = [self._digest_of(item, previous, items) for item in data]
+            parts = None if None in parts else sorted(parts)
+        else:
+            parts = [self._digest_of(item, previous, items) for item in data]
+            parts = None if None in parts else parts
+        if parts is None:
+            digest = None
+        else:
+            digest = hashlib.blake2b(b"".join(parts), digest_size=16,
+                                     person=type(self).__name__.encode()[:16]).digest()
+        self._digest = (self._version, digest, items)
+        return digest
+
+    def _digest_of(self, value, previous: dict, items: dict) -> Optional[bytes]:
+        """
+        The digest of an item. Known items are found by identity: the wrappers of collections
+        are kept so that their cached digest and version survive, scalars and frozen records
+        are kept with their digest so that their id stays theirs. Other records may change in
+        place, they are hashed again every time
+        """
+
+        known = previous.get(id(value))
+        if type(value) in _PLAIN or isinstance(value, _EXACT) \
+                or getattr(getattr(value, "__dataclass_params__", None), "frozen", False):
+            if known is not None and known[0] is value:
+                digest = known[1]
+            else:
+                digest = _value_digest(value)
+            items[id(value)] = (value, digest)
+            return digest
+        if not isinstance(value, list | dict | set | tuple):
+            return _value_digest(value)
+        if known is not None and known[0]._data is value:
+            child = known[0]
+        else:
+            child = observable(value, self)
+        items[id(value)] = (child, None)
+        return child.digest
+
+    def _stamp(self, notify: Notify) -> None:
+        """Give a new version to the collection and its ancestors, and record the changed keys"""
+        version = notify.version = next(_VERSIONS)
+        keys = notify.index
+        node = self
+        if keys[0] is ALL or isinstance(self, ObservedList) and (
+                notify.action is not Action.UPDATE or any(isinstance(key, slice) for key in keys)):
+            # positions moved, or a slice may have been replaced by another length
+            self._version = version
+            self._stamps = {ALL: version}
+            keys, node = self._parent_keys()
+        while node is not None:
+            node._version = version
+            if node._stamps is None:
+                node._stamps = {}
+            size = len(node._data)
+            for key in keys:
+                node._stamps[key + size if isinstance(key, int) and key < 0 else key] = version
+            keys, node = node._parent_keys()
+
+    def _parent_keys(self) -> tuple[list[Hashable], Optional["ObservedCollection"]]:
+        if self._parent is None:
+            return [], None
+        parent = _unwrap(self._parent)
+        return [self._key_in(parent)], parent
+
+    @_access
+    def snapshot(self) -> Snapshot:
+        """
+        Capture the content of the collection in O(1). Nothing is copied until the tree changes:
+        the first change of a collection after a snapshot then copies it and its ancestors,
+        one level each, and the snapshot keeps the originals. A snapshot can be read from any
+        thread while the tree goes on changing.
+        """
+
+        root = _unwrap(self.root)
+        root._frozen = next(_EPOCHS)
+        return Snapshot(self._data, self._version)
+
+    def _own(self, frozen: int) -> None:
+        """Copy the data shared with a snapshot taken at the frozen epoch, and the path to it"""
+        parent = _unwrap(self._parent) if self._parent is not None else None
+        if parent is not None:
+            key = self._key_in(parent)
+            if parent._epoch < frozen:
+                parent._own(frozen)
+        old = self._data
+        self._data = new = copy.copy(old)
+        self._epoch = next(_EPOCHS)
+        if (tx := self.root._transaction) is not None and id(old) in tx.above:
+            tx.above.add(id(new))
+        if parent is not None:
+            parent._data[key] = new
+            if (tx := self.root._transaction) is not None:
+                # a rollback must not put the original, which the snapshot owns, back in the tree
+                for collection, saved in tx.saved.values():
+                    if collection is parent and not isinstance(saved, set | frozenset):
+                        for k, v in saved.items() if isinstance(saved, dict) else enumerate(saved):
+                            if v is old:
+                                saved[k] = new
+            if parent._children is not None and parent._children.get(id(old)) is self:
+                del parent._children[id(old)]
+                parent._children[id(new)] = self
+
+    def synchronize(self) -> "ObservedCollection":
+        """
+        Make the whole tree safe to use from several threads. The tree shares one reader/writer
+        lock: reads run concurrently, mutations and batches are exclusive. Iterating is not
+        atomic, and views returned by keys()/values()/items() are not protected once returned.
+        Hold ``lock.read()`` around them when other threads mutate.
 
-    def detach(self, obs: list[CollectionObserver] | CollectionObserver) -> None:
-        super().detach(obs)
+        :return: the collection
+        """
+
+        root = self.root
+        if root._lock is None:
+            lock = RWLock()
+            nodes = [root]
+            while nodes:
+                node = nodes.pop()
+                node._lock = lock
+                nodes.extend(node._children.values() if node._children else ())
+        return self
+
+    @property
+    def lock(self) -> Optional[RWLock]:
+        """The lock of the tree, None unless synchronize() was called"""
+        return self._lock
+
+    def attach(self, obs: list[CollectionObserver] | CollectionObserver,
+               actions: Optional[Iterable[Action | str] | Action | str] = None,
+               path_prefix: Optional[Sequence[Hashable] | str] = None, dispatcher=None,
+               weak: bool = False) -> None:
+        """
+        Attach an observer to the collection
+
+        :param obs: the observer, or a list of observers
+        :param actions: the actions the observer is notified of. Defaults to every action but
+            READ, so that reads do not cost anything unless someone asks for them.
+        :param path_prefix: only notify the observer of changes that overlap this path, relative
+            to the collection, e.g. ("integrations", "X") or "integrations.X". The change of
+            "integrations.X.password" and the replacement of "integrations" both overlap it.
+        :param dispatcher: a todo.data.dispatch.Dispatcher that calls the observer from another
+            thread, instead of calling it inline on the thread that mutated the collection.
+        :param weak: hold the observer through a weak reference, it is detached when it is
+            garbage collected. A bound method is then as alive as its instance.
+        """
+
+        if isinstance(obs, Iterable):
+            [self.attach(o, actions, path_prefix, dispatcher, weak) for o in obs]
+            return
+        path = _split_path(path_prefix) if path_prefix is not None else ()
+        obs = self._hold(obs, weak, path)
+        if dispatcher is not None:
+            obs = _Deferred(obs, dispatcher)
+        mask = _action_mask(actions)
+        if path:
+            if self._trie is None:
+                self._trie = _PathTrie()
+            if not self._trie.insert(path, obs, mask):
+                warnings.warn("Observer already attached")
+            self._mask = self._remask() | mask
+            if mask & READS and not self._reading:
+                self._rehear()
+            return
+        key = _identity(obs)
+        if self._observers is None:
+            self._observers, self._masks = {}, {}
+        elif key in self._observers:
+            warnings.warn("Observer already attached")
+            return
+        self._observers[key] = obs
+        self._masks[key] = mask
+        self._mask = self._remask() | mask
+        if mask & READS and not self._reading:
+            self._rehear()
+
+    def detach(self, obs: list[CollectionObserver] | CollectionObserver,
+               path_prefix: Optional[Sequence[Hashable] | str] = None) -> None:
+        if isinstance(obs, Iterable):
+            [self.detach(o, path_prefix) for o in obs]
+            return
+        path = None if path_prefix is None else _split_path(path_prefix)
+        if not self._forget_observer(_identity(obs), path):
+            raise ValueError("Observer not attached")
+
+    def _prune(self, key: Hashable, path: Optional[KeyPath]) -> None:
+        self._forget_observer(key, path)
+
+    def _forget_observer(self, key: Hashable, path: Optional[KeyPath]) -> bool:
+        """
+        Remove an observer, attached without a prefix unless path is given. If path is None
+        and it is not attached directly, it is looked for under every prefix
+        """
+
+        if not path and self._observers is not None and self._observers.pop(key, None) is not None:
+            del self._masks[key]
+        elif self._trie is None or not self._trie.remove(key, path):
+            return False
+        # recomputed when next needed, or detaching every observer one by one would be quadratic
+        self._mask = _STALE if self._masks or self._trie is not None else 0
+        if self._reading:
+            self._rehear()
+        return True
+
+    def _remask(self) -> int:
+        """The actions the observers of this collection listen to, recomputed if stale"""
+        if self._mask == _STALE:
+            self._mask = functools.reduce(operator.or_, self._masks.values() if self._masks else (),
+                                          self._trie.mask if self._trie else 0)
+        return self._mask
+
+    @property
+    def path(self) -> KeyPath:
+        """Keys from the root of the tree to this collection"""
+        return self._relative_path(self, None)
+
+    @staticmethod
+    def _relative_path(node: "ObservedCollection", ancestor: Optional["ObservedCollection"]) -> KeyPath:
+        """Keys from an ancestor, or the root if None, down to the node"""
+        keys = []
+        while node is not ancestor and (parent := node._parent) is not None:
+            parent = _unwrap(parent)
+            keys.append(node._key_in(parent))
+            node = parent
+        keys.reverse()
+        return tuple(keys)
+
+    def _key_in(self, parent: "ObservedCollection") -> Hashable:
+        """
+        Where the data of this collection sits in its parent. The last known key is checked
+        first, and the parent is scanned only when it moved
+        """
+
+        data = parent._data
+        if isinstance(data, set | frozenset):
+            return self._data
+        try:
+            if self._key is not _NO_KEY and data[self._key] is self._data:
+                return self._key
+        except (LookupError, TypeError):
+            pass
+        for key, value in data.items() if isinstance(data, dict) else enumerate(data):
+            if value is self._data:
+                self._key = key
+                return key
+        return None
+
+    def _rehear(self) -> None:
+        """
+        Recompute whether an observer of this collection or of one of its ancestors listens to
+        reads, and so for the cached children whose answer changes. Reads only check that flag,
+        it is kept up to date when observers are attached or detached and collections move.
+        """
+
+        parent = self._parent
+        reading = bool(self._remask() & READS) or parent is not None and _unwrap(parent)._reading
+        if reading != self._reading:
+            self._reading = reading
+            if self._children:
+                for child in list(self._children.values()):
+                    child._rehear()
+
+    def _subscribed(self, flag: int) -> bool:
+        """
+        Whether an observer of this collection or of one of its ancestors listens to the actions
+        in flag. Only the masks of the nodes are looked at, so nothing is allocated.
+        """
+
+        node = self
+        while node is not None:
+            node = _unwrap(node)
+            if node._mask & flag and node._remask() & flag:
+                return True
+            node = node._parent
+        return False
 
     @property
     def observers(self) -> list[CollectionObserver]:
@@ -145,60 +1209,166 @@ class ObservedCollection(Observable, Generic[T]):
 
     @classmethod
     def _observe_wrapper(cls, fn):
-        @functools.wraps(fn)
-        def wrapper(self, *args, **kwargs):
-            obs = observable(fn(self, *args, **kwargs), self)
-            return obs
+        arity = _arity(fn)
+        if arity == 1:
+            def wrapper(self):
+                return observable(fn(self), self)
+        elif arity == 2:
+            def wrapper(self, arg):
+                return observable(fn(self, arg), self)
+        else:
+            def wrapper(self, *args, **kwargs):
+                return observable(fn(self, *args, **kwargs), self)
 
-        return wrapper
+        return functools.wraps(fn)(wrapper)
 
     T = TypeVar("T")
 
+    def _child(self, data, cls: type["ObservedCollection"], parent) -> "ObservedCollection":
+        """
+        Get the wrapper of a nested collection, creating it on first access. Wrappers are keyed
+        by the identity of the wrapped data, so they survive reordering, and held until the data
+        is removed or replaced, so the observers attached through a temporary stay attached.
+        """
+
+        if self._lock is not None:
+            # readers run concurrently, but must agree on a single wrapper per child
+            with _CHILDREN_LOCK:
+                return self._cached_child(data, cls, parent)
+        return self._cached_child(data, cls, parent)
+
+    def _cached_child(self, data, cls: type["ObservedCollection"], parent) -> "ObservedCollection":
+        if (children := self._children) is None:
+            children = self._children = {}
+        elif (child := children.get(id(data))) is not None:
+            if child._parent is not parent:
+                child._parent = parent
+                child._rehear()
+            child._lock = self._lock
+            return child
+        children[id(data)] = child = cls(data, parent)
+        # what changed below the data before it was wrapped is unknown: assume everything did
+        child._version = self._version
+        return child
+
+    def _forget(self, values: Optional[Iterable] = None) -> None:
+        """
+        Drop the cached wrappers of children that were removed or replaced, and detach them
+        so that they no longer notify this collection. None forgets every child.
+        """
+
+        if not self._children:
+            return
+        if values is None:
+            for child in list(self._children.values()):
+                child._parent = None
+                if child._reading:
+                    child._rehear()
+            self._children.clear()
+            return
+        for value in values:
+            if (child := self._children.pop(id(value), None)) is not None:
+                child._parent = None
+                if child._reading:
+                    child._rehear()
+
+    def _forget_at(self, key) -> None:
+        """Forget the children currently stored at key"""
+        if not self._children:
+            return
+        try:
+            old = self._data[key]
+        except (KeyError, IndexError):
+            return
+        self._forget(old if isinstance(key, slice) else [old])
+
+    def _position(self, key, inserting: bool = False):
+        """key as the notifications of a change at it carry it, see ObservedList._position"""
+        return key
+
+    @_mutation
     def __setitem__(self, key, item):
+        key = self._position(key)
+        try:
+            old = self._data[key]
+        except KeyError:
+            old = MISSING
+        self._forget_at(key)
+        if isinstance(key, slice):
+            # the values of a slice line up with the positions, as for the other list changes
+            self._data[key] = item = list(item)
+            self.notify(Notify(Action.UPDATE, [key], item, self, old))
+            return
         self._data[key] = item
-        self.notify(Notify(Action.UPDATE, [key], [item], self))
+        self.notify(Notify(Action.UPDATE, [key], [item], self, [old]))
 
+    @_access
     def __getitem__(self, key):
-        self.notify(Notify(Action.READ, [key], [result := self._data[key]], self))
+        result = self._data[key]
+        if self._reading:
+            self.notify(Notify(Action.READ, [key], [result], self))
+        if isinstance(key, slice):
+            return result
+        if isinstance(result := observable(result, self), ObservedCollection):
+            result._key = key
         return result
 
+    @_mutation
     def __delitem__(self, key):
-        result = None
-        try:
-            result = self._data.pop(key)
-        except AttributeError:
-            del self._data[key]
-        self.notify(Notify(Action.DELETE, [key], result, self))
+        key = self._position(key)
+        result = self._data[key]
+        self._forget(result if isinstance(key, slice) else [result])
+        del self._data[key]
+        self.notify(Notify(Action.DELETE, [key], result if isinstance(key, slice) else [result], self))
 
+    @_access
     def __contains__(self, key):
-        self.notify(Notify(Action.READ, [key], [result := key in self._data], self))
+        result = key in self._data
+        if self._reading:
+            self.notify(Notify(Action.READ, [key], [result], self))
         return result
 
+    @_access
     def __len__(self):
-        self.notify(Notify(Action.READ, ALL, [result := len(self._data)], self))
+        result = len(self._data)
+        if self._reading:
+            self.notify(Notify(Action.READ, ALL, [result], self))
         return result
 
+    @_access
     def __repr__(self):
         # prevent infinite recursion
-        self.notify(Notify(Action.READ, ALL, None, self))
+        if self._reading:
+            self.notify(Notify(Action.READ, ALL, None, self))
         return f"{type(self).__name__}({self._data!r})"
 
+    @_access
     def __str__(self):
         # prevent infinite recursion
-        self.notify(Notify(Action.READ, ALL, None, self))
+        if self._reading:
+            self.notify(Notify(Action.READ, ALL, None, self))
         return str(self._data)
 
+    @_access
     def __eq__(self, other):
-        self.notify(Notify(Action.READ, ALL, [result := self._data == other], self))
+        result = self._data == other
+        if self._reading:
+            self.notify(Notify(Action.READ, ALL, [result], self))
         return result
 
+    @_access
     def __bool__(self):
-        self.notify(Notify(Action.READ, ALL, [result := bool(self._data)], self))
+        result = bool(self._data)
+        if self._reading:
+            self.notify(Notify(Action.READ, ALL, [result], self))
         return result
 
     @property
+    @_access
     def data(self):
-        self.notify(Notify(Action.READ, ALL, [result := self.to_data()], self))
+        result = self.to_data()
+        if self._reading:
+            self.notify(Notify(Action.READ, ALL, [result], self))
         return result
 
     def to_data(self) -> T:
@@ -212,7 +1382,7 @@ class ObservedCollection(Observable, Generic[T]):
 
     @property
     def root(self):
-        if self._parent:
+        if self._parent is not None:
             return self._parent.root
         return self
 
@@ -222,6 +1392,8 @@ class ObservedList(ObservedCollection[list]):
     Represent an observable list.
     """
 
+    __slots__ = ()
+
     def __init__(self, data: list = None, parent: Optional[ObservedCollection] = None):
         if data is None:
             data = []
@@ -229,54 +1401,241 @@ class ObservedList(ObservedCollection[list]):
 
     _PLACEHOLDER = object()
 
+    def _position(self, key, inserting: bool = False):
+        """
+        key as a position relative to the list before the change: a non-negative index, clamped
+        to the list as list.insert does when inserting, or a slice with explicit bounds. The
+        observers of the list can then use it as it is. An index out of the list is left for the
+        list to reject
+        """
+
+        length = len(self._data)
+        if isinstance(key, slice):
+            start, stop, step = key.indices(length)
+            if step == 1:
+                return slice(start, max(start, stop))
+            return slice(start, stop if stop >= 0 else None, step)
+        if key < 0:
+            key += length
+        return min(max(key, 0), length) if inserting else key
+
+    @_mutation
     def append(self, item):
         self._data.append(item)
         self.notify(Notify(Action.CREATE, [len(self._data) - 1], [item], self))
 
+    @_mutation
     def remove(self, target):
-        for idx, item in enumerate(self._data):
-            if item == target:
-                self.notify(Notify(Action.DELETE, [idx], [self._data.pop(idx)], self))
-                return
-        raise ValueError(f"Item {target} not found in list")
+        try:
+            idx = self._data.index(target)
+        except ValueError:
+            raise ValueError(f"Item {target} not found in list") from None
+        self._forget_at(idx)
+        self.notify(Notify(Action.DELETE, [idx], [self._data.pop(idx)], self))
 
+    @_mutation
     def pop(self, idx: int):
+        idx = self._position(idx)
+        self._forget_at(idx)
         self.notify(Notify(Action.DELETE, [idx], [self._data.pop(idx)], self))
 
+    @_mutation
     def extend(self, iterable):
         it = list(iterable)
         self._data.extend(it)
         self.notify(Notify(Action.CREATE, [slice(len(self._data) - len(it), len(self._data))], it, self))
 
+    @_mutation
     def reverse(self):
-        self._data.reverse()
-        self.notify(Notify(Action.MOVE, ALL, self._data, self))
+        self._permute(range(len(self._data) - 1, -1, -1))
 
+    @_mutation
     def clear(self):
+        self._forget()
+        old = self._data[:]
         self._data.clear()
-        self.notify(Notify(Action.DELETE, ALL, None, self))
+        self.notify(Notify(Action.DELETE, ALL, None, self, [old]))
 
+    @_mutation
     def sort(self, key=None, reverse=False):
-        self._data.sort(key=key, reverse=reverse)
-        self.notify(Notify(Action.MOVE, ALL, self._data, self))
+        data = self._data
+        self._permute(sorted(range(len(data)), key=(lambda i: key(data[i])) if key else data.__getitem__,
+                             reverse=reverse))
+
+    @_mutation
+    def set_fields(self, index: int, **changes) -> None:
+        """
+        Replace the item at index, a dataclass instance, with a copy whose fields take the given
+        values. The copy is shallow and skips __init__. Notify an UPDATE whose ``fields`` are the
+        changed fields, or nothing if they already held these values.
+        """
 
+        index = self._position(index)
+        old = self._data[index]
+        if all(getattr(old, name, _NO_KEY) == value for name, value in changes.items()):
+            return
+        self._data[index] = new = _replaced(old, changes)
+        notify = Notify(Action.UPDATE, [index], [new], self, [old])
+        notify.fields = tuple(changes)
+        self.notify(notify)
+
+    @_mutation
+    def permute(self, order: Sequence[int]) -> None:
+        """Reorder the items, order[new position] being the old position"""
+        if sorted(order) != list(range(len(self._data))):
+            raise ValueError(f"{order} is not a permutation of {len(self._data)} items")
+        self._permute(order)
+
+    def _permute(self, order: Sequence[int]) -> None:
+        """Reorder the items, order[new position] being the old position. Notify the permutation"""
+        order = list(order)
+        if order == list(range(len(order))):
+            return
+        data = self._data
+        data[:] = [data[i] for i in order]
+        self.notify(Notify(Action.MOVE, ALL, order, self))
+
+    @_mutation
+    def move(self, src: int, dst: int, count: int = 1) -> None:
+        """
+        Move count items starting at src so that they start at dst afterwards. Notify MOVE with
+        the moved range as index and [dst] as value.
+
+        :param src: the position of the first item to move
+        :param dst: the position of the first moved item once moved
+        :param count: the number of items to move
+        """
+
+        data = self._data
+        if count < 0 or not 0 <= src <= len(data) - count or not 0 <= dst <= len(data) - count:
+            raise IndexError(f"Cannot move {count} items from {src} to {dst} in a list of {len(data)}")
+        if src == dst or not count:
+            return
+        items = data[src:src + count]
+        del data[src:src + count]
+        data[dst:dst] = items
+        self.notify(Notify(Action.MOVE, [src if count == 1 else slice(src, src + count)], [dst], self))
+
+    @_mutation
     def insert(self, idx: int, item):
+        idx = self._position(idx, inserting=True)
         self._data.insert(idx, item)
         self.notify(Notify(Action.CREATE, [idx], [item], self))
 
+    @_mutation
+    def assign(self, items: Iterable, key: Optional[Callable[[Any], Hashable]] = None) -> None:
+        """
+        Replace the content of the list, notifying only what changed: DELETE for the items
+        that are gone, CREATE for the new ones, MOVE for the ones that changed position (the
+        index is where the item was, the value where it went) and UPDATE for the ones that
+        compare different. The fewest items possible move.
+
+        :param items: the new content
+        :param key: identify an item across the old and new content, e.g.
+            ``lambda todo: todo.created_date``; defaults to the item itself, keys must be hashable
+        """
+
+        notify = _numbered(self)
+        data = self._data
+        new = list(items)
+        new_keys = _unique_keys([key(item) for item in new] if key else new)
+        target = {k: j for j, k in enumerate(new_keys)}
+        keys = _unique_keys([key(item) for item in data] if key else list(data))
+
+        # drop what is gone, from the end so that the positions before stay valid
+        for run in reversed(_coalesce([i for i, k in enumerate(keys) if k not in target])):
+            removed = data[run] if isinstance(run, slice) else [data[run]]
+            self._forget(removed)
+            del data[run], keys[run]
+            notify(Notify(Action.DELETE, [run], removed, self))
+
+        # items on a longest run of increasing target positions stay, the others move around them
+        kept = set(keys)
+        stable = {keys[i] for i in _longest_increasing([target[k] for k in keys])}
+        j = len(new) - 1
+        while j >= 0:
+            k = new_keys[j]
+            if k in stable:
+                j -= 1
+                continue
+            # everything after j is in place: new items go right before the next one
+            pos = keys.index(new_keys[j + 1]) if j + 1 < len(new) else len(data)
+            if k not in kept:
+                start = j
+                while start and new_keys[start - 1] not in kept:
+                    start -= 1
+                data[pos:pos] = new[start:j + 1]
+                keys[pos:pos] = new_keys[start:j + 1]
+                index = pos if start == j else slice(pos, pos + j + 1 - start)
+                notify(Notify(Action.CREATE, [index], new[start:j + 1], self))
+                j = start - 1
+                continue
+            src = keys.index(k)
+            if src < pos:
+                pos -= 1
+            data.insert(pos, data.pop(src))
+            keys.insert(pos, keys.pop(src))
+            notify(Notify(Action.MOVE, [src], [pos], self))
+            j -= 1
+
+        # every item is in place now, replace those with the same key but another value
+        for run in _coalesce([i for i, item in enumerate(data) if item is not new[i] and item != new[i]]):
+            old = data[run] if isinstance(run, slice) else [data[run]]
+            self._forget(old)
+            data[run] = new[run]
+            notify(Notify(Action.UPDATE, [run], new[run] if isinstance(run, slice) else [new[run]], self, old))
+
+    @_access
     def __add__(self, other):
         return self._data + other
 
+    @_access
     def __mul__(self, other):
         return self._data * other
 
+    @_access
     def to_data(self) -> T:
         return [item.to_data() if isinstance(item, ObservedCollection) else item for item in self._data]
 
+    def filtered(self, pred: Callable[[Any], bool]) -> "FilteredView":
+        """A live view of the items pred accepts, see todo.data.views"""
+        from todo.data.views import FilteredView
+        return FilteredView(self, pred)
+
+    def sorted(self, key: Callable[[Any], Any]) -> "SortedView":
+        """A live view of the items ordered by key, see todo.data.views"""
+        from todo.data.views import SortedView
+        return SortedView(self, key)
+
+    def mapped(self, fn: Callable[[Any], Any]) -> "MappedView":
+        """A live view of fn applied to every item, see todo.data.views"""
+        from todo.data.views import MappedView
+        return MappedView(self, fn)
+
+    def create_index(self, key: str | Callable[[Any], Any],
+                     kind: Literal["hash", "sorted"] = "hash") -> Union["HashIndex", "SortedIndex"]:
+        """
+        A secondary index on the items, kept up to date as the list changes, see todo.data.index
+
+        :param key: the attribute of the items to index on, or a function of an item
+        :param kind: "hash" for lookups by equality, "sorted" for ordered lookups and ranges
+        """
+
+        from todo.data.index import HashIndex, SortedIndex
+        if isinstance(key, str):
+            key = operator.attrgetter(key)
+        if kind == "hash":
+            return HashIndex(self, key)
+        if kind == "sorted":
+            return SortedIndex(self, key)
+        raise ValueError(f"Unknown index kind {kind!r}")
+
 
 class ObservedDict(ObservedCollection[dict]):
     """Represents an observable dict"""
 
+    __slots__ = ()
+
     def __init__(self, data: dict = None, parent: Optional[ObservedCollection] = None):
         if data is None:
             data = {}
@@ -284,159 +1643,300 @@ class ObservedDict(ObservedCollection[dict]):
 
     _PLACEHOLDER = object()
 
+    @_access
     def get(self, key: str, default=None):
-        self.notify(Notify(Action.READ, [key], [result := self._data.get(key, default)], self))
+        result = self._data.get(key, default)
+        if self._reading:
+            self.notify(Notify(Action.READ, [key], [result], self))
         return result
 
+    @_mutation
     def setdefault(self, key: str, default=None):
         # can't in 1 lookup because of notify
         if (result := self.get(key, self._PLACEHOLDER)) is self._PLACEHOLDER:
             self._data[key] = default
             self.notify(Notify(Action.CREATE, [key], [default], self))
-            return default
+            return observable(default, self)
         return result
 
+    @_mutation
     def pop(self, key: str):
+        self._forget_at(key)
         self.notify(Notify(Action.DELETE, [key], [result := self._data.pop(key)], self))
         return result
 
+    @_mutation
     def clear(self):
+        self._forget()
+        old = self._data.copy()
         self._data.clear()
-        self.notify(Notify(Action.DELETE, ALL, None, self))
+        self.notify(Notify(Action.DELETE, ALL, None, self, [old]))
 
+    @_mutation
     def update(self, other: dict):
         other_keys = set(other.keys())
         self_keys = set(self._data.keys())
-        updates = other_keys & self_keys
+        updates = list(other_keys & self_keys)
         creates = other_keys - self_keys
+        old = [self._data[key] for key in updates]
+        self._forget(old)
         self._data.update(other)  # C is way faster than python
+        notify = _numbered(self)
         if updates:
-            self.notify(Notify(Action.UPDATE, updates, [other[key] for key in updates], self))
+            notify(Notify(Action.UPDATE, updates, [other[key] for key in updates], self, old))
         if creates:
-            self.notify(Notify(Action.CREATE, creates, [other[key] for key in creates], self))
+            notify(Notify(Action.CREATE, creates, [other[key] for key in creates], self))
 
+    @_mutation
     def popitem(self):
         key, value = self._data.popitem()
+        self._forget([value])
         self.notify(Notify(Action.DELETE, [key], [value], self))
         return key, value
 
+    @_access
     def keys(self):
-        self.notify(Notify(Action.READ, ALL, [self._data.keys()], self))
+        if self._reading:
+            self.notify(Notify(Action.READ, ALL, [self._data.keys()], self))
         return self._data.keys()
 
+    @_access
     def values(self):
-        self.notify(Notify(Action.READ, ALL, [self._data.values()], self))
+        if self._reading:
+            self.notify(Notify(Action.READ, ALL, [self._data.values()], self))
         return self._data.values()
 
+    @_access
     def items(self):
-        self.notify(Notify(Action.READ, ALL, [self._data.items()], self))
+        if self._reading:
+            self.notify(Notify(Action.READ, ALL, [self._data.items()], self))
         return self._data.items()
 
+    @_access
     def to_data(self) -> T:
         return {key: value.to_data() if isinstance(value, ObservedCollection) else value for key, value in
                 self._data.items()}
 
 
-def _attribute_observe(cls):
-    """Wrap a class that returns AttributeObservable instances in an observable"""
-
-    def _fn_wrapper(fn):
-        @functools.wraps(fn)
-        def _wrapped_func(self, *args, **kwargs):
-            obs = observable(fn(self, *args, **kwargs), self)
-            return obs if not isinstance(obs, ObservedCollection) else ObservedDot(obs)
-
-        return _wrapped_func
-
-    def _meth_wrapper(self, meth):
-        @functools.wraps(meth)
-        def _bound_method(*args, **kwargs):
-            obs = observable(meth(*args, **kwargs), self)
-            return obs if not isinstance(obs, ObservedCollection) else ObservedDot(obs)
-
-        return _bound_method
-
-    for attribute_name, fn in cls.__dict__.items():
-        if attribute_name in {"__init__", "__new__", "__getattr__", "__setattr__", "__setitem__", "__delitem__"}:
-            continue
-        if not callable(fn):
-            continue
-        setattr(cls, attribute_name, _fn_wrapper(fn))
-
-    _getattr = getattr(cls, "__getattr__", None)
-    if _getattr is not None:
-        def _wrapped_getattr(self, name: str):
-            if name in {"notify", "to_data", "data", "parent", "root"}:
-                return _getattr(self, name)
-            if isinstance(value := observable(_getattr(self, name), self), ObservedCollection):
-                return ObservedDot(value)
-            if callable(value):
-                return _meth_wrapper(self, value)
-            return value
-
-        setattr(cls, "__getattr__", _wrapped_getattr)
-    return cls
+class ObservedDot:
+    """
+    A decorator for an observable dict that allows to access the dict values as attributes.
 
+    Nested collections come back as ObservedDot too, created once per key and reused as long
+    as the key holds the same data, and methods are forwarded by functions made once. A read
+    such as ``config.integration.interval`` is then a dict lookup per level, unless the tree
+    is synchronized or READ is subscribed to, which take the regular path.
+    """
 
-@_attribute_observe
-@delegate(instance_name="_data", target=ObservedCollection)
-class ObservedDot:
-    """A decorator for an observable dict that allows to access the dict values as attributes"""
+    __slots__ = ("_target", "_cache", "__weakref__")
 
     def __init__(self, data: ObservedCollection | list | set | dict | tuple,
                  parent: Optional[ObservedCollection] = None):
-        self.__dict__["_data"] = observable(data, parent or getattr(data, "parent", None))
-
-    def __getattr__(self, item):
-        if isinstance(self._data, ObservedDict):
-            try:
-                return self._data[item]
-            except KeyError:
-                pass
-        raise AttributeError(f"{self.__class__} has no attribute {item}")
+        object.__setattr__(self, "_target", observable(data, parent or getattr(data, "parent", None)))
+        # dict key -> (data the key held, its ObservedDot), method name -> forwarding function
+        object.__setattr__(self, "_cache", {})
+
+    def __getattribute__(self, name: str):
+        # __getattr__ alone would first raise an AttributeError on every key, which is slow.
+        # _lookup inlined: a call is a good part of what this costs
+        if name[0] != "_":
+            target = _target_of(self)
+            data = target._data
+            if type(data) is dict and target._lock is None and not target._reading:
+                value = data.get(name, _NO_KEY)
+                if value is _NO_KEY:
+                    if (cached := _cache_of(self).get(name)) is not None and type(cached) is not tuple:
+                        return cached
+                elif type(value) in _PLAIN or not isinstance(value, _NESTED):
+                    return value
+                elif (cached := _cache_of(self).get(name)) is not None and type(cached) is tuple \
+                        and cached[0] is value:
+                    return cached[1]
+        return _get(self, name)
+
+    def __getattr__(self, name: str):
+        target = _target_of(self)
+        if isinstance(target, ObservedDict):
+            if (value := self._resolve(name)) is not _SLOW:
+                if value is not _NO_KEY:
+                    return value
+            else:
+                try:
+                    return self._child(name, target[name])
+                except KeyError:
+                    pass
+        value = getattr(target, name)
+        if callable(value):
+            return self._method(name, value)
+        return value if name in _UNDOTTED else _dotted(value, self)
 
     def __setattr__(self, key, value):
-        if key.startswith("_") or not isinstance(self._data, ObservedDict):
-            super().__setattr__(key, value)
+        if key.startswith("_") or not isinstance(self._target, ObservedDict):
+            object.__setattr__(self, key, value)
+        else:
+            self._target[key] = value
+
+    def __getitem__(self, key):
+        if (value := _lookup(self, key)) is not _NO_KEY and value is not _SLOW:
+            return value
+        target = self._target
+        if value is _SLOW and isinstance(target, ObservedDict) and (value := self._resolve(key)) is not _SLOW:
+            if value is _NO_KEY:
+                raise KeyError(key)
+            return value
+        return self._child(key, target[key]) if isinstance(target, ObservedDict) else _dotted(target[key], self)
+
+    def __iter__(self):
+        for item in _target_of(self):
+            yield _dotted(item, self)
+
+    def _resolve(self, key: Hashable) -> Any:
+        """
+        The value of a key as target[key] gives it, with a collection as a cached ObservedDot,
+        but without the read wrapper of target[key]: _SLOW when a lock or a READ subscriber
+        needs it, _NO_KEY when the key is missing
+        """
+
+        target = _target_of(self)
+        if target._lock is not None or target._reading:
+            return _SLOW
+        if (value := target._data.get(key, _NO_KEY)) is _NO_KEY or not isinstance(value, _NESTED):
+            return value
+        if (cached := _cache_of(self).get(key)) is not None and type(cached) is tuple and cached[0] is value:
+            return cached[1]
+        # parented to this dot right away, as the ObservedDot made of it would do anyway
+        if isinstance(child := observable(value, self), ObservedCollection):
+            child._key = key
+        return self._child(key, child)
+
+    def _child(self, key: Hashable, value: Any) -> Any:
+        """The ObservedDot of a collection held by a key, reused while the key holds the same data"""
+        if not isinstance(value, ObservedCollection):
+            return value
+        cache = _cache_of(self)
+        if (cached := cache.get(key)) is not None and type(cached) is tuple and cached[0] is value._data:
+            return cached[1]
+        dot = ObservedDot(value, self)
+        cache[key] = value._data, dot
+        return dot
+
+    def _method(self, name: str, method: Callable) -> Callable:
+        if (cached := self._cache.get(name)) is not None and type(cached) is not tuple:
+            return cached
+        if name in _UNDOTTED:
+            forward = method
         else:
-            self._data[key] = value
+            target, dot = self._target, weakref.ref(self)
+
+            @functools.wraps(method)
+            def forward(*args, **kwargs):
+                return _dotted(getattr(target, name)(*args, **kwargs), dot())
+
+        self._cache[name] = forward
+        return forward
+
+
+_get = object.__getattribute__
+_target_of = ObservedDot.__dict__["_target"].__get__
+_cache_of = ObservedDot.__dict__["_cache"].__get__
+_SLOW = object()
+_NESTED = (list, dict, set, tuple, ObservedCollection)
+_UNDOTTED = frozenset({"notify", "to_data", "data", "parent", "root"})  # returned as they are
+
+
+def _lookup(dot: ObservedDot, key: Hashable) -> Any:
+    """
+    The value of a key of the dict behind an ObservedDot, read without going through the
+    collection. _NO_KEY when it is missing, _SLOW when the regular path must be taken: for a
+    synchronized tree, a READ subscriber on the collection or above it (one flag, see
+    ObservedCollection._rehear) or a collection without a cached ObservedDot
+    """
+
+    target = _target_of(dot)
+    data = target._data
+    if type(data) is not dict or target._lock is not None or target._reading:
+        return _SLOW
+    value = data.get(key, _NO_KEY)
+    if value is _NO_KEY or type(value) in _PLAIN or not isinstance(value, _NESTED):
+        return value
+    if (cached := _cache_of(dot).get(key)) is not None and type(cached) is tuple and cached[0] is value:
+        return cached[1]
+    return _SLOW
+
+
+def _dotted(value: Any, parent: Optional[ObservedDot] = None) -> Any:
+    """value as an ObservedDot if it is a collection, parented to the dot it was read from"""
+    return ObservedDot(value, parent) if isinstance(value, ObservedCollection) else value
 
 
+def _forward(name: str) -> Callable:
+    def method(self, *args, **kwargs):
+        return _dotted(getattr(_target_of(self), name)(*args, **kwargs), self)
+
+    method.__name__ = name
+    return method
+
+
+for _name in ("__bool__", "__contains__", "__delitem__", "__eq__", "__len__", "__repr__",
+              "__setitem__", "__str__"):
+    setattr(ObservedDot, _name, _forward(_name))
+ObservedDot.__hash__ = None
 ObservedDot = cast(ObservedCollection, ObservedDot)
 
 
 class ObservedSet(ObservedCollection[set]):
     """Represents an observable set"""
 
+    __slots__ = ()
+
     def __init__(self, data: set = None, parent: Optional[ObservedCollection] = None):
         if data is None:
             data = set()
         super().__init__(data, parent)
 
+    @_mutation
     def add(self, item):
+        if item in self._data:
+            return
         self._data.add(item)
         self.notify(Notify(Action.CREATE, [item], None, self))
 
+    @_mutation
     def remove(self, item):
+        self._forget([item])
         self._data.remove(item)
         self.notify(Notify(Action.DELETE, [item], None, self))
 
+    @_mutation
     def discard(self, item):
+        if item not in self._data:
+            return
+        self._forget([item])
         self._data.discard(item)
         self.notify(Notify(Action.DELETE, [item], None, self))
 
+    @_mutation
     def pop(self):
-        self.notify(Notify(Action.DELETE, [result := self._data.pop()], None, self))
+        self._forget([result := self._data.pop()])
+        self.notify(Notify(Action.DELETE, [result], None, self))
         return result
 
+    @_mutation
     def clear(self):
+        self._forget()
+        old = self._data.copy()
         self._data.clear()
-        self.notify(Notify(Action.DELETE, ALL, None, self))
+        self.notify(Notify(Action.DELETE, ALL, None, self, [old]))
 
+    @_mutation
     def update(self, other: set):
         updates = self._data & other
+        creates = set(other) - self._data
         self._data.update(other)
-        self.notify(Notify(Action.UPDATE, updates, None, self))
+        if updates:
+            self.notify(Notify(Action.UPDATE, updates, None, self))
+        if creates:
+            self.notify(Notify(Action.CREATE, creates, None, self))
 
     def __getitem__(self, item):
         raise TypeError("ObservableSet does not support indexing")
@@ -447,24 +1947,35 @@ class ObservedSet(ObservedCollection[set]):
     def __setitem__(self, key, value):
         raise TypeError("ObservableSet does not support indexing")
 
+    @_mutation
     def __ior__(self, other):
-        self.update(other)
-        self.notify(Notify(Action.UPDATE, ALL, None, self))
+        old = self._data.copy()
+        self._data |= other
+        self.notify(Notify(Action.UPDATE, ALL, None, self, [old]))
         return self
 
+    @_access
     def __or__(self, other):
-        self.notify(Notify(Action.READ, ALL, [result := (self._data | other)], self))
+        result = self._data | other
+        if self._reading:
+            self.notify(Notify(Action.READ, ALL, [result], self))
         return result
 
+    @_access
     def __and__(self, other):
-        self.notify(Notify(Action.READ, ALL, [result := (self._data & other)], self))
+        result = self._data & other
+        if self._reading:
+            self.notify(Notify(Action.READ, ALL, [result], self))
         return result
 
+    @_mutation
     def __iand__(self, other):
+        old = self._data.copy()
         self._data &= other
-        self.notify(Notify(Action.UPDATE, ALL, None, self))
+        self.notify(Notify(Action.UPDATE, ALL, None, self, [old]))
         return self
 
+    @_access
     def to_data(self) -> T:
         return {value.to_data() if isinstance(value, ObservedCollection) else value for value in self._data}
 
@@ -472,6 +1983,8 @@ class ObservedSet(ObservedCollection[set]):
 class ObservedTuple(ObservedCollection[tuple]):
     """Represents an observable tuple"""
 
+    __slots__ = ()
+
     def __init__(self, data: tuple = tuple(), parent: Optional[ObservedCollection] = None):
         super().__init__(data, parent)
 
@@ -485,30 +1998,95 @@ class ObservedTuple(ObservedCollection[tuple]):
         return tuple(value.to_data() if isinstance(value, ObservedCollection) else value for value in self._data)
 
 
+_PLAIN = frozenset({type(None), bool, int, float, complex, str, bytes})
+# immutable types whose repr tells their whole value
+_EXACT = (datetime.date, datetime.time, datetime.timedelta, PurePath, Enum)
+
+
+def _value_digest(value: Any) -> Optional[bytes]:
+    """
+    The digest of a value outside of the collections of a tree, None when the value is neither
+    a scalar hashed by its repr, a record, nor a collection of those
+    """
+
+    if type(value) in _PLAIN or isinstance(value, _EXACT):
+        text = f"{type(value).__qualname__}:{value!r}"
+        return hashlib.blake2b(text.encode(), digest_size=16).digest()
+    if isinstance(value, ObservedCollection):
+        return value.digest
+    if isinstance(value, dict):
+        parts = [(_value_digest(k), _value_digest(v)) for k, v in value.items()]
+        if any(k is None or v is None for k, v in parts):
+            return None
+        parts = sorted(k + v for k, v in parts)
+    elif isinstance(value, list | tuple | set | frozenset):
+        parts = [_value_digest(item) for item in value]
+        if None in parts:
+            return None
+        if isinstance(value, set | frozenset):
+            parts.sort()
+    elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+        parts = [_value_digest(getattr(value, field.name)) for field in dataclasses.fields(value)]
+        if None in parts:
+            return None
+    else:
+        return None
+    person = type(value).__qualname__.encode()[:16]
+    return hashlib.blake2b(b"".join(parts), digest_size=16, person=person).digest()
+
+
+def _replaced(record: Any, changes: dict[str, Any]) -> Any:
+    """A shallow copy of a dataclass instance, frozen or not, with some fields changed"""
+    fields = getattr(record, "__dataclass_fields__", None)
+    if fields is None:
+        raise TypeError(f"{record!r} is not a dataclass instance")
+    for name in changes:
+        if name not in fields:
+            raise TypeError(f"{type(record).__name__} has no field {name!r}")
+    new = copy.copy(record)
+    for name, value in changes.items():
+        object.__setattr__(new, name, value)
+    return new
+
+
 def observable(data, parent: Optional[ObservedCollection] = None, warning: bool = False) -> Any:
     """
     Make sure data is observed, as much as possible
     :param data: the data to observe
     :param parent: if not None, the data will have this as parent
     :param warning: if True, a warning will be raised if the data is not observed
+
+    Nested data is wrapped once per parent: accessing it again returns the same wrapper, so
+    observers attached to a child stay attached.
     """
 
+    if type(data) in _PLAIN:
+        return data
     if isinstance(data, ObservedCollection):
-        if parent:
+        if parent is not None and data._parent is not parent:
             data._parent = parent
-    if not isinstance(data, Iterable) or isinstance(data, str | bytes):
+            # reachable from the parent, so that it hears of the observers attached above later
+            owner = _unwrap(parent)
+            if owner._children is None:
+                owner._children = {}
+            owner._children.setdefault(id(data._data), data)
+            data._rehear()
+        if parent is not None:
+            data._lock = _unwrap(parent)._lock
         return data
     match data:
         case list():
-            data = ObservedList(data, parent)  # type: ignore
+            cls = ObservedList
         case dict():
-            data = ObservedDict(data, parent)  # type: ignore
+            cls = ObservedDict
         case set():
-            data = ObservedSet(data, parent)  # type: ignore
+            cls = ObservedSet
         case tuple():
-            data = ObservedTuple(data, parent)  # type: ignore
+            cls = ObservedTuple
         case _:
-            if warning:
+            if warning and isinstance(data, Iterable) and not isinstance(data, str | bytes):
                 warnings.warn(f"Data {data} is not observed")
             return data
-    return data
+    if parent is None:
+        return cls(data)  # type: ignore
+    return _unwrap(parent)._child(data, cls, parent)
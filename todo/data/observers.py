@@ -1,26 +1,87 @@
+import atexit
+import contextlib
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
-
-from yaml import YAMLError, dump, load
+from typing import Any, Optional
 
+from todo.error import CodecError, YamlFileError
 from todo.log import get_logger
-from todo.data.observed import Observer, ObservedCollection, observable, Notify
+from todo.data.cache import SnapshotCache
+from todo.data.codecs import Codec, codec_for
+from todo.data.observed import Observer, ObservedCollection, observable, Notify, _unwrap
 
-try:
-    from yaml import CDumper as Dumper
-    from yaml import CLoader as Loader
-except ImportError:
-    from yaml import Loader, Dumper  # type: ignore
+logger = get_logger(__name__, use_config=False)
 
-from todo.error import YamlFileError
 
-logger = get_logger(__name__, use_config=False)
+@dataclass
+class WriteMetrics:
+    """What the write-behind of a YamlFileObserver did so far"""
+
+    pending: int = 0  # notifications whose change is not in the file yet
+    coalesced: int = 0  # notifications written together with a later one
+    writes: int = 0
+    skipped: int = 0  # writes left out because the file already held the same content
+    last_latency: float = 0.0  # seconds from the first notification of the last write to its end
+
+
+class _Writer:
+    """The thread writing the files of write-behind observers once their window is over"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._due: dict["YamlFileObserver", float] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, observer: "YamlFileObserver", due: float) -> None:
+        with self._cond:
+            if observer in self._due:
+                return
+            self._due[observer] = due
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="todo-yaml-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+            self._cond.notify()
+
+    def flush(self, observer: Optional["YamlFileObserver"] = None) -> None:
+        """Write now, on this thread, what an observer or every observer has pending"""
+        with self._cond:
+            if observer is None:
+                observers, self._due = list(self._due), {}
+            else:
+                observers = [observer] if self._due.pop(observer, None) is not None else []
+        for pending in observers:
+            pending._write_pending()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                ready = [observer for observer, due in self._due.items() if due <= now]
+                if not ready:
+                    self._cond.wait(min(self._due.values(), default=now + 60) - now)
+                    continue
+                for observer in ready:
+                    del self._due[observer]
+            for observer in ready:
+                try:
+                    observer._write_pending()
+                except Exception as e:
+                    # the thread writes for every observer, it must outlive the failure of one
+                    logger.error(f"Write-behind of {observer!r} failed: {e!r}")
+
+
+_writer = _Writer()
 
 
 class YamlFileObserver(Observer):
     _instance_cache: dict[Path, "YamlFileObserver"] = {}
 
-    def __new__(cls, default_data, path: Path | str):
+    def __new__(cls, default_data, path: Path | str, delay: Optional[float] = None, codec: Optional[Codec] = None,
+                cache: Optional[SnapshotCache] = None):
         if instance := cls._instance_cache.get(path):
             logger.info(f"Using cached instance of {instance}")
             return instance
@@ -28,16 +89,39 @@ class YamlFileObserver(Observer):
         cls._instance_cache[path] = instance
         return instance
 
-    def __init__(self, default_data, path: Path | str):  # type: ignore
+    def __init__(self, default_data, path: Path | str, delay: Optional[float] = None,  # type: ignore
+                 codec: Optional[Codec] = None, cache: Optional[SnapshotCache] = None):
         """
-        Observer to serialize data to a yaml file.
+        Observer to serialize data to a yaml file, or to a file of another format.
 
         :param default_data: The data to be stored in the file. This is treated as default data if
         the file does not exist.
         :param path: The path to the file.
+        :param delay: None to write the file on every change, on the thread that made it.
+            Otherwise the seconds during which changes are coalesced after the first one: a
+            background thread then takes a snapshot of the tree and writes it, and so at exit.
+            The snapshot is taken under the lock of a synchronized tree
+        :param codec: the format of the file, by default the one its suffix tells: YAML,
+            JSON lines (.jsonl), binary (.bin) or pickle (.pickle), see todo.data.codecs
+        :param cache: where to keep a binary snapshot of the data, loaded instead of parsing the
+            file as long as the file did not change. It is taken when the file is parsed, and on
+            close or at exit rather than on every write, which would double the cost of a change
         """
 
         self.path = Path(path)
+        self.codec = codec if codec is not None else codec_for(path)
+        self.cache = cache
+        self.delay = delay
+        self.metrics = WriteMetrics()
+        self._state = threading.Lock()  # guards the pending tree and the metrics
+        self._writing = threading.Lock()  # keeps the writes of the file in order
+        self._pending: Optional[ObservedCollection] = None  # the root to write behind
+        self._first = 0.0  # when the first pending notification came
+        self._written: Optional[bytes] = None  # digest of the text last written behind
+        self._failure: Optional[Exception] = None  # why the last write behind failed
+        self._content: Optional[bytes] = None  # what was last written, while the cache lacks it
+        if cache is not None:
+            atexit.register(self._store_latest)
 
         def _default_data():
             dt = default_data() if callable(default_data) else default_data
@@ -49,6 +133,7 @@ class YamlFileObserver(Observer):
 
         self._default_data = _default_data
         self._observed = None
+        self._saved: Optional[bytes] = None  # digest of the data in the file
 
     def to_observable(self) -> ObservedCollection:
         """
@@ -60,8 +145,40 @@ class YamlFileObserver(Observer):
         obs = observable(self.load())
         obs.attach(self)
         self._observed = obs
+        if isinstance(obs, ObservedCollection):
+            self._saved = obs.digest
         return obs
 
+    @property
+    def saved(self) -> bool:
+        """Whether the file holds the current data, compared by digest, or nothing is pending"""
+        if self._observed is None:
+            return False
+        if self.delay is not None:
+            return not self.metrics.pending
+        digest = self._observed.root.digest
+        return digest is not None and digest == self._saved
+
+    def flush(self) -> None:
+        """
+        Write the pending changes now, on this thread, and those a failed write left pending.
+        Raise a YamlFileError if they cannot be written
+        """
+
+        _writer.flush(self)
+        if self._pending is not None:
+            self._write_pending()
+        if (failure := self._failure) is not None:
+            raise YamlFileError(f"Cannot write the pending changes: {failure!r}", self.path) from failure
+
+    def close(self) -> None:
+        """Stop observing the data, write what is pending, see flush, and update the cache"""
+        if self._observed is not None:
+            self._observed.detach(self)
+        if self.delay is not None:
+            self.flush()
+        self._store_latest()
+
     def load(self) -> Any:
         """
         Load the data. If the data is empty, create a file and save as specified
@@ -69,40 +186,111 @@ class YamlFileObserver(Observer):
         """
 
         try:
-            text: str = ""
+            content: bytes = b""
             path: Path = self.path
             data: Any = None
 
             if path.exists():
-                text = path.read_text(encoding="utf-8")
-            if text:
-                data = load(text, Loader=Loader)
+                content = path.read_bytes()
+            if content and self.cache is not None:
+                data = self.cache.load(path, content)
+            if content and data is None:
+                data = self.codec.loads(content)
+                self._store(content, data)
             if data is None:
                 logger.info("Loading default data")
                 data = self._default_data()
             return data
-        except YAMLError as e:
-            raise YamlFileError(f"File is corrupted {e!r}", self.path) from e
+        except CodecError as e:
+            raise YamlFileError(str(e), self.path) from e
         except IOError as e:
             raise YamlFileError(f"Unknown IOError {e!r} during loading", self.path) from e
 
     def dump(self: "YamlFileObserver", val: ObservedCollection) -> None:
         """
-        Dump the data to the file.
+        Dump the data to the file, unless it already holds the same data, as far as the digest
+        of the tree tells.
         """
 
+        root = val.root
+        digest = root.digest if isinstance(root, ObservedCollection) else None
+        if digest is not None and digest == self._saved:
+            return
         try:
             path = self.path
             path.parent.mkdir(parents=True, exist_ok=True)
-            path.write_text(
-                dump(val.root.to_data(), Dumper=Dumper),
-                encoding="utf-8",
-            )
+            # on the thread changing the tree, which cannot change while it is written
+            data = _unwrap(root)._data if isinstance(root, ObservedCollection) else root
+            content = self.codec.dumps(data)
+            path.write_bytes(content)
+            self._saved = digest
+            self._content = content
+        except CodecError as e:
+            raise YamlFileError(str(e), self.path) from e
         except IOError as e:
             raise YamlFileError(f"Unknown IOError {e!r} during dumping", self.path) from e
 
+    def _store(self, content: bytes, data: Any) -> None:
+        if self.cache is not None and data is not None:
+            self.cache.store(self.path, content, data)
+
+    def _store_latest(self) -> None:
+        """Give the cache what was last written, if the data did not change since"""
+        if self._content is None or self._observed is None or not self.saved:
+            return
+        self._store(self._content, _unwrap(self._observed.root)._data)
+        self._content = None
+
     def __call__(self, notify: Notify):
-        self.dump(notify.observed)
+        if self.delay is None:
+            self.dump(notify.observed)
+            return
+        # the snapshot is taken by the write: the first change after a snapshot copies the
+        # collections on its path, so taking one per change would make every change copy
+        root = _unwrap(notify.observed).root
+        with self._state:
+            self._pending = root
+            if not self.metrics.pending:
+                self._first = time.monotonic()
+            self.metrics.pending += 1
+            due = self._first + self.delay
+        _writer.schedule(self, due)
+
+    def _write_pending(self) -> None:
+        with self._writing:
+            with self._state:
+                root, self._pending = self._pending, None
+                count, first = self.metrics.pending, self._first
+            if root is None:
+                return
+            try:
+                with root.lock.read() if root.lock is not None else contextlib.nullcontext():
+                    snapshot = root.snapshot()
+                content = self.codec.dumps(snapshot.data)
+                digest = hashlib.blake2b(content, digest_size=16).digest()
+                if digest == self._written:
+                    self.metrics.skipped += 1
+                else:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    self.path.write_bytes(content)
+                    self._written = digest
+                    self._content = content
+                    self.metrics.writes += 1
+            except Exception as e:
+                # e.g. a value the codec cannot encode: the changes stay pending, for the next
+                # change or flush to try again, and flush reports the failure
+                logger.error(f"Cannot write {self.path}: {e!r}")
+                with self._state:
+                    self._failure = e
+                    if self._pending is None:
+                        self._pending = root
+                return
+            self._failure = None
+            with self._state:
+                # notifications that came during the write stay pending for the next one
+                self.metrics.pending -= count
+                self.metrics.coalesced += count - 1
+                self.metrics.last_latency = time.monotonic() - first
 
     def __repr__(self):
         return f"{self.__class__.__name__}(path={self.path!r})"''
@@ -0,0 +1,192 @@
+from collections.abc import Callable, MutableSequence
+from typing import Any, TypeVar
+
+from todo.data.observed import ALL, MISSING, Action, KeyPath, Notify, ObservedCollection, ObservedList, \
+    ObservedSet, _unwrap
+
+T = TypeVar("T")
+
+# an operation is a tuple (kind, path, *arguments), see apply
+Operation = tuple
+
+
+def plain(value: Any) -> Any:
+    """Copy the collections in value, so that operations never share data with the tree"""
+    match value:
+        case ObservedCollection():
+            return plain(_unwrap(value)._data)
+        case list() | MutableSequence():
+            return [plain(v) for v in value]
+        case dict():
+            return {k: plain(v) for k, v in value.items()}
+        case set():
+            return {plain(v) for v in value}
+        case _:
+            return value
+
+
+def _bounds(index, length: int) -> tuple[int, int]:
+    if isinstance(index, slice):
+        if index.step not in (None, 1):
+            raise ValueError("Extended slices cannot be undone")
+        start, stop, _ = index.indices(length)
+        return start, max(start, stop)
+    return (index + length if index < 0 else index), (index + length if index < 0 else index) + 1
+
+
+def _inserted_at(index, length: int, count: int) -> int:
+    """
+    Where the count items of a CREATE start: index is the slice of their positions afterwards,
+    or a position of list.insert in the list of length items before
+    """
+
+    if isinstance(index, slice):
+        return index.indices(length + count)[0]
+    return min(max(index + length if index < 0 else index, 0), length)
+
+
+def operations_of(notify: Notify) -> list[tuple[Operation, Operation]]:
+    """The (forward, inverse) operations of a change"""
+
+    path = notify.path
+    node = notify.observed
+    data, action, index, value, old = node._data, notify.action, notify.index, notify.value, notify.old
+    if notify.merged or index[0] is ALL and not (action is Action.MOVE and value is not None):
+        if not old:
+            raise ValueError(f"{notify} does not tell what it replaced")
+        if old[0] == data:
+            return []
+        return [(("restore", path, plain(data)), ("restore", path, plain(old[0])))]
+    if index[0] is ALL:
+        inverse = [0] * len(value)
+        for new, previous in enumerate(value):
+            inverse[previous] = new
+        return [(("permute", path, list(value)), ("permute", path, inverse))]
+    if isinstance(node, ObservedList):
+        (entry,) = index
+        if action is Action.MOVE:
+            start, stop = _bounds(entry, len(data))
+            return [(("move", path, start, value[0], stop - start), ("move", path, value[0], start, stop - start))]
+        if action is Action.CREATE:
+            start = _inserted_at(entry, len(data) - len(value), len(value))
+            stop = start + len(value)
+            return [(("splice", path, start, start, plain(value)), ("splice", path, start, stop, []))]
+        if action is Action.DELETE:
+            start, stop = _bounds(entry, len(data) + len(value))
+            return [(("splice", path, start, stop, []), ("splice", path, start, start, plain(value)))]
+        if action is Action.UPDATE:
+            start, stop = _bounds(entry, len(data) - len(value) + len(old))
+            return [(("splice", path, start, stop, plain(value)),
+                     ("splice", path, start, start + len(value), plain(old)))]
+    if isinstance(node, ObservedSet):
+        if action is Action.CREATE:
+            return [(("add", path, list(index)), ("discard", path, list(index)))]
+        if action is Action.DELETE:
+            return [(("discard", path, list(index)), ("add", path, list(index)))]
+        return []  # set.update notifies the items that were already there
+    if action is Action.DELETE:
+        return [(("set", path, list(index), [MISSING] * len(index)), ("set", path, list(index), plain(value)))]
+    return [(("set", path, list(index), plain(value)),
+             ("set", path, list(index), plain(old) if old is not None else [MISSING] * len(index)))]
+
+
+def ordered(items: list[T], key: Callable[[T], Operation] = lambda item: item) -> list[T]:
+    """
+    The operations of a batch, from the shallowest collection to the deepest. Their paths are
+    those of the end of the batch, so collections are changed after their parents going
+    forward, and reverted before them going back. The operations below a restored collection
+    are left out, as its content both before and after the batch already covers them
+
+    :param items: the operations, or what holds them
+    :param key: the forward operation of an item
+    """
+
+    restored = [key(item)[1] for item in items if key(item)[0] == "restore"]
+
+    def covered(item: T) -> bool:
+        below = key(item)[1]
+        return any(len(below) > len(path) and below[:len(path)] == path for path in restored)
+
+    return sorted((item for item in items if not covered(item)), key=lambda item: len(key(item)[1]))
+
+
+def node_at(root: ObservedCollection, path: KeyPath) -> ObservedCollection:
+    node = root
+    for key in path:
+        node = _unwrap(node[key])
+    return node
+
+
+def apply(root: ObservedCollection, operation: Operation) -> None:
+    """Apply an operation to the tree under root"""
+    kind, path, *args = operation
+    node: Any = node_at(root, path)
+    match kind:
+        case "splice":
+            start, stop, values = args
+            if start == stop:
+                if start == len(node) and len(values) > 1:
+                    node.extend(plain(values))
+                else:
+                    for i, value in enumerate(values):
+                        node.insert(start + i, plain(value))
+            elif not values:
+                del node[start:stop]
+            elif stop - start == len(values) == 1:
+                node[start] = plain(values[0])
+            else:
+                node[start:stop] = plain(values)
+        case "move":
+            src, dst, count = args
+            node.move(src, dst, count)
+        case "permute":
+            node.permute(args[0])
+        case "set":
+            keys, values = args
+            for key, value in zip(keys, values):
+                if value is MISSING:
+                    del node[key]
+                else:
+                    node[key] = plain(value)
+        case "add":
+            node.update(set(args[0]))
+        case "discard":
+            for item in args[0]:
+                node.discard(item)
+        case "restore":
+            restore(node, plain(args[0]))
+
+
+def restore(node: Any, content: Any) -> None:
+    """Give a collection back a content, changing only what differs"""
+    if isinstance(node, ObservedList):
+        node.assign(content, key=_Key)
+    elif isinstance(node, ObservedSet):
+        for item in node._data - content:
+            node.discard(item)
+        if content - node._data:
+            node.update(content - node._data)
+    else:
+        for key in [key for key in node._data if key not in content]:
+            del node[key]
+        for key, value in content.items():
+            if key not in node._data or node._data[key] != value:
+                node[key] = value
+
+
+class _Key:
+    """Match items by equality, and unhashable ones only by identity"""
+
+    __slots__ = ("item",)
+
+    def __init__(self, item: Any):
+        self.item = item
+
+    def __hash__(self) -> int:
+        try:
+            return hash(self.item)
+        except TypeError:
+            return id(self.item)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, _Key) and (self.item is other.item or self.item == other.item)
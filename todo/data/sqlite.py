@@ -0,0 +1,358 @@
+import atexit
+import dataclasses
+import pickle
+import sqlite3
+import threading
+import time
+import types
+import typing
+from collections.abc import Callable, Iterable
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from todo.log import get_logger
+from todo.data.observed import Notify, ObservedList
+from todo.data.operations import Operation, operations_of
+
+logger = get_logger(__name__, use_config=False)
+
+
+def _field_codec(kind: Any) -> tuple[str, Callable[[Any], Any], Callable[[Any], Any]]:
+    """The SQL type of a field annotated with kind, and how its values are written and read"""
+    if typing.get_origin(kind) in (typing.Union, types.UnionType):
+        args = [arg for arg in typing.get_args(kind) if arg is not type(None)]
+        if len(args) == 1:
+            kind = args[0]
+    if kind is bool:
+        return "INTEGER", int, bool
+    if kind in (int, float, str):
+        return {int: "INTEGER", float: "REAL", str: "TEXT"}[kind], lambda value: value, lambda value: value
+    if kind is datetime:
+        # ISO strings sort like the datetimes, so the index answers range queries
+        return "TEXT", datetime.isoformat, datetime.fromisoformat
+    if isinstance(kind, type) and issubclass(kind, Path):
+        return "TEXT", str, Path
+    return "BLOB", pickle.dumps, pickle.loads
+
+
+def _nullable(fn: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    return lambda value: None if value is None else fn(value)
+
+
+_GAP = 1 << 32  # between the ranks of rows written in a row, halved by each insertion between two rows
+_SPREAD = 1 << 16  # the least gap left between the ranks of rows spread to make room
+
+
+class _Table:
+    """
+    How the records of a dataclass are stored as the rows of a table. A row has a fixed id and
+    a rank: the rows are in the order of their ranks, which are spaced so that most changes of
+    the list only write the rows they touch
+    """
+
+    def __init__(self, record: type, name: str):
+        if not dataclasses.is_dataclass(record) or not name.isidentifier():
+            raise ValueError(f"Cannot store {record!r} in a table named {name!r}")
+        hints = typing.get_type_hints(record)
+        self.record = record
+        self.name = name
+        self.fields = [field.name for field in dataclasses.fields(record)]
+        if {"id", "rank"} & set(self.fields):
+            raise ValueError(f"The fields id and rank of {record!r} would clash with the columns of the table")
+        codecs = [_field_codec(hints[field]) for field in self.fields]
+        self.types = [kind for kind, _, _ in codecs]
+        self.encoders = [_nullable(encode) for _, encode, _ in codecs]
+        self.decoders = [_nullable(decode) for _, _, decode in codecs]
+        columns = ", ".join(f'"{field}"' for field in self.fields)
+        marks = ", ".join("?" for _ in range(len(self.fields) + 2))
+        self.insert = f'INSERT INTO "{name}" (id, rank, {columns}) VALUES ({marks})'
+        self.select = f'SELECT id, rank, {columns} FROM "{name}" ORDER BY rank, id'
+        self.replace, _ = self.update(self.fields)
+
+    def create(self, columns: list[str]) -> list[str]:
+        """The statements creating the table, or upgrading the given columns of an existing one"""
+        name = self.name
+        if "position" in columns and "rank" not in columns:
+            # the rows used to be keyed by their position, which is a valid id and order
+            statements = [f'ALTER TABLE "{name}" RENAME COLUMN position TO id',
+                          f'ALTER TABLE "{name}" ADD COLUMN rank INTEGER NOT NULL DEFAULT 0',
+                          f'UPDATE "{name}" SET rank = id * {_GAP}']
+        else:
+            fields = ", ".join(f'"{field}" {kind}' for field, kind in zip(self.fields, self.types))
+            statements = [f'CREATE TABLE IF NOT EXISTS "{name}" '
+                          f'(id INTEGER PRIMARY KEY, rank INTEGER NOT NULL, {fields})']
+        return statements + [f'CREATE INDEX IF NOT EXISTS "{name}_rank" ON "{name}" (rank)']
+
+    def values(self, record: Any) -> tuple:
+        return tuple(encode(getattr(record, field)) for field, encode in zip(self.fields, self.encoders))
+
+    def load(self, row: tuple) -> Any:
+        return self.record(**{field: decode(value) for field, decode, value in zip(self.fields, self.decoders, row)})
+
+    def update(self, fields: Iterable[str]) -> tuple[str, list[Callable[[Any], Any]]]:
+        """The statement setting some fields of the row with an id, and their encoders"""
+        names = list(fields)
+        assignments = ", ".join(f'"{field}" = ?' for field in names)
+        encoders = [self.encoders[self.fields.index(field)] for field in names]
+        return f'UPDATE "{self.name}" SET {assignments} WHERE id = ?', encoders
+
+
+class SqliteDatabase:
+    _instance_cache: dict[Path, "SqliteDatabase"] = {}
+
+    def __new__(cls, path: Path | str, commit_delay: float = 0.5):
+        path = Path(path)
+        if instance := cls._instance_cache.get(path):
+            return instance
+        instance = super().__new__(cls)
+        cls._instance_cache[path] = instance
+        return instance
+
+    def __init__(self, path: Path | str, commit_delay: float = 0.5):
+        """
+        An SQLite database storing observed lists of dataclass records, a table per list. Each
+        change of a list is applied to its table as it happens, by the statements covering
+        only the rows it touched. The changes are grouped in a transaction committed by a
+        background thread at most commit_delay seconds after the first one, and at exit. The
+        database is in WAL mode, so readers never wait for that transaction.
+
+        One instance exists per file: its lists share the connection and the transaction.
+
+        :param path: the database file
+        :param commit_delay: seconds during which changes go in the same transaction
+        """
+
+        if getattr(self, "_connection", None) is not None:
+            return
+        self.path = Path(path)
+        self.commit_delay = commit_delay
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # the lists change on any thread, and the transaction is committed on another one
+        self._connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS _migrations (source TEXT PRIMARY KEY)")
+        self._lock = threading.Condition(threading.RLock())
+        self._in_transaction = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"todo-sqlite-{self.path.name}", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def list(self, record: type, table: str, indexes: Iterable[str] = (),
+             migrate_from: Optional[Path | str] = None) -> ObservedList:
+        """
+        The records stored in a table, as an observed list whose changes are written back
+
+        :param record: the dataclass of the records
+        :param table: the name of the table, created if needed
+        :param indexes: the fields to index
+        :param migrate_from: a YAML file, possibly journaled, holding the list until now. Its
+            records are copied into the table once, the file is left as it is
+        """
+
+        schema = _Table(record, table)
+        with self._lock:
+            columns = [row[1] for row in self._connection.execute(f'PRAGMA table_info("{table}")')]
+            for statement in schema.create(columns):
+                self._connection.execute(statement)
+            for field in indexes:
+                if field not in schema.fields:
+                    raise ValueError(f"{record.__name__} has no field {field!r}")
+                self._connection.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{table}_{field}" ON "{table}" ("{field}")')
+            if migrate_from is not None:
+                self._migrate(schema, Path(migrate_from))
+            rows = self._connection.execute(schema.select).fetchall()
+        lst = ObservedList([schema.load(row[2:]) for row in rows])
+        lst.attach(_TableWriter(self, schema, lst, [row[0] for row in rows], [row[1] for row in rows]))
+        return lst
+
+    def _migrate(self, schema: _Table, source: Path) -> None:
+        key = f"{schema.name}:{source}"
+        if not source.exists() or self._connection.execute(
+                "SELECT 1 FROM _migrations WHERE source = ?", (key,)).fetchone():
+            return
+        from todo.data.journal import JournalFileObserver
+        records = JournalFileObserver([], source).read() or []
+        logger.info(f"Migrating {len(records)} records from {source} to {self.path}")
+        self._begin()
+        self._connection.execute(f'DELETE FROM "{schema.name}"')
+        self._connection.executemany(schema.insert, [(i, i * _GAP, *schema.values(record))
+                                                     for i, record in enumerate(records)])
+        self._connection.execute("INSERT INTO _migrations VALUES (?)", (key,))
+        self.commit()
+
+    def execute(self, statement: str, parameters: Iterable = ()) -> sqlite3.Cursor:
+        """Run a statement in the current transaction, e.g. a query of a table"""
+        with self._lock:
+            return self._connection.execute(statement, tuple(parameters))
+
+    def _begin(self) -> None:
+        """Open the transaction if there is none, and have it committed once the delay is over"""
+        if not self._in_transaction:
+            self._connection.execute("BEGIN")
+            self._in_transaction = True
+            self._lock.notify_all()
+
+    def commit(self) -> None:
+        """Commit the changes now"""
+        with self._lock:
+            if self._in_transaction:
+                self._connection.execute("COMMIT")
+                self._in_transaction = False
+
+    def close(self) -> None:
+        """Commit, and stop writing"""
+        with self._lock:
+            if self._closed:
+                return
+            self.commit()
+            self._closed = True
+            self._connection.close()
+            self._lock.notify_all()
+        atexit.unregister(self.close)
+        SqliteDatabase._instance_cache.pop(self.path, None)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                self._lock.wait_for(lambda: self._in_transaction or self._closed)
+                if self._closed:
+                    return
+            time.sleep(self.commit_delay)
+            try:
+                self.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Cannot commit to {self.path}: {e!r}")
+
+
+class _TableWriter:
+    """
+    Applies the changes of a list to its table. The ids and the ranks of the rows are kept in
+    lists lined up with the items, so an insertion takes a rank between those of its neighbours
+    and nothing else moves. The ranks are spread again once two neighbours have no rank left
+    between them
+    """
+
+    def __init__(self, database: SqliteDatabase, schema: _Table, lst: ObservedList, ids: list[int],
+                 ranks: list[int]):
+        self.database = database
+        self.schema = schema
+        self.list = lst
+        self._ids = ids
+        self._ranks = ranks
+        self._next_id = max(ids, default=-1) + 1
+
+    def __call__(self, notify: Notify) -> None:
+        database = self.database
+        with database._lock:
+            if database._closed:
+                return
+            database._begin()
+            try:
+                if notify.observed is not self.list:
+                    raise ValueError("Records are changed by replacing them")
+                operations = [forward for forward, _ in operations_of(notify)]
+                if notify.fields and all(operation[0] == "splice" and operation[3] - operation[2] ==
+                                         len(operation[4]) for operation in operations):
+                    self._set_fields(operations, notify.fields)
+                    return
+                for operation in operations:
+                    self._run(operation)
+            except (ValueError, TypeError):
+                # e.g. an extended slice, whose positions are not kept: write the whole list
+                self._rewrite()
+
+    def _run(self, operation: Operation) -> None:
+        kind, _, *args = operation
+        match kind:
+            case "splice":
+                start, stop, values = args
+                self._splice(start, stop, values)
+            case "move":
+                src, dst, count = args
+                ids = self._ids[src:src + count]
+                del self._ids[src:src + count], self._ranks[src:src + count]
+                self._place(dst, ids)
+            case "permute":
+                ids = self._ids = [self._ids[i] for i in args[0]]
+                self.database._connection.executemany(
+                    f'UPDATE "{self.schema.name}" SET rank = ? WHERE id = ?',
+                    [(self._ranks[new], ids[new]) for new, old in enumerate(args[0]) if new != old])
+            case _:
+                self._rewrite()
+
+    def _splice(self, start: int, stop: int, values: list) -> None:
+        """Replace the rows at start:stop with values"""
+        connection, schema = self.database._connection, self.schema
+        common = min(stop - start, len(values))
+        if common:
+            connection.executemany(schema.replace, [(*schema.values(values[i]), self._ids[start + i])
+                                                    for i in range(common)])
+        start, values = start + common, values[common:]
+        if stop > start:
+            connection.executemany(f'DELETE FROM "{schema.name}" WHERE id = ?',
+                                   [(i,) for i in self._ids[start:stop]])
+            del self._ids[start:stop], self._ranks[start:stop]
+        if values:
+            ids = list(range(self._next_id, self._next_id + len(values)))
+            self._next_id += len(values)
+            ranks = self._place(start, ids, write=False)
+            connection.executemany(schema.insert, [(i, rank, *schema.values(value))
+                                                   for i, rank, value in zip(ids, ranks, values)])
+
+    def _place(self, position: int, ids: list[int], write: bool = True) -> list[int]:
+        """
+        Put the rows with ids at position, with ranks between those of their neighbours. When
+        there is no room, the ranks of the rows around are spread too, over a window doubled
+        until it has room enough for a few more insertions. The ranks of ids are written when
+        write is True, for rows already in the table. Return the ranks of ids
+        """
+
+        ranks, count = self._ranks, len(ids)
+        lo = hi = position
+        width, least = count, 1
+        while True:
+            low = ranks[lo - 1] if lo else None
+            high = ranks[hi] if hi < len(ranks) else None
+            size = hi - lo + count
+            if low is None and high is None:
+                new = [i * _GAP for i in range(size)]
+            elif high is None:
+                new = [low + (i + 1) * _GAP for i in range(size)]
+            elif low is None:
+                new = [high - (size - i) * _GAP for i in range(size)]
+            elif (step := (high - low) // (size + 1)) >= least:
+                new = [low + (i + 1) * step for i in range(size)]
+            else:
+                lo, hi = max(lo - width, 0), min(hi + width, len(ranks))
+                width, least = width * 2, _SPREAD
+                continue
+            break
+        self._ids[position:position] = ids
+        ranks[lo:hi] = new
+        placed = set() if write else set(ids)
+        if rows := [(rank, i) for i, rank in zip(self._ids[lo:hi + count], new) if i not in placed]:
+            self.database._connection.executemany(f'UPDATE "{self.schema.name}" SET rank = ? WHERE id = ?', rows)
+        return new[position - lo:position - lo + count]
+
+    def _set_fields(self, operations: list[Operation], fields: tuple[str, ...]) -> None:
+        statement, encoders = self.schema.update(fields)
+        rows = []
+        for _, _, start, _, values in operations:
+            for i, value in enumerate(values):
+                rows.append((*(encode(getattr(value, field)) for field, encode in zip(fields, encoders)),
+                             self._ids[start + i]))
+        self.database._connection.executemany(statement, rows)
+
+    def _rewrite(self) -> None:
+        connection, schema = self.database._connection, self.schema
+        connection.execute(f'DELETE FROM "{schema.name}"')
+        count = len(self.list._data)
+        self._ids = list(range(count))
+        self._ranks = [i * _GAP for i in range(count)]
+        self._next_id = count
+        connection.executemany(schema.insert, [(i, i * _GAP, *schema.values(record))
+                                               for i, record in enumerate(self.list._data)])
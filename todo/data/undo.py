@@ -0,0 +1,145 @@
+import contextlib
+import sys
+from collections import deque
+from typing import Any
+
+from todo.data.observed import Notify, ObservedCollection, _unwrap
+from todo.data.operations import Operation, apply, operations_of, ordered
+from todo.log import get_logger
+
+logger = get_logger(__name__, use_config=False)
+
+
+def _size(value: Any) -> int:
+    """An estimate of the memory an operation keeps alive"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        return size + sum(_size(k) + _size(v) for k, v in value.items())
+    if isinstance(value, list | tuple | set | frozenset):
+        return size + sum(_size(v) for v in value)
+    return size
+
+
+class _Step:
+    """The operations of one change, or of one batch"""
+
+    __slots__ = ("batch", "operations", "size")
+
+    def __init__(self, batch: int):
+        self.batch = batch
+        self.operations: list[tuple[Operation, Operation]] = []
+        self.size = 0
+
+    def ordered(self) -> list[tuple[Operation, Operation]]:
+        """The operations in the order to redo them, see ordered"""
+        return ordered(self.operations, key=lambda operation: operation[0])
+
+
+class UndoManager:
+    def __init__(self, root: ObservedCollection, budget: int = 4 << 20):
+        """
+        Undo and redo the changes of a tree. The changes are recorded from its notifications as
+        operations and their inverses, addressed by path, instead of copies of the tree. The
+        changes emitted by one batch are undone together.
+
+        :param root: the tree, its root is observed
+        :param budget: an estimate of the bytes the recorded operations may keep alive. The
+            oldest steps are dropped past it
+        """
+
+        self.root = _unwrap(root).root
+        self.budget = budget
+        self._undo: deque[_Step] = deque()
+        self._redo: list[_Step] = []
+        self._size = 0
+        self._applying = False
+        self.root.attach(self._record)
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo(self) -> bool:
+        """Revert the last step. Return whether there was one"""
+        if not self._undo:
+            return False
+        step = self._undo.pop()
+        self._size -= step.size
+        try:
+            self._apply([inverse for _, inverse in reversed(step.ordered())])
+        except BaseException:
+            self._push(step)
+            raise
+        self._redo.append(step)
+        return True
+
+    def redo(self) -> bool:
+        """Apply the last undone step again. Return whether there was one"""
+        if not self._redo:
+            return False
+        step = self._redo.pop()
+        try:
+            self._apply([forward for forward, _ in step.ordered()])
+        except BaseException:
+            self._redo.append(step)
+            raise
+        self._push(step)
+        return True
+
+    def clear(self) -> None:
+        """Forget every step"""
+        self._undo.clear()
+        self._redo.clear()
+        self._size = 0
+
+    def close(self) -> None:
+        """Stop recording"""
+        self.root.detach(self._record)
+
+    def _push(self, step: _Step) -> None:
+        self._undo.append(step)
+        self._size += step.size
+        self._trim()
+
+    def _trim(self) -> None:
+        while self._size > self.budget and len(self._undo) > 1:
+            self._size -= self._undo.popleft().size
+
+    def _record(self, notify: Notify) -> None:
+        if self._applying:
+            return
+        try:
+            operations = operations_of(notify)
+        except (ValueError, TypeError) as e:
+            # what came before this change cannot be reached anymore
+            logger.warning(f"Cannot undo {notify!r}, clearing the history: {e!r}")
+            self.clear()
+            return
+        if not operations:
+            return
+        self._redo.clear()
+        if not self._undo or not notify.batch or self._undo[-1].batch != notify.batch:
+            self._undo.append(_Step(notify.batch))
+        step = self._undo[-1]
+        if notify.merged and any(forward[:2] == ("restore", notify.path) for forward, _ in step.operations):
+            return  # the batch merged several kinds of change of the collection
+        size = sum(_size(forward) + _size(inverse) for forward, inverse in operations)
+        step.operations.extend(operations)
+        step.size += size
+        self._size += size
+        self._trim()
+
+    def _apply(self, operations: list[Operation]) -> None:
+        self._applying = True
+        try:
+            with self.root.batch() if len(operations) > 1 else contextlib.nullcontext():
+                for operation in operations:
+                    apply(self.root, operation)
+        finally:
+            self._applying = False
+
+
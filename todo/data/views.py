@@ -0,0 +1,400 @@
+import bisect
+import contextlib
+import itertools
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from typing import Any, Optional, Union
+
+from todo.data.observed import ALL, Action, KeyPath, Notify, Observable, ObservedCollection, ObservedList, \
+    _coalesce
+from todo.utils import RWLock
+
+Source = Union[ObservedList, "ListView"]
+
+
+def _bounds(index, length: int) -> Optional[tuple[int, int]]:
+    """The rows covered by one entry of a list index, in a list of length rows. None for an extended slice"""
+    if isinstance(index, slice):
+        start, stop, step = index.indices(length)
+        return (start, max(start, stop)) if step == 1 else None
+    index = index + length if index < 0 else index
+    return index, index + 1
+
+
+def _at(start: int, stop: int) -> int | slice:
+    return start if stop - start == 1 else slice(start, stop)
+
+
+class _Follower(ABC):
+    """
+    Derived state kept up to date from the notifications of an observed list, or of a view,
+    instead of being recomputed. Subclasses implement the hooks for each kind of change.
+
+    The positions of merged notifications of a batch can be ambiguous: a follower rebuilds
+    itself from them instead.
+    """
+
+    __slots__ = ()
+
+    source: "Source"
+
+    def _follow(self, source: "Source") -> None:
+        self.source = source
+        with source.lock.read() if source.lock is not None else contextlib.nullcontext():
+            self._rebuild()
+            # held weakly, so that a follower nobody uses anymore stops following
+            source.attach(self._on_change, weak=True)
+
+    def close(self) -> None:
+        """Stop following the source"""
+        self.source.detach(self._on_change)
+
+    def _on_change(self, notify: Notify) -> None:
+        source = self.source
+        if notify.merged:
+            self._reset()
+        elif notify.observed is not source:
+            # an item of the source changed in place
+            row = ObservedCollection._relative_path(notify.observed, source)[0]
+            self._update(row, row + 1)
+        elif notify.index[0] is ALL:
+            if notify.action is Action.MOVE and notify.value is not None:
+                self._permute(notify.value)
+            else:
+                self._reset()
+        elif notify.action is Action.MOVE:
+            start, stop = _bounds(notify.index[0], self._length())
+            self._move(start, stop, notify.value[0])
+        elif (spans := self._spans(notify)) is None:
+            self._reset()
+        elif notify.action is Action.CREATE:
+            for start, stop in spans:
+                self._insert(start, stop)
+        elif notify.action is Action.DELETE:
+            for start, stop in reversed(spans):
+                self._delete(start, stop)
+        elif notify.action is Action.UPDATE:
+            if len(spans) == 1 and spans[0][1] - spans[0][0] != len(notify.value or ()):
+                # a slice given more or fewer items than it covered
+                start, stop = spans[0]
+                self._delete(start, stop)
+                self._insert(start, start + len(notify.value))
+            else:
+                for start, stop in spans:
+                    self._update(start, stop)
+        if self._length() != len(source._data):
+            self._reset()
+
+    def _spans(self, notify: Notify) -> Optional[list[tuple[int, int]]]:
+        """
+        The rows of a CREATE, DELETE or UPDATE as sorted, disjoint ranges. The positions of a
+        DELETE or an UPDATE are in the rows before the change, those of a CREATE in the rows
+        after it, but a negative or past the end position of one item is the one list.insert
+        was given. None for an extended slice
+        """
+
+        length = self._length()
+        count = len(notify.value) if notify.action is Action.CREATE and notify.value is not None else 0
+        index = []
+        for entry in notify.index:
+            if count and not isinstance(entry, slice):
+                entry = min(max(entry + length if entry < 0 else entry, 0), length + count - 1)
+            if (bounds := _bounds(entry, length + count)) is None:
+                return None
+            index.append(slice(*bounds))
+        return [(entry, entry + 1) if isinstance(entry, int) else (entry.start, entry.stop)
+                for entry in _coalesce(index)]
+
+    def _move(self, start: int, stop: int, dst: int) -> None:
+        order = list(range(self._length()))
+        moved = order[start:stop]
+        del order[start:stop]
+        order[dst:dst] = moved
+        self._permute(order)
+
+    def _reset(self) -> None:
+        self._rebuild()
+
+    @abstractmethod
+    def _rebuild(self) -> None:
+        """Recompute everything from the whole source"""
+
+    @abstractmethod
+    def _length(self) -> int:
+        """The number of source rows accounted for"""
+
+    @abstractmethod
+    def _insert(self, start: int, stop: int) -> None:
+        """Source rows start:stop were inserted"""
+
+    @abstractmethod
+    def _delete(self, start: int, stop: int) -> None:
+        """Source rows start:stop were deleted"""
+
+    @abstractmethod
+    def _update(self, start: int, stop: int) -> None:
+        """Source rows start:stop changed in place"""
+
+    @abstractmethod
+    def _permute(self, order: list[int]) -> None:
+        """Source rows were reordered, order[new] being the old row"""
+
+
+class ListView(_Follower, Observable):
+    """
+    A read-only list derived from an observed list or from another view, kept up to date from
+    the notifications of its source. It notifies its own changes like an ObservedList does,
+    so list_model can display it. After a batch it notifies only if its content differs.
+    Its source holds it weakly: keep a reference to the view for as long as it is used.
+    """
+
+    __slots__ = ("source", "_data")
+
+    def __init__(self, source: "Source"):
+        super().__init__()
+        self._data: list = []
+        self._follow(source)
+
+    @property
+    def lock(self) -> Optional[RWLock]:
+        return self.source.lock
+
+    @property
+    def root(self) -> "ListView":
+        return self
+
+    @property
+    def path(self) -> KeyPath:
+        return ()
+
+    def filtered(self, pred: Callable[[Any], bool]) -> "FilteredView":
+        """A live view of the items pred accepts"""
+        return FilteredView(self, pred)
+
+    def sorted(self, key: Callable[[Any], Any]) -> "SortedView":
+        """A live view of the items ordered by key"""
+        return SortedView(self, key)
+
+    def mapped(self, fn: Callable[[Any], Any]) -> "MappedView":
+        """A live view of fn applied to every item"""
+        return MappedView(self, fn)
+
+    def __getitem__(self, item):
+        return self._data[item]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ListView):
+            other = other._data
+        return self._data == other
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self._data!r})"
+
+    def to_data(self) -> list:
+        return list(self._data)
+
+    def _reset(self) -> None:
+        old = self._data
+        self._rebuild()
+        if self._data == old:
+            return
+        self.notify(Notify(Action.DELETE, ALL, None, self))
+        if self._data:
+            self.notify(Notify(Action.CREATE, [slice(0, len(self._data))], list(self._data), self))
+
+
+class FilteredView(ListView):
+    """The items of the source that a predicate accepts, in the order of the source"""
+
+    __slots__ = ("pred", "_rows", "_size")
+
+    def __init__(self, source: Source, pred: Callable[[Any], bool]):
+        self.pred = pred
+        self._rows: list[int] = []  # the source rows in the view, sorted
+        self._size = 0
+        super().__init__(source)
+
+    def __setitem__(self, key: int, value) -> None:
+        self.source[self._rows[key]] = value
+
+    def set_fields(self, index: int, **changes) -> None:
+        """Change fields of the item at index in the source, see ObservedList.set_fields"""
+        self.source.set_fields(self._rows[index], **changes)
+
+    def _rebuild(self) -> None:
+        items = self.source._data
+        self._rows = [i for i, item in enumerate(items) if self.pred(item)]
+        self._data = [items[i] for i in self._rows]
+        self._size = len(items)
+
+    def _length(self) -> int:
+        return self._size
+
+    def _shift(self, at: int, by: int) -> None:
+        self._rows[at:] = [row + by for row in self._rows[at:]]
+
+    def _insert(self, start: int, stop: int) -> None:
+        items = self.source._data
+        at = bisect.bisect_left(self._rows, start)
+        self._shift(at, stop - start)
+        self._size += stop - start
+        rows = [i for i in range(start, stop) if self.pred(items[i])]
+        if rows:
+            self._rows[at:at] = rows
+            self._data[at:at] = values = [items[i] for i in rows]
+            self.notify(Notify(Action.CREATE, [_at(at, at + len(rows))], values, self))
+
+    def _delete(self, start: int, stop: int) -> None:
+        first, last = bisect.bisect_left(self._rows, start), bisect.bisect_left(self._rows, stop)
+        removed = self._data[first:last]
+        del self._rows[first:last], self._data[first:last]
+        self._shift(first, start - stop)
+        self._size -= stop - start
+        if removed:
+            self.notify(Notify(Action.DELETE, [_at(first, last)], removed, self))
+
+    def _update(self, start: int, stop: int) -> None:
+        items = self.source._data
+        for row in range(start, stop):
+            item = items[row]
+            at = bisect.bisect_left(self._rows, row)
+            was = at < len(self._rows) and self._rows[at] == row
+            if self.pred(item):
+                if was:
+                    self._data[at] = item
+                    self.notify(Notify(Action.UPDATE, [at], [item], self))
+                else:
+                    self._rows.insert(at, row)
+                    self._data.insert(at, item)
+                    self.notify(Notify(Action.CREATE, [at], [item], self))
+            elif was:
+                del self._rows[at]
+                self.notify(Notify(Action.DELETE, [at], [self._data.pop(at)], self))
+
+    def _permute(self, order: list[int]) -> None:
+        position = {row: at for at, row in enumerate(self._rows)}
+        self._rows = [new for new, old in enumerate(order) if old in position]
+        view_order = [position[order[row]] for row in self._rows]
+        if view_order != list(range(len(view_order))):
+            self._data = [self._data[at] for at in view_order]
+            self.notify(Notify(Action.MOVE, ALL, view_order, self))
+
+
+class SortedView(ListView):
+    """
+    The items of the source ordered by a key. Items with equal keys keep the order in which
+    they entered the view
+    """
+
+    __slots__ = ("key", "_entries", "_by_row", "_counter")
+
+    def __init__(self, source: Source, key: Callable[[Any], Any]):
+        self.key = key
+        self._entries: list[tuple[Any, int]] = []  # (key, tie breaker) of every item, sorted
+        self._by_row: list[tuple[Any, int]] = []  # the entry of every source row
+        self._counter = itertools.count()
+        super().__init__(source)
+
+    def __setitem__(self, key: int, value) -> None:
+        self.source[self._by_row.index(self._entries[key])] = value
+
+    def set_fields(self, index: int, **changes) -> None:
+        """Change fields of the item at index in the source, see ObservedList.set_fields"""
+        self.source.set_fields(self._by_row.index(self._entries[index]), **changes)
+
+    def _entry(self, item) -> tuple[Any, int]:
+        return self.key(item), next(self._counter)
+
+    def _rebuild(self) -> None:
+        items = self.source._data
+        self._by_row = [self._entry(item) for item in items]
+        order = sorted(range(len(items)), key=self._by_row.__getitem__)
+        self._entries = [self._by_row[i] for i in order]
+        self._data = [items[i] for i in order]
+
+    def _length(self) -> int:
+        return len(self._by_row)
+
+    def _insert(self, start: int, stop: int) -> None:
+        items = self.source._data
+        entries = [self._entry(items[row]) for row in range(start, stop)]
+        self._by_row[start:start] = entries
+        for row, entry in zip(range(start, stop), entries):
+            at = bisect.bisect(self._entries, entry)
+            self._entries.insert(at, entry)
+            self._data.insert(at, items[row])
+            self.notify(Notify(Action.CREATE, [at], [items[row]], self))
+
+    def _delete(self, start: int, stop: int) -> None:
+        for entry in self._by_row[start:stop]:
+            at = bisect.bisect_left(self._entries, entry)
+            del self._entries[at]
+            self.notify(Notify(Action.DELETE, [at], [self._data.pop(at)], self))
+        del self._by_row[start:stop]
+
+    def _update(self, start: int, stop: int) -> None:
+        items = self.source._data
+        for row in range(start, stop):
+            item, entry = items[row], self._by_row[row]
+            at = bisect.bisect_left(self._entries, entry)
+            key = self.key(item)
+            if key != entry[0]:
+                del self._entries[at], self._data[at]
+                entry = self._by_row[row] = key, entry[1]
+                dst = bisect.bisect(self._entries, entry)
+                self._entries.insert(dst, entry)
+                self._data.insert(dst, item)
+                if dst != at:
+                    self.notify(Notify(Action.MOVE, [at], [dst], self))
+                at = dst
+            self._data[at] = item
+            self.notify(Notify(Action.UPDATE, [at], [item], self))
+
+    def _permute(self, order: list[int]) -> None:
+        # the order of the source does not matter, only which entry belongs to which row
+        self._by_row = [self._by_row[old] for old in order]
+
+
+class MappedView(ListView):
+    """A function applied to every item of the source"""
+
+    __slots__ = ("fn",)
+
+    def __init__(self, source: Source, fn: Callable[[Any], Any]):
+        self.fn = fn
+        super().__init__(source)
+
+    def _rebuild(self) -> None:
+        self._data = [self.fn(item) for item in self.source._data]
+
+    def _length(self) -> int:
+        return len(self._data)
+
+    def _insert(self, start: int, stop: int) -> None:
+        self._data[start:start] = values = [self.fn(item) for item in self.source._data[start:stop]]
+        self.notify(Notify(Action.CREATE, [_at(start, stop)], values, self))
+
+    def _delete(self, start: int, stop: int) -> None:
+        removed = self._data[start:stop]
+        del self._data[start:stop]
+        self.notify(Notify(Action.DELETE, [_at(start, stop)], removed, self))
+
+    def _update(self, start: int, stop: int) -> None:
+        self._data[start:stop] = values = [self.fn(item) for item in self.source._data[start:stop]]
+        self.notify(Notify(Action.UPDATE, [_at(start, stop)], values, self))
+
+    def _move(self, start: int, stop: int, dst: int) -> None:
+        moved = self._data[start:stop]
+        del self._data[start:stop]
+        self._data[dst:dst] = moved
+        self.notify(Notify(Action.MOVE, [_at(start, stop)], [dst], self))
+
+    def _permute(self, order: list[int]) -> None:
+        self._data = [self._data[old] for old in order]
+        self.notify(Notify(Action.MOVE, ALL, list(order), self))
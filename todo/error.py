@@ -48,3 +48,15 @@ class NeedConfigError(AppError):
 
     def __str__(self):
         return f"{self.msg}"
+
+
+class DispatchError(AppError):
+    """Errors raised when notifications cannot be queued for delivery."""
+
+    pass
+
+
+class CodecError(AppError):
+    """Errors raised when data cannot be encoded in, or decoded from, a file format."""
+
+    pass
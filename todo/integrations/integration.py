@@ -5,7 +5,7 @@ from abc import abstractmethod
 from functools import cached_property
 
 from todo.log import get_logger
-from todo.model import config
+from todo.model import config, config_snapshot
 from todo.globals import log_path
 
 logger = get_logger(__name__, use_config=False, log_path=log_path / "integration.log")
@@ -104,7 +104,7 @@ class Integration:
         Run the integration.
         """
 
-        if not config.integration.enabled:
+        if not config_snapshot.current.integration.enabled:
             logger.info("Integration is disabled.")
             return
 
@@ -113,4 +113,4 @@ class Integration:
                 await self.update()
             except Exception as e:
                 logger.error(f"Error while updating {self.__class__.__name__}: {e!r}")
-            await asyncio.sleep(config.integration.interval)
+            await asyncio.sleep(config_snapshot.current.integration.interval)
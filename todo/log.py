@@ -24,17 +24,18 @@ def get_logger(
     """
 
     if use_config:
-        from todo.model import config
+        from todo.data.config import config_snapshot
 
         if log_file or log_path or level:
             raise ValueError(
                 "Cannot specify log_path, log_file, or level when use_config is True."
             )
+        settings = config_snapshot.current.logging
         try:
-            level = getattr(logging, config.logging.level)
-        except AttributeError:
+            level = getattr(logging, settings.level)
+        except (AttributeError, TypeError):
             raise NeedConfigError("logging.level", "Level of logging.")
-        log_path = config.logging.path
+        log_path = Path(settings.path)
     if log_path is None:
         log_path = default_log_path / "todo.log"
     if level is None:
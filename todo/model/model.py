@@ -1,5 +1,4 @@
 import dataclasses as dc
-import functools
 import warnings
 from typing import Any, TypeVar
 
@@ -48,12 +47,9 @@ def list_model(data_class: T, flags: Qt.ItemFlags = Qt.ItemIsEnabled | Qt.ItemIs
         """Called when the user edits an item"""
         if not idx.isValid() or idx.row() > len(self._data):
             return False
-        row = idx.row()
-        data = dc.asdict(self._data[row])
         if isinstance(value, Path | QUrl):
             value = save_image(value)
-        data[role2name(role)] = value
-        self._data[row] = data_class(**data)
+        self._data.set_fields(idx.row(), **{role2name(role): value})
         return True
 
     def header_data(
@@ -72,10 +68,31 @@ def list_model(data_class: T, flags: Qt.ItemFlags = Qt.ItemIsEnabled | Qt.ItemIs
     def on_change(self, notify: Notify):
         """Called when the list model changes"""
         match notify.action:
-            case Action.UPDATE | Action.MOVE:
+            case Action.MOVE if notify.index[0] is ALL:
+                self.layoutAboutToBeChanged.emit()
+                if notify.value is not None:
+                    moved_to = [0] * len(notify.value)
+                    for new, old in enumerate(notify.value):
+                        moved_to[old] = new
+                    persistent = self.persistentIndexList()
+                    self.changePersistentIndexList(persistent, [self.index(moved_to[i.row()]) for i in persistent])
+                self.layoutChanged.emit()
+            case Action.MOVE:
+                first, last = index_range(notify.index)
+                dst = notify.value[0]
+                # Qt wants the destination as the row before which the rows go, before the move
+                if self.beginMoveRows(QModelIndex(), first, last, QModelIndex(),
+                                      dst + last - first + 1 if dst > first else dst):
+                    self.endMoveRows()
+            case Action.UPDATE if notify.index[0] is ALL:
+                # a batch whose changes of the list could not be followed one by one
+                self.layoutAboutToBeChanged.emit()
+                self.layoutChanged.emit()
+            case Action.UPDATE:
                 begin, end = index_range(notify.index)
-                for row in range(begin, end + 1):
-                    self.dataChanged.emit(self.index(row), self.index(row))
+                # only the roles of the changed fields, when the items were not replaced whole
+                roles = [name2role(name) for name in notify.fields] if notify.fields else []
+                self.dataChanged.emit(self.index(begin), self.index(end), roles)
             case Action.CREATE | Action.DELETE:
                 self.layoutChanged.emit()
 
@@ -88,7 +105,8 @@ def list_model(data_class: T, flags: Qt.ItemFlags = Qt.ItemIsEnabled | Qt.ItemIs
     def __init__(self, data: ObservedCollection[list[T]], *args, **kwargs):
         super(self.__class__, self).__init__(*args, **kwargs)
         self._data = data
-        data.attach(functools.partial(on_change, self))
+        # held weakly: a model that is dropped stops receiving changes instead of leaking
+        data.attach(self.on_change, weak=True)
 
     return type(
         f"{data_class.__name__}Model",
@@ -100,6 +118,7 @@ def list_model(data_class: T, flags: Qt.ItemFlags = Qt.ItemIsEnabled | Qt.ItemIs
             "headerData": header_data,
             "flags": get_flags,
             "roleNames": role_names,
+            "on_change": on_change,
             "__init__": __init__,
         },
     )
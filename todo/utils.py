@@ -3,7 +3,7 @@ import functools
 import inspect
 import warnings
 from collections.abc import Callable, Coroutine
-from threading import Thread
+from threading import Condition, Lock, Thread, get_ident
 from typing import Any, Literal, TypeVar, Optional, Union, Type
 
 from todo.log import get_logger
@@ -597,3 +597,86 @@ def index_range(index: list[slice | int] | slice | int) -> tuple[int, int]:
             begin = min(begin, x) if begin is not None else x
             end = max(end, x) if end is not None else x
     return begin, end
+
+
+class _Guard:
+    """Context manager calling acquire on enter and release on exit"""
+
+    __slots__ = ("_acquire", "_release")
+
+    def __init__(self, acquire: Callable[[], None], release: Callable[[], None]):
+        self._acquire = acquire
+        self._release = release
+
+    def __enter__(self):
+        self._acquire()
+
+    def __exit__(self, *exc_info):
+        self._release()
+
+
+class RWLock:
+    """
+    A reentrant reader/writer lock. Many threads may read at once, while a writer has
+    exclusive access. A thread holding the write lock may also read, but a thread holding
+    only the read lock cannot upgrade to writing. Waiting writers block new readers, so
+    writers are not starved.
+    """
+
+    def __init__(self):
+        self._cond = Condition(Lock())
+        self._readers: dict[int, int] = {}
+        self._writer: Optional[int] = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+        self._read = _Guard(self.acquire_read, self.release_read)
+        self._write = _Guard(self.acquire_write, self.release_write)
+
+    def acquire_read(self) -> None:
+        me = get_ident()
+        with self._cond:
+            if self._writer != me and me not in self._readers:
+                self._cond.wait_for(lambda: self._writer is None and not self._waiting_writers)
+            self._readers[me] = self._readers.get(me, 0) + 1
+
+    def release_read(self) -> None:
+        me = get_ident()
+        with self._cond:
+            if (depth := self._readers[me] - 1) > 0:
+                self._readers[me] = depth
+                return
+            del self._readers[me]
+            self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        me = get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            if me in self._readers:
+                raise RuntimeError("Cannot upgrade a read lock to a write lock")
+            self._waiting_writers += 1
+            try:
+                self._cond.wait_for(lambda: self._writer is None and not self._readers)
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self) -> None:
+        with self._cond:
+            if self._writer != get_ident():
+                raise RuntimeError("Cannot release a write lock held by another thread")
+            self._writer_depth -= 1
+            if not self._writer_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+    def read(self) -> _Guard:
+        """Context manager holding the read lock"""
+        return self._read
+
+    def write(self) -> _Guard:
+        """Context manager holding the write lock"""
+        return self._write
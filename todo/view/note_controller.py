@@ -1,10 +1,11 @@
 from PySide6 import QtCore, QtGui
-from todo.data import NoteItem, note_list
+from todo.data import NoteItem, UndoManager, note_list
 
 
 class NotesController(QtCore.QObject):
     def __init__(self):
         super().__init__()
+        self.history = UndoManager(note_list)
 
     @QtCore.Slot()
     def add(self):
@@ -13,3 +14,11 @@ class NotesController(QtCore.QObject):
     @QtCore.Slot(int)
     def delete(self, index):
         note_list.pop(index)
+
+    @QtCore.Slot()
+    def undo(self):
+        self.history.undo()
+
+    @QtCore.Slot()
+    def redo(self):
+        self.history.redo()
@@ -11,6 +11,7 @@ from PySide6.QtWidgets import QApplication
 from todo.data import todo_list, TodoItem, ObservedList, note_list
 from todo.model import TodoModel, NoteModel, list_model
 from note_controller import NotesController
+from todo_controller import TodosController
 
 
 def qt_message_handler(mode, context, message):
@@ -63,12 +64,14 @@ if __name__ == "__main__":
     todo_model = TodoModel(todo_list)
     # Create the note model
     note_model = NoteModel(note_list)
+    # Create the todo controller
+    todo_controller = TodosController()
     # Create the note controller
     note_controller = NotesController()
     # Add the navigation items
     navigation_list.extend(
         [
-            NavigationItem("Todo", "list", "Todos.qml", todo_model),
+            NavigationItem("Todo", "list", "Todos.qml", todo_model, todo_controller),
             NavigationItem("Notes", "note", "Notes.qml", note_model, note_controller),
             NavigationItem("Extensions", "extension", "Extensions.qml"),
             NavigationItem("Settings", "settings", "Settings.qml"),
@@ -0,0 +1,16 @@
+from PySide6 import QtCore
+from todo.data import UndoManager, todo_list
+
+
+class TodosController(QtCore.QObject):
+    def __init__(self):
+        super().__init__()
+        self.history = UndoManager(todo_list)
+
+    @QtCore.Slot()
+    def undo(self):
+        self.history.undo()
+
+    @QtCore.Slot()
+    def redo(self):
+        self.history.redo()